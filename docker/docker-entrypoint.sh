@@ -29,8 +29,10 @@ gunicorn \
 
 sleep 10
 
-echo "Starting dump worker"
-python3 start_dump_worker.py &
+if [ "$STATE_RECORDER" != "1" ]; then
+  echo "Starting dump worker"
+  python3 start_dump_worker.py &
+fi
 echo "Starting scenario worker"
 python3 start_scenario_job.py &
 echo "Starting transaction verifier worker"
@@ -18,10 +18,12 @@ from post.network.dumper import Dumper
 from post.network.manager import NodeTrust
 from post.monitor.imports import (
     get_self_node_info,
-    get_info_from_blockchain,
-    get_info_from_nodes, get_info_from_validators, get_info_from_transactions_to_verify,
-    get_info_from_transactions_verified, get_transactions_times, get_transactions_times_values,
+    get_info_from_nodes, get_transactions_times, get_transactions_times_values,
+    get_state_events,
 )
+from post.monitor.ingest import DumpIngest
+from post.monitor.pipeline import last_trust_values
+from post.network.recorder import StateRecorder
 
 storage_path = os.path.realpath(
     os.path.join(os.path.dirname(__file__), "..", "storage")
@@ -73,21 +75,15 @@ transaction_times = []
 nodes_mapping = {}
 last_trust = {}
 
-for node in os.listdir(storage_path):
-    # list all nodes in dir
-    if node == ".gitignore":
-        continue
-    print(f"Processing node {node}")
-
-    trust_data = []
-
-    df = pd.DataFrame(columns=cols)
-    df.set_index("time", inplace=True)
-
-    dirs = [int(time_dir) for time_dir in os.listdir(os.path.join(storage_path, node, "dump"))]
-    dirs.sort()
-    print(f"Found {len(dirs)} dirs in node {node}")
+node_names = [node for node in os.listdir(storage_path) if node != ".gitignore"]
+print("Ingesting dumps")
+node_dumps = DumpIngest().ingest(
+    {node: os.path.join(storage_path, node, "dump") for node in node_names},
+    None if firsts_records is None else firsts_records + 1,
+)
 
+for node in node_names:
+    print(f"Processing node {node}")
 
     storage_dir = os.path.join(storage_path, node, "storage")
     # Get all transactions time
@@ -96,68 +92,54 @@ for node in os.listdir(storage_path):
     self_node_id = get_self_node_info(storage_dir)
     all_node_trust = get_info_from_nodes(storage_dir)["trust"]
     last_trust[self_node_id] = all_node_trust
+    nodes_mapping[node] = self_node_id.hex
 
-
-    record_i = 0
-    for time in dirs:
-        time_int = int(time)
-        time = float(time) / Dumper.SECOND_PART
-        # list all time in dir
+    # Nodes started with STATE_RECORDER=1 record exact time of every change.
+    # firsts_records counts dump snapshots, so events are not limited by it
+    state_events = get_state_events(storage_dir)
+    if state_events:
+        print(f"Found {len(state_events)} state events in node {node}")
         if not first_time:
-            first_time = time
-
-        if firsts_records is not None:
-            if firsts_records < record_i:
-                break
-
-        storage_dir = os.path.join(storage_path, node, "dump", str(time_int))
-        # print(f"Processing dir {storage_dir}")
-
-        if node not in nodes_mapping.keys():
-            self_node_id = get_self_node_info(storage_dir)
-            nodes_mapping[node] = self_node_id.hex
-            print(self_node_id.hex)
-
-        try:
-            # self_node_id = get_self_node_info(storage_dir)
-            blocks_info = get_info_from_blockchain(storage_dir)
-            nodes_info = get_info_from_nodes(storage_dir)
-            validators_info = get_info_from_validators(storage_dir)
-            txs_to_ver_info = get_info_from_transactions_to_verify(storage_dir)
-            txs_ver_info = get_info_from_transactions_verified(storage_dir)
-        except Exception as e:
-            print(f"Exception {e} while loading from node: {node} from time {time}")
-            raise e
-
-        actual_time = time - first_time
-        df.loc[actual_time] = [
-            nodes_info["len"],
-            validators_info["len"],
-            # nodes_info["trust"],
-            blocks_info["len"],
-            txs_to_ver_info["len"],
-            txs_ver_info["len"],
-            validators_info["validators"],
-        ]
-        for node_id, trust in nodes_info["trust"].items():
-            trust_data.append(
-                {
-                    "time": actual_time,
-                    "sourceNode": node,
-                    "node": node_id.hex,
-                    "trust": trust,
-                }
-            )
-            # df_trust.loc[(actual_time, node, node_id.hex), :] = trust
-        record_i += 1
+            first_time = state_events[0][0]
+        state = {kind: 0 for kind in cols[1:-1]}
+        validators = ""
+        kinds = {
+            StateRecorder.NODES: "number_of_nodes",
+            StateRecorder.VALIDATORS: "number_of_validators",
+            StateRecorder.BLOCKS: "number_of_blocks",
+            StateRecorder.PENDING: "number_of_transaction_to_verify",
+            StateRecorder.VERIFIED: "number_of_verified_transactions",
+        }
+        times = []
+        rows = []
+        trust_data = []
+        for time, kind, key, value in state_events:
+            actual_time = time - first_time
+            if kind == StateRecorder.TRUST:
+                trust_data.append([actual_time, node, key, value])
+                continue
+            state[kinds[kind]] = value
+            if kind == StateRecorder.VALIDATORS:
+                validators = key
+            times.append(actual_time)
+            rows.append([*state.values(), validators])
+        df = pd.DataFrame(rows, columns=cols[1:], index=pd.Index(times, name="time"))
+        df = df[~df.index.duplicated(keep="last")]
+        df_trust_node = pd.DataFrame(
+            trust_data, columns=["time", "sourceNode", "node", "trust"]
+        )
+    else:
+        dumps = node_dumps[node]
+        print(f"Found {len(dumps.snapshots)} dirs in node {node}")
+        if not first_time and len(dumps.snapshots):
+            first_time = float(dumps.snapshots[0]) / Dumper.SECOND_PART
+        df = dumps.frame(first_time or 0.0)
+        df_trust_node = dumps.trust_frame(first_time or 0.0, node)
 
     # check if all df has step by step info
     # df.to_excel(os.path.join(result_path, f"result-{node}.xlsx"))
     dfs[node] = df
 
-    df_trust_node = pd.DataFrame(
-        trust_data, columns=["time", "sourceNode", "node", "trust"]
-    )
     df_trust_node.set_index(["time", "sourceNode", "node"], inplace=True)
     # df_trust_node.to_excel(os.path.join(result_path, f"result-trust-{node}.xlsx"))
     df_trust = pd.concat([df_trust, df_trust_node])
@@ -210,23 +192,7 @@ else:
 """
 Save last trust
 """
-trusts = []
-node_to_cover = []
-for node_id, trust in last_trust.items():
-    value = trust.get(node_id, None)
-    if value is None:
-        node_to_cover.append(node_id)
-    else:
-        trusts.append(value)
-
-for node_id in node_to_cover:
-    list_values = [value.get(node_id, np.nan) for value in list(last_trust.values())]
-    new_values = [value for value in list_values if value is not np.nan]
-    if not new_values:
-        print(f"Node {node_id} not found in last trust")
-        new_values = [5000]
-    value = np.mean(new_values)
-    trusts.append(value)
+trusts = last_trust_values(last_trust)
 
 
 print("Info about last trust")
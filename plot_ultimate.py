@@ -1,4 +1,3 @@
-import csv
 import os
 import sys
 from enum import StrEnum, auto
@@ -7,6 +6,8 @@ from pprint import pprint
 import pandas as pd
 import matplotlib.pyplot as plt
 
+from post.monitor.pipeline import ResultsCatalog
+
 class Parameter(StrEnum):
     node = auto()
     bad_node = auto()
@@ -127,46 +128,24 @@ class Parameter(StrEnum):
 
 
 def main(parameter: Parameter, simulation_dir: str):
-    data = {}
-    print(f"Processing {simulation_dir}: files: {os.listdir(simulation_dir)}")
-    list_dir = os.listdir(simulation_dir)
-    list_dir.sort()
-    for dir in list_dir:
-        base_dir = os.path.join(simulation_dir, dir)
-        if not os.path.isdir(base_dir):
-            continue
-        number = int(dir.split("_")[1])
-        print(f"Processing {dir}")
-        match parameter:
-            case Parameter.spectre:
-                filename = "result_trust.csv"
-            case _:
-                filename = "result_tx.csv"
-        path = os.path.join(simulation_dir, dir, "result", filename)
-        if not os.path.exists(path):
-            print(f"File {path} does not exist")
-            continue
-            raise Exception(f"File {path} does not exist")
-
-        match parameter:
-            case Parameter.spectre | Parameter.spectre_part:
-                with open(path, "r") as file:
-                    line = next(csv.reader(file))
-                    data[number] = [float(x) for x in line]
-            case _:
-                with open(path, "r") as file:
-                    for line in csv.reader(file):
-                        line = [float(x) for x in line]
-                        data[number] = line
-                        break
+    catalog = ResultsCatalog(simulation_dir)
+    print(f"Processing {simulation_dir}: analyzed {catalog.update()}")
+    match parameter:
+        case Parameter.spectre | Parameter.spectre_part:
+            data = catalog.trust_rows()
+        case _:
+            data = {
+                number: times for number, times in catalog.tx_times().items() if times
+            }
+            for number, times in data.items():
                 print(
-                    f"Summary: \n"
-                    f"Mean: {pd.Series(data[number]).mean()} \n"
-                    f"Q1: {pd.Series(data[number]).quantile(0.25)} \n"
-                    f"Q3: {pd.Series(data[number]).quantile(0.75)} \n"
-                    f"Median: {pd.Series(data[number]).median()} \n"
-                    f"Min: {pd.Series(data[number]).min()} \n"
-                    f"Max: {pd.Series(data[number]).max()} \n"
+                    f"Summary of simulation {number}: \n"
+                    f"Mean: {pd.Series(times).mean()} \n"
+                    f"Q1: {pd.Series(times).quantile(0.25)} \n"
+                    f"Q3: {pd.Series(times).quantile(0.75)} \n"
+                    f"Median: {pd.Series(times).median()} \n"
+                    f"Min: {pd.Series(times).min()} \n"
+                    f"Max: {pd.Series(times).max()} \n"
                 )
 
     parameter.plot(data, simulation_dir)
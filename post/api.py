@@ -0,0 +1,370 @@
+import json
+import logging
+import os
+import random
+import socket
+import time
+from functools import wraps
+from uuid import uuid4, UUID
+
+from flask import Blueprint, Flask, Response, current_app, request, jsonify
+
+from post.network.blockchain import PoST, PoTException
+from post.network.node import NodeType
+from post.network.resolver import resolver
+from post.network.wire import WireEncoding, ENCODING_HEADER, BINARY_MIMETYPE
+
+api = Blueprint("api", __name__)
+
+
+def create_app(pot: PoST, random_delay: bool = True) -> Flask:
+    """
+    Create application serving API of given node
+    :param pot:
+    :param random_delay: delay responses by MIN_DELAY-MAX_DELAY ms,
+    disabled when delay is simulated by transport
+    :return:
+    """
+    app = Flask(__name__)
+    app.pot = pot
+    app.config["RANDOM_DELAY"] = random_delay
+    app.register_blueprint(api)
+    return app
+
+
+@api.app_errorhandler(PoTException)
+def pot_error_handler(error: PoTException):
+    logging.error(f"POT EXCEPTION: {error.message} - {error.code}")
+    return jsonify(error=error.message), error.code
+
+
+@api.after_app_request
+def wire_encoding_header(response: Response):
+    if ENCODING_HEADER in request.headers:
+        response.headers[ENCODING_HEADER] = get_wire_encoding().value
+    return response
+
+
+def get_wire_encoding() -> WireEncoding:
+    """
+    Encoding of bytes in JSON responses negotiated by ENCODING_HEADER of request
+    """
+    return WireEncoding.from_headers(request.headers)
+
+
+def random_delay(f):
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        max_delay = os.environ.get("MAX_DELAY")
+        if max_delay is not None and current_app.config["RANDOM_DELAY"]:
+            min_delay = int(os.environ.get("MIN_DELAY", 0))
+            time.sleep(float(random.randint(min_delay, int(max_delay))) / 1000.0)
+        return f(*args, **kwargs)
+
+    return wrapper
+
+
+"""
+=================== Info API ===================
+"""
+
+
+@api.get("/info", endpoint="info")
+def info():
+    """
+    Show info about node
+    status: active/synchronizing/inactive
+    ip: host ip
+    """
+    return {
+        "status": "active",
+        "ip": resolver.self_ip(),
+        "hostname": socket.gethostname(),
+        "identifier": current_app.pot.self_node.identifier.hex,
+    }
+
+
+@api.get("/blockchain", endpoint="get_blockchain")
+def get_blockchain():
+    """
+    Show blockchain storage
+    Query parameters:
+    from_height: index of first returned block (default 0)
+    limit: maximal number of returned blocks (default all)
+    headers: 1 to omit transactions of blocks
+    format: json (default), ndjson (one block per line) or binary (encoded blocks)
+    :return:
+    """
+    blocks, headers_only, response_format = current_app.pot.blockchain_get(request.args)
+    encoding = get_wire_encoding()
+    match response_format:
+        case "ndjson":
+            def generate_ndjson():
+                for block in blocks:
+                    yield json.dumps(block.to_dict(headers_only, encoding)) + "\n"
+
+            return Response(generate_ndjson(), mimetype="application/x-ndjson")
+        case "binary":
+            def generate_binary():
+                # Blocks are read from storage already encoded
+                yield from blocks
+
+            return Response(generate_binary(), mimetype="application/octet-stream")
+    return {
+        "blockchain": [block.to_dict(headers_only, encoding) for block in blocks],
+        "height": current_app.pot.blockchain.height(),
+    }
+
+
+@api.get("/blockchain/tip", endpoint="get_blockchain_tip")
+def get_blockchain_tip():
+    return current_app.pot.blockchain_tip()
+
+
+@api.get("/blockchain/sync", endpoint="get_blockchain_sync")
+@random_delay
+def get_blockchain_sync():
+    """
+    Stream encoded blocks after block of hash lastBlock
+    Query parameters: lastBlock (hex of block hash), offset, limit
+    :return:
+    """
+    blocks = current_app.pot.blockchain_sync(request.args)
+
+    def generate():
+        for block in blocks:
+            yield block.encode()
+
+    return Response(generate(), mimetype="application/octet-stream")
+
+
+@api.get("/blockchain/proof/<tx_hash>", endpoint="get_blockchain_proof")
+@random_delay
+def get_blockchain_proof(tx_hash: str):
+    """
+    Merkle inclusion proof of transaction
+    tx_hash: hex of sha256 of encoded transaction
+    :return:
+    """
+    return current_app.pot.blockchain_proof(tx_hash, get_wire_encoding())
+
+
+@api.get("/transaction/to-verify")
+@random_delay
+def get_transaction_to_verify():
+    data = {}
+    encoding = get_wire_encoding()
+    for uuid, tx_to_verify in current_app.pot.tx_to_verified.all().items():
+        data[uuid.hex] = {
+            "timestamp": tx_to_verify.time,
+            "transaction": encoding.encode_bytes(tx_to_verify.tx.encode()),
+            "node": tx_to_verify.node.identifier.hex,
+            "voting": {
+                "result": tx_to_verify.get_positive_votes(),
+                "count": len(tx_to_verify.voting),
+                "voting": [
+                    {"uuid": k.hex, "result": v} for k, v in tx_to_verify.voting.items()
+                ],
+            },
+        }
+    return data
+
+
+@api.get("/blockchain/verified")
+@random_delay
+def get_transaction_verified():
+    if current_app.pot.light:
+        raise PoTException("Light node does not store verified transactions", 400)
+    return {
+        "transactions": [
+            {"identifier": uid.hex, "timestamp": tx.time, "data": tx.tx.data}
+            for uid, tx in current_app.pot.blockchain.txs_verified.all().items()
+        ]
+    }
+
+
+@api.get("/node/list")
+def nodes():
+    return {"nodes": current_app.pot.nodes.prepare_all_nodes_info()}
+
+
+@api.get("/node/<identifier>")
+@random_delay
+def node(identifier: str):
+    node_f = current_app.pot.nodes.find_by_identifier(UUID(identifier))
+    if node_f is None:
+        return "Node not found", 404
+    return current_app.pot.nodes.prepare_nodes_info([node_f])[0]
+
+
+@api.get("/public-key", endpoint="get_public_key")
+@random_delay
+def get_public_key():
+    return current_app.pot.self_node.get_public_key_str()
+
+
+"""
+=================== Action API ===================
+"""
+
+
+@api.post("/transaction", endpoint="new_transaction")
+@random_delay
+def transaction_new():
+    try:
+        if request.content_length >= 1024:
+            return "Transaction data is too long", 400
+        return current_app.pot.transaction_new(
+            request.get_data(as_text=False), request.remote_addr
+        )
+    except Exception:
+        logging.exception("Error registering new transaction")
+        return "Invalid transaction data", 400
+
+
+@api.post(
+    "/transaction/<identifier>/verified", endpoint="populate_transaction_verified"
+)
+@random_delay
+def transaction_verified(identifier: str):
+    try:
+        if request.content_length >= 1024:
+            return "Transaction data is too long", 400
+        current_app.pot.transaction_verified_new(
+            identifier,
+            request.get_data(as_text=request.mimetype != BINARY_MIMETYPE),
+            request.remote_addr,
+        )
+        return ""
+    except Exception:
+        logging.exception("Error registering new transaction verified")
+        return "Invalid transaction data", 400
+
+
+@api.post("/block", endpoint="populate_block")
+@random_delay
+def block_new():
+    try:
+        current_app.pot.block_new(request.get_data(), request.remote_addr)
+        return ""
+    except Exception:
+        logging.exception("Error registering new block")
+        return "Invalid block data", 400
+
+
+@api.post("/node/populate-new", endpoint="populate_node")
+@random_delay
+def populate_new_node():
+    """
+    Request must be in form: {
+        "identifier": "<identifier>",
+        "host": "<host>",
+        "port": <port>
+    }
+    :return:
+    """
+    current_app.pot.populate_new_node(request.get_json(), request.remote_addr)
+    return ""
+
+
+@api.post("/blockchain/block/new", endpoint="blockchain_block_populate_node")
+@random_delay
+def populate_new_block():
+    return current_app.pot.add_new_block(request.get_data(False), request.remote_addr)
+
+
+@api.post("/node/validator/new", endpoint="inform_about_new_validator")
+@random_delay
+def new_validators():
+    current_app.pot.node_new_validators(request.remote_addr, request.get_json())
+    return ""
+
+
+# CHECK
+@api.patch("/node/<identifier>/trust", endpoint="node_trust_change")
+@random_delay
+def node_trust_change(identifier: str):
+    current_app.pot.node_trust_change(identifier, request.get_json())
+    return ""
+
+
+"""
+=================== Validator API ===================
+"""
+
+
+@api.get("/transaction/<identifier>")
+@random_delay
+def transaction_get(identifier: str):
+    # TODO: nie jest VALIDATOR
+    return current_app.pot.transaction_get(identifier)
+
+
+@api.post("/transaction/<identifier>/populate")
+@random_delay
+def transaction_populate(identifier: str):
+    # TODO: nie jest VALIDATOR
+    current_app.pot.transaction_populate(request.get_data(as_text=False), identifier)
+    return ""
+
+
+@api.post("/transaction/<identifier>/verifyResult")
+@random_delay
+def transaction_verify_result(identifier: str):
+    request_json = request.get_json()
+    current_app.pot.transaction_populate_verify_result(
+        request_json.get("result"), identifier, request.remote_addr
+    )
+    return ""
+
+
+@api.post("/node/register", endpoint="node_register")
+@random_delay
+def node_register():
+    """
+    Initialize node registration
+    :return:
+    """
+    data = request.get_json()
+    port = int(data.get("port"))
+    n_type = getattr(NodeType, data.get("type"))
+    identifier = UUID(data.get("identifier", uuid4().hex))
+    return current_app.pot.node_register(identifier, request.remote_addr, port, n_type)
+
+
+@api.get("/node/update", endpoint="node_update")
+@random_delay
+def node_update():
+    """
+    Node identifier must be valid uuid hex
+    :return:
+    """
+    return current_app.pot.node_update(request.args, get_wire_encoding())
+
+
+@api.post("/node/validator/agreement")
+@random_delay
+def validator_agreement_start():
+    return current_app.pot.node_validator_agreement_start(
+        request.remote_addr, request.get_json()
+    )
+
+
+@api.get("/node/validator/agreement")
+@random_delay
+def validator_agreement_get():
+    return current_app.pot.node_validator_agreement_get(request.remote_addr)
+
+
+@api.patch("/node/validator/agreement/vote")
+@random_delay
+def validator_agreement_vote():
+    current_app.pot.node_validator_agreement_vote(request.remote_addr, request.get_json())
+    return {}
+
+
+@api.post("/node/validator/agreement/done")
+@random_delay
+def validator_agreement_done():
+    current_app.pot.node_validator_agreement_done(request.remote_addr, request.get_json())
+    return {}
@@ -0,0 +1,470 @@
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+from dataclasses import dataclass, asdict, field
+from io import BytesIO
+from statistics import median
+from time import perf_counter, time
+from typing import Callable
+from uuid import uuid4
+
+import numpy as np
+
+from post.network import transport
+from post.network.block import Block, BlockCandidate
+from post.network.blockchain import PoST
+from post.network.node import Node, NodeType, SelfNodeInfo
+from post.network.resolver import resolver
+from post.network.storage import (
+    BlocksStorage,
+    NodeStorage,
+    NodeTrustHistory,
+    NodeTrustStorage,
+    RejectedTransactions,
+    SettledTransactionVotes,
+    TransactionStorage,
+    TransactionTime,
+    TransactionVerifiedStorage,
+    ValidatorStorage,
+    decode_chain,
+    encode_chain,
+)
+from post.network.transaction import Tx, TxCandidate, TxToVerify, TxVerified
+from post.network.transport import Transport
+from post.network.trust import NodeTrustChange, TrustChangeType
+from post.scenario import Scenario
+from post.simulation.cluster import Cluster
+from post.simulation.environment import environment
+from post.simulation.transport import InMemoryResponse
+
+
+@dataclass
+class BenchmarkResult:
+    name: str
+    n_items: int
+    best: float
+    median: float
+    extra: dict = field(default_factory=dict)
+
+    @property
+    def items_per_second(self) -> float:
+        return self.n_items / self.best if self.best else float("inf")
+
+    def to_dict(self) -> dict:
+        data = asdict(self)
+        data["items_per_second"] = self.items_per_second
+        return data
+
+
+class NullTransport(Transport):
+    """
+    Accept every request without delivering it, so benchmark of node
+    measures only its own work
+    """
+
+    synchronous = True
+
+    def request(self, method: str, url: str, **kwargs):
+        return InMemoryResponse(200, b"{}", {}, kwargs.get("data"))
+
+
+class Benchmark:
+    """
+    Time hot paths of node. Each case is repeated and best and median times
+    are kept, sizes of data are multiplied by BENCHMARK_SCALE
+    """
+
+    REPEAT = 5
+    # Relative slowdown of best time reported as regression
+    REGRESSION_THRESHOLD = 0.1
+
+    work_dir: str
+    scale: float
+    repeat: int
+    results: list[BenchmarkResult]
+
+    def __init__(
+        self, work_dir: str, scale: float | None = None, repeat: int | None = None
+    ):
+        self.work_dir = work_dir
+        self.scale = (
+            float(os.getenv("BENCHMARK_SCALE", 1)) if scale is None else scale
+        )
+        self.repeat = self.REPEAT if repeat is None else repeat
+        self.results = []
+
+    def size(self, n: int) -> int:
+        return max(1, int(n * self.scale))
+
+    def storage_dir(self, name: str) -> str:
+        path = os.path.join(self.work_dir, name)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def measure(
+        self,
+        name: str,
+        func: Callable[[], object],
+        n_items: int = 1,
+        setup: Callable[[], None] | None = None,
+    ) -> BenchmarkResult:
+        """
+        :param name:
+        :param func: measured code
+        :param n_items: number of items processed by func
+        :param setup: called before every repetition, not measured
+        :return:
+        """
+        times = []
+        for _ in range(self.repeat):
+            if setup is not None:
+                setup()
+            start = perf_counter()
+            func()
+            times.append(perf_counter() - start)
+        result = BenchmarkResult(name, n_items, min(times), median(times))
+        self.results.append(result)
+        return result
+
+    def run(self, cases: list[Callable[["Benchmark"], None]] | None = None) -> None:
+        for case in CASES if cases is None else cases:
+            case(self)
+
+    def to_dict(self) -> dict:
+        return {
+            "commit": get_commit(),
+            "time": time(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "scale": self.scale,
+            "repeat": self.repeat,
+            "results": [result.to_dict() for result in self.results],
+        }
+
+    def save(self, path: str) -> None:
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+
+def get_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(
+    previous: dict, current: dict, threshold: float = Benchmark.REGRESSION_THRESHOLD
+) -> list[tuple[str, float]]:
+    """
+    Compare best times per item of results saved by Benchmark.save.
+    Results of different BENCHMARK_SCALE are comparable only for cases
+    linear in size of data
+    :return: names and ratios of current to previous time of slower cases
+    """
+    previous_best = {
+        result["name"]: result["best"] / result["n_items"]
+        for result in previous["results"]
+        if result["n_items"]
+    }
+    regressions = []
+    for result in current["results"]:
+        before = previous_best.get(result["name"])
+        if not before or not result["n_items"]:
+            continue
+        ratio = result["best"] / result["n_items"] / before
+        if ratio > 1 + threshold:
+            regressions.append((result["name"], ratio))
+    return regressions
+
+
+"""
+=================== Cases ===================
+"""
+
+
+def create_self_node(b: Benchmark) -> SelfNodeInfo:
+    with environment({"STORAGE_DIR": b.storage_dir("self_node")}):
+        return SelfNodeInfo()
+
+
+def create_txs(self_node: SelfNodeInfo, n: int) -> list[Tx]:
+    return [
+        TxCandidate({"t": "1", "d": i % 5 + 10, "n": str(i)}).sign(self_node)
+        for i in range(n)
+    ]
+
+
+def create_chain(self_node: SelfNodeInfo, n_blocks: int, txs: list[Tx]) -> list[Block]:
+    chain = []
+    prev_hash = b"\x00" * 32
+    per_block = max(1, len(txs) // n_blocks)
+    for i in range(n_blocks):
+        block_txs = txs[i * per_block % len(txs) :][:per_block]
+        block = BlockCandidate.create_new(block_txs).sign(
+            prev_hash, self_node.identifier, self_node.private_key
+        )
+        prev_hash = block.hash()
+        chain.append(block)
+    return chain
+
+
+def bench_encoding(b: Benchmark) -> None:
+    self_node = create_self_node(b)
+    txs = create_txs(self_node, b.size(10000))
+    encoded_txs = [tx.encode() for tx in txs]
+    b.measure("tx.encode", lambda: [tx.encode() for tx in txs], len(txs))
+    b.measure(
+        "tx.decode", lambda: [Tx.decode(BytesIO(e)) for e in encoded_txs], len(txs)
+    )
+
+    blocks = create_chain(self_node, b.size(100), txs)
+    encoded_blocks = [block.encode() for block in blocks]
+    b.measure("block.encode", lambda: [block.encode() for block in blocks], len(blocks))
+    b.measure(
+        "block.decode",
+        lambda: [Block.decode(BytesIO(e)) for e in encoded_blocks],
+        len(blocks),
+    )
+
+
+def bench_chain(b: Benchmark) -> None:
+    self_node = create_self_node(b)
+    chain = create_chain(self_node, b.size(10000), create_txs(self_node, 500))
+    data = encode_chain(chain)
+    b.measure("decode_chain", lambda: decode_chain(data), len(chain))
+
+    storage = BlocksStorage(b.storage_dir("blocks"))
+    b.measure("BlocksStorage.dump", lambda: storage.dump(chain), len(chain))
+    b.measure("BlocksStorage.load", storage.load, len(chain))
+    b.measure(
+        "BlocksStorage.update",
+        lambda: storage.update(chain[-1:]),
+        1,
+        setup=lambda: storage.dump(chain[:-1]),
+    )
+    b.measure("BlocksStorage.count", storage.count, len(chain))
+
+
+def bench_storage(
+    b: Benchmark, storage, data, update_data, n_items: int, n_update: int
+) -> None:
+    name = type(storage).__name__
+    b.measure(f"{name}.dump", lambda: storage.dump(data), n_items)
+    b.measure(f"{name}.load", storage.load, n_items)
+    if update_data is not None:
+        b.measure(
+            f"{name}.update",
+            lambda: storage.update(update_data),
+            n_update,
+            setup=lambda: storage.dump(data),
+        )
+
+
+def bench_storages(b: Benchmark) -> None:
+    self_node = create_self_node(b)
+    storage_dir = b.storage_dir("storages")
+    n_nodes = b.size(1000)
+    nodes = [
+        Node(uuid4(), f"node-{i}", 5000, NodeType.VALIDATOR) for i in range(n_nodes)
+    ]
+    bench_storage(b, NodeStorage(storage_dir), nodes, nodes[:1], n_nodes, 1)
+
+    trusts = {node.identifier: 5000 + i for i, node in enumerate(nodes)}
+    trust_change = {nodes[0].identifier: 5001}
+    bench_storage(b, NodeTrustStorage(storage_dir), trusts, trust_change, n_nodes, 1)
+
+    identifiers = [node.identifier for node in nodes]
+    bench_storage(b, ValidatorStorage(storage_dir), identifiers, None, n_nodes, 0)
+
+    n_txs = b.size(1000)
+    txs = create_txs(self_node, n_txs)
+    txs_to_verify = {uuid4(): TxToVerify(tx, nodes[0]) for tx in txs}
+    bench_storage(
+        b,
+        TransactionStorage(storage_dir),
+        txs_to_verify,
+        dict([next(iter(txs_to_verify.items()))]),
+        n_txs,
+        1,
+    )
+    txs_verified = {uuid4(): TxVerified(tx, int(time())) for tx in txs}
+    bench_storage(
+        b,
+        TransactionVerifiedStorage(storage_dir),
+        txs_verified,
+        dict([next(iter(txs_verified.items()))]),
+        n_txs,
+        1,
+    )
+
+    n_changes = b.size(10000)
+    now = time()
+    changes = [
+        NodeTrustChange(
+            nodes[i % n_nodes].identifier,
+            now - n_changes + i,
+            TrustChangeType.TRANSACTION_VALIDATED,
+            1,
+            uuid4().hex,
+        )
+        for i in range(n_changes)
+    ]
+    bench_storage(
+        b, NodeTrustHistory(storage_dir), changes, changes[-1:], n_changes, 1
+    )
+
+    rejections = RejectedTransactions(storage_dir)
+    rejected = [uuid4() for _ in range(n_changes)]
+    b.measure("RejectedTransactions.update", lambda: rejections.update(rejected), n_changes)
+    b.measure("RejectedTransactions.load", rejections.load, n_changes)
+
+    votes = SettledTransactionVotes(storage_dir)
+    settled = list(txs_verified)
+    b.measure(
+        "SettledTransactionVotes.update",
+        lambda: [votes.update(uuid, True, identifiers[:3]) for uuid in settled],
+        len(settled),
+    )
+    b.measure("SettledTransactionVotes.load", votes.load, len(settled))
+
+    tx_time = TransactionTime(storage_dir)
+    b.measure(
+        "TransactionTime.append",
+        lambda: [tx_time.append(uuid, True, 1.0) for uuid in settled],
+        len(settled),
+    )
+    b.measure("TransactionTime.load", tx_time.load, len(settled))
+
+
+def bench_verification(b: Benchmark) -> None:
+    """
+    Votes of validators on transactions, settled by the last vote.
+    Messages to other nodes are not sent
+    """
+    host = "benchmark-node"
+    env = {
+        "STORAGE_DIR": b.storage_dir("pot"),
+        "NODE_TYPE": NodeType.VALIDATOR.name,
+        "GENESIS_NODE": host,
+        "TRUST_FLUSH_INTERVAL": "0",
+    }
+    resolver.pin(host, host)
+    previous_transport = transport.set_transport(NullTransport())
+    previous_sender = transport.set_sender(host)
+    try:
+        with environment(env):
+            pot = PoST()
+            pot.load()
+            validators = [pot.self_node.get_node()]
+            for i in range(4):
+                node = Node(uuid4(), f"validator-{i}", 5000, NodeType.VALIDATOR)
+                pot.nodes.add(node)
+                pot.nodes.node_trust.add_new_node_trust(node)
+                validators.append(node)
+            pot.nodes.validators.set_validators(
+                [node.identifier for node in validators]
+            )
+            n_txs = b.size(200)
+            txs = create_txs(pot.self_node, n_txs)
+            pending = {}
+
+            def add_txs():
+                pending.clear()
+                for tx in txs:
+                    uuid = uuid4()
+                    pot.tx_to_verified.add(uuid, TxToVerify(tx, validators[0]))
+                    pending[uuid] = tx
+
+            def vote():
+                for uuid in pending:
+                    for validator in validators:
+                        pot.add_transaction_verification_result(uuid, validator, True)
+
+            b.measure("add_transaction_verification_result", vote, n_txs, add_txs)
+
+            self_node = pot.self_node.get_node()
+            n_calls = 100
+            b.measure(
+                "find_last_transactions_values_for_node",
+                lambda: [
+                    pot.blockchain.find_last_transactions_values_for_node(
+                        self_node, "1"
+                    )
+                    for _ in range(n_calls)
+                ],
+                n_calls,
+            )
+    finally:
+        transport.set_sender(previous_sender)
+        transport.set_transport(previous_transport)
+        resolver.unpin(host)
+
+
+def bench_cluster(b: Benchmark) -> None:
+    """
+    Settled transactions per second of wall time of in-process cluster
+    under open-loop load
+    """
+    duration = 60.0
+    cluster = Cluster(
+        b.storage_dir("cluster"),
+        max(4, b.size(8)),
+        scenario=Scenario.LOAD_GENERATOR.name,
+        max_delay=50,
+        seed=1,
+        env={"LOAD_RATE": "1", "LOAD_DISTRIBUTION": "poisson"},
+    )
+    try:
+        cluster.start()
+        start = perf_counter()
+        cluster.run(duration)
+        elapsed = perf_counter() - start
+    finally:
+        cluster.stop()
+    latencies = []
+    for node in cluster.nodes:
+        latencies += [tx_time for _, tx_time in node.pot.tx_latency_storage.load().values()]
+    result = BenchmarkResult("cluster", len(latencies), elapsed, elapsed)
+    result.extra = {
+        "nodes": len(cluster.nodes),
+        "virtual_seconds": duration,
+        "settled_per_virtual_second": len(latencies) / duration,
+        "messages": cluster.transport.sent,
+        "latency_p50": float(np.percentile(latencies, 50)) if latencies else None,
+        "latency_p99": float(np.percentile(latencies, 99)) if latencies else None,
+    }
+    b.results.append(result)
+
+
+CASES = [bench_encoding, bench_chain, bench_storages, bench_verification, bench_cluster]
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in [2, 3]:
+        print("Usage: python -m post.benchmark.suite <output.json> [previous.json]")
+        sys.exit(1)
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        benchmark = Benchmark(work_dir)
+        benchmark.run()
+    benchmark.save(sys.argv[1])
+    for result in benchmark.results:
+        print(
+            f"{result.name:45} {result.best * 1000:10.2f} ms "
+            f"{result.items_per_second:14.1f} items/s"
+        )
+    if len(sys.argv) == 3:
+        with open(sys.argv[2]) as f:
+            previous = json.load(f)
+        if previous["scale"] != benchmark.scale:
+            print(f"Comparing with results of scale {previous['scale']}")
+        regressions = compare(previous, benchmark.to_dict())
+        for name, ratio in regressions:
+            print(f"REGRESSION {name}: {ratio:.2f}x slower")
+        sys.exit(1 if regressions else 0)
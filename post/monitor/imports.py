@@ -1,10 +1,13 @@
 import os
 from uuid import UUID
 
+import numpy as np
+
 from post.network.manager import NodeTrust
 from post.network.node import SelfNodeInfo
 from post.network.storage import TransactionTime, NodeStorage, NodeTrustStorage, ValidatorStorage, TransactionStorage, \
-    TransactionVerifiedStorage, BlocksStorage
+    TransactionVerifiedStorage, BlocksStorage, BlockSchedulerMetrics, NodeTrustFullHistory, \
+    StateEvents, StateEvent
 
 
 def get_transactions_times(storage_path: str) -> dict[UUID, tuple[bool, float]]:
@@ -15,26 +18,44 @@ def get_transactions_times_values(storage_path: str) -> list[float]:
     transaction_times = get_transactions_times(storage_path)
     return [v[1] for v in transaction_times.values()]
 
+def get_block_scheduler_metrics(storage_path: str) -> list[dict]:
+    storage = BlockSchedulerMetrics(storage_path)
+    return storage.load()
+
+def get_node_trust_full_history(storage_path: str) -> list[list]:
+    storage = NodeTrustFullHistory(storage_path)
+    return storage.load_rows()
+
+def get_node_trust_over_time(storage_path: str, node_id: UUID, initial_trust: int = 0) -> tuple[np.ndarray, np.ndarray]:
+    storage = NodeTrustFullHistory(storage_path)
+    return storage.trust_over_time(node_id, initial_trust)
+
+def get_state_events(storage_path: str) -> list[StateEvent]:
+    storage = StateEvents(storage_path)
+    return storage.load()
+
 def get_self_node_info(path: str) -> UUID:
     old_value = os.getenv("STORAGE_DIR")
     os.environ["STORAGE_DIR"] = path
     self_node = SelfNodeInfo(True)
-    os.environ["STORAGE_DIR"] = old_value
+    if old_value is None:
+        os.environ.pop("STORAGE_DIR")
+    else:
+        os.environ["STORAGE_DIR"] = old_value
     return self_node.identifier
 
 
 def get_info_from_blockchain(path: str) -> dict:
     storage = BlocksStorage(path)
-    blocks = storage.load()
+    n_blocks, n_transactions = storage.count()
     return {
-        "len": len(blocks),
-        "transaction_len": sum([len(block.transactions) for block in blocks]),
+        "len": n_blocks,
+        "transaction_len": n_transactions,
     }
 
 
 def get_info_from_nodes(path: str) -> dict:
     storage = NodeStorage(path)
-    nodes = storage.load()
     trust = NodeTrust.__new__(NodeTrust)
     trust._storage = NodeTrustStorage(path)
     # trust._storage.load()
@@ -44,7 +65,7 @@ def get_info_from_nodes(path: str) -> dict:
     # self_node = SelfNodeInfo()
     # os.putenv('STORAGE_DIR', old_value)
     return {
-        "len": len(nodes),
+        "len": storage.count(),
         # "trust": trust.get_node_trust(self_node.get_node())
         "trust": trust._storage.load(),
     }
@@ -58,15 +79,9 @@ def get_info_from_validators(path: str) -> dict:
 
 def get_info_from_transactions_to_verify(path: str) -> dict:
     storage = TransactionStorage(path)
-    try:
-        txs = storage.load()
-    except Exception as e:
-        print(f"Error while processing transactions from path {storage.path}: {e}")
-        txs = []
-    return {"len": len(txs)}
+    return {"len": storage.count()}
 
 
 def get_info_from_transactions_verified(path: str) -> dict:
     storage = TransactionVerifiedStorage(path)
-    txs = storage.load()
-    return {"len": len(txs)}
+    return {"len": storage.count()}
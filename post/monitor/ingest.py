@@ -0,0 +1,264 @@
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from post.network.dumper import Dumper, SnapshotReader
+from post.network.storage import (
+    BlocksStorage,
+    NodeStorage,
+    NodeTrustStorage,
+    TransactionStorage,
+    TransactionVerifiedStorage,
+    ValidatorStorage,
+)
+from post.monitor.imports import (
+    get_info_from_blockchain,
+    get_info_from_transactions_to_verify,
+    get_info_from_transactions_verified,
+    get_info_from_validators,
+)
+
+COLUMNS = [
+    "number_of_nodes",
+    "number_of_validators",
+    "number_of_blocks",
+    "number_of_transaction_to_verify",
+    "number_of_verified_transactions",
+]
+
+# Storage file read for each column
+FILES = {
+    "number_of_nodes": NodeStorage.PATH,
+    "number_of_validators": ValidatorStorage.PATH,
+    "number_of_blocks": BlocksStorage.PATH,
+    "number_of_transaction_to_verify": TransactionStorage.PATH,
+    "number_of_verified_transactions": TransactionVerifiedStorage.PATH,
+}
+
+
+def _read_counts(path: str, names: set[str]) -> dict[str, int]:
+    counts = {}
+    if NodeStorage.PATH in names:
+        counts["number_of_nodes"] = NodeStorage(path).count()
+    if BlocksStorage.PATH in names:
+        counts["number_of_blocks"] = get_info_from_blockchain(path)["len"]
+    if TransactionStorage.PATH in names:
+        counts["number_of_transaction_to_verify"] = (
+            get_info_from_transactions_to_verify(path)["len"]
+        )
+    if TransactionVerifiedStorage.PATH in names:
+        counts["number_of_verified_transactions"] = (
+            get_info_from_transactions_verified(path)["len"]
+        )
+    return counts
+
+
+@dataclass
+class NodeDumps:
+    """
+    State of node in every dump snapshot, kept in columns
+    """
+
+    snapshots: np.ndarray
+    counts: dict[str, np.ndarray]
+    validators: np.ndarray
+    trust_snapshots: np.ndarray
+    trust_nodes: np.ndarray
+    trust_values: np.ndarray
+
+    @classmethod
+    def concat(cls, parts: list["NodeDumps"]) -> "NodeDumps":
+        return cls(
+            np.concatenate([part.snapshots for part in parts]),
+            {
+                column: np.concatenate([part.counts[column] for part in parts])
+                for column in COLUMNS
+            },
+            np.concatenate([part.validators for part in parts]),
+            np.concatenate([part.trust_snapshots for part in parts]),
+            np.concatenate([part.trust_nodes for part in parts]),
+            np.concatenate([part.trust_values for part in parts]),
+        )
+
+    @classmethod
+    def empty(cls) -> "NodeDumps":
+        return cls(
+            np.zeros(0, dtype=np.int64),
+            {column: np.zeros(0, dtype=np.int64) for column in COLUMNS},
+            np.zeros(0, dtype=str),
+            np.zeros(0, dtype=np.int64),
+            np.zeros(0, dtype=str),
+            np.zeros(0, dtype=np.int64),
+        )
+
+    def save(self, path: str) -> None:
+        with open(path + ".tmp", "wb") as f:
+            np.savez(
+                f,
+                snapshots=self.snapshots,
+                validators=self.validators,
+                trust_snapshots=self.trust_snapshots,
+                trust_nodes=self.trust_nodes,
+                trust_values=self.trust_values,
+                **self.counts,
+            )
+        os.replace(path + ".tmp", path)
+
+    @classmethod
+    def load(cls, path: str) -> "NodeDumps":
+        with np.load(path) as data:
+            return cls(
+                data["snapshots"],
+                {column: data[column] for column in COLUMNS},
+                data["validators"],
+                data["trust_snapshots"],
+                data["trust_nodes"],
+                data["trust_values"],
+            )
+
+    def times(self, first_time: float) -> np.ndarray:
+        return self.snapshots / Dumper.SECOND_PART - first_time
+
+    def frame(self, first_time: float) -> pd.DataFrame:
+        """
+        :return: counts and validators indexed by time since first_time
+        """
+        df = pd.DataFrame(
+            {**self.counts, "validators": self.validators},
+            index=pd.Index(self.times(first_time), name="time"),
+        )
+        return df[~df.index.duplicated(keep="last")]
+
+    def trust_frame(self, first_time: float, source_node: str) -> pd.DataFrame:
+        return pd.DataFrame(
+            {
+                "time": self.trust_snapshots / Dumper.SECOND_PART - first_time,
+                "sourceNode": source_node,
+                "node": self.trust_nodes,
+                "trust": self.trust_values,
+            }
+        )
+
+
+def ingest_snapshots(dump_dir: str, snapshots: list[int]) -> NodeDumps:
+    """
+    Read state of node from snapshots. Files with the same signature as in
+    previous snapshot are not parsed again
+    """
+    reader = SnapshotReader(dump_dir)
+    work_dir = tempfile.mkdtemp()
+    names = [*FILES.values(), NodeTrustStorage.PATH]
+    previous = {}
+    counts = {column: 0 for column in COLUMNS}
+    validators = ""
+    trust = {}
+    rows = []
+    trust_rows = []
+    try:
+        for snapshot in snapshots:
+            signatures = {name: reader.signature(snapshot, name) for name in names}
+            changed = {name for name in names if signatures[name] != previous.get(name)}
+            for name in changed:
+                data = b"" if signatures[name] is None else reader.read(snapshot, name)
+                with open(os.path.join(work_dir, name), "wb") as f:
+                    f.write(data)
+            counts.update(_read_counts(work_dir, changed))
+            if ValidatorStorage.PATH in changed:
+                info = get_info_from_validators(work_dir)
+                counts["number_of_validators"] = info["len"]
+                validators = info["validators"]
+            if NodeTrustStorage.PATH in changed:
+                trust = NodeTrustStorage(work_dir).load()
+            previous = signatures
+            rows.append([snapshot, *counts.values(), validators])
+            trust_rows.extend(
+                [snapshot, node_id.hex, value] for node_id, value in trust.items()
+            )
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    if not rows:
+        return NodeDumps.empty()
+    columns = list(zip(*rows))
+    trust_columns = list(zip(*trust_rows)) if trust_rows else [[], [], []]
+    return NodeDumps(
+        np.array(columns[0], dtype=np.int64),
+        {
+            column: np.array(values, dtype=np.int64)
+            for column, values in zip(COLUMNS, columns[1:-1])
+        },
+        np.array(columns[-1], dtype=str),
+        np.array(trust_columns[0], dtype=np.int64),
+        np.array(trust_columns[1], dtype=str),
+        np.array(trust_columns[2], dtype=np.int64),
+    )
+
+
+class DumpIngest:
+    """
+    Ingest dump snapshots of many nodes in process pool. Snapshots of node are
+    split into chunks processed in parallel. Result of node is cached in its
+    dump directory and only snapshots added since are ingested again
+    """
+
+    CACHE = "ingest.npz"
+    CHUNK_SIZE = 500
+
+    workers: int | None
+    chunk_size: int
+    use_cache: bool
+
+    def __init__(
+        self,
+        workers: int | None = None,
+        chunk_size: int | None = None,
+        use_cache: bool = True,
+    ):
+        self.workers = workers
+        self.chunk_size = self.CHUNK_SIZE if chunk_size is None else chunk_size
+        self.use_cache = use_cache
+
+    def _cached(self, dump_dir: str, snapshots: list[int]) -> NodeDumps | None:
+        path = os.path.join(dump_dir, self.CACHE)
+        if not self.use_cache or not os.path.isfile(path):
+            return None
+        cached = NodeDumps.load(path)
+        if cached.snapshots.tolist() != snapshots[: len(cached.snapshots)]:
+            return None
+        return cached
+
+    def ingest(
+        self, dump_dirs: dict[str, str], limit: int | None = None
+    ) -> dict[str, NodeDumps]:
+        """
+        :param dump_dirs: dump directory of every node
+        :param limit: maximal number of snapshots of node
+        :return: state of nodes in snapshots
+        """
+        parts = {}
+        futures = {}
+        with ProcessPoolExecutor(self.workers) as executor:
+            for node, dump_dir in dump_dirs.items():
+                snapshots = SnapshotReader(dump_dir).snapshots()[:limit]
+                cached = self._cached(dump_dir, snapshots)
+                parts[node] = [cached] if cached is not None else []
+                start = 0 if cached is None else len(cached.snapshots)
+                futures[node] = [
+                    executor.submit(
+                        ingest_snapshots, dump_dir, snapshots[i : i + self.chunk_size]
+                    )
+                    for i in range(start, len(snapshots), self.chunk_size)
+                ]
+            result = {}
+            for node, dump_dir in dump_dirs.items():
+                parts[node] += [future.result() for future in futures[node]]
+                result[node] = (
+                    NodeDumps.concat(parts[node]) if parts[node] else NodeDumps.empty()
+                )
+                if self.use_cache and futures[node]:
+                    result[node].save(os.path.join(dump_dir, self.CACHE))
+        return result
@@ -0,0 +1,375 @@
+import csv
+import json
+import logging
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from uuid import UUID
+
+import numpy as np
+import pandas as pd
+
+from post.monitor.imports import (
+    get_info_from_nodes,
+    get_self_node_info,
+    get_transactions_times_values,
+)
+from post.network.manager import NodeTrust
+
+RESULT_DIR = "result"
+# Storages of nodes kept with simulation, <node>/storage for every node
+STORAGE_DIR = "storage"
+TX_FILE = "result_tx.csv"
+TRUST_FILE = "result_trust.csv"
+TRUST_VALUES_FILE = "result_trust_values.csv"
+
+# Columns of result_trust.csv written by monitor.py
+TRUST_COLUMNS = [
+    "trust_median",
+    "trust_mean",
+    "trust_std",
+    "trust_q1",
+    "trust_q3",
+    "trust_max",
+    "trust_min",
+]
+TX_COLUMNS = [
+    "tx_count",
+    "tx_median",
+    "tx_mean",
+    "tx_std",
+    "tx_q1",
+    "tx_q3",
+    "tx_max",
+    "tx_min",
+]
+SUMMARY_COLUMNS = TRUST_COLUMNS + TX_COLUMNS
+
+
+def simulation_number(name: str) -> int:
+    """
+    :param name: directory of simulation in form simulation_<number>
+    """
+    return int(name.split("_")[1])
+
+
+def _read_first_row(path: str) -> list[float]:
+    if not os.path.isfile(path):
+        return []
+    with open(path, "r") as f:
+        for row in csv.reader(f):
+            return [float(x) for x in row]
+    return []
+
+
+def last_trust_values(last_trust: dict[UUID, dict[UUID, int]]) -> list[float]:
+    """
+    Trust of every node seen by itself. Node without own trust gets mean of
+    trust seen by other nodes
+    :param last_trust: trust of all nodes seen by every node
+    """
+    trusts = []
+    node_to_cover = []
+    for node_id, trust in last_trust.items():
+        value = trust.get(node_id, None)
+        if value is None:
+            node_to_cover.append(node_id)
+        else:
+            trusts.append(value)
+    for node_id in node_to_cover:
+        values = [trust[node_id] for trust in last_trust.values() if node_id in trust]
+        if not values:
+            logging.warning(f"Node {node_id} not found in last trust")
+            values = [NodeTrust.BASIC_TRUST]
+        trusts.append(float(np.mean(values)))
+    return trusts
+
+
+def analyze_storage(storage_path: str) -> tuple[list[float], list[float]]:
+    """
+    Analyze storages of all nodes of simulation, as monitor.py does
+    :param storage_path: directory with <node>/storage of every node
+    :return: transaction times and last trust of nodes
+    """
+    transaction_times = []
+    last_trust = {}
+    for node in sorted(os.listdir(storage_path)):
+        storage_dir = os.path.join(storage_path, node, "storage")
+        if not os.path.isdir(storage_dir):
+            continue
+        transaction_times.extend(get_transactions_times_values(storage_dir))
+        last_trust[get_self_node_info(storage_dir)] = get_info_from_nodes(
+            storage_dir
+        )["trust"]
+    return transaction_times, last_trust_values(last_trust)
+
+
+def trust_statistics(trust_values: np.ndarray) -> list[float]:
+    """
+    :return: statistics in order of TRUST_COLUMNS
+    """
+    if len(trust_values) == 0:
+        return [np.nan] * len(TRUST_COLUMNS)
+    q1, median, q3 = np.percentile(trust_values, [25, 50, 75])
+    return [
+        median,
+        trust_values.mean(),
+        trust_values.std(),
+        q1,
+        q3,
+        trust_values.max(),
+        trust_values.min(),
+    ]
+
+
+def analyze_simulation(simulation_dir: str) -> dict[str, np.ndarray]:
+    """
+    Analyze one simulation. Storages of nodes are analyzed when they are kept
+    in storage directory of simulation, otherwise results written by
+    monitor.py are read
+    :return: transaction times, trust values and summary of simulation
+    """
+    storage_path = os.path.join(simulation_dir, STORAGE_DIR)
+    if os.path.isdir(storage_path):
+        tx_list, trust_list = analyze_storage(storage_path)
+        tx_times = np.array(tx_list, dtype=np.float64)
+        trust_values = np.array(trust_list, dtype=np.float64)
+        trust = trust_statistics(trust_values)
+    else:
+        result_dir = os.path.join(simulation_dir, RESULT_DIR)
+        tx_times = np.array(_read_first_row(os.path.join(result_dir, TX_FILE)))
+        trust_values = np.array(
+            _read_first_row(os.path.join(result_dir, TRUST_VALUES_FILE))
+        )
+        trust = _read_first_row(os.path.join(result_dir, TRUST_FILE))
+        trust += [np.nan] * (len(TRUST_COLUMNS) - len(trust))
+    if len(tx_times):
+        q1, median, q3 = np.percentile(tx_times, [25, 50, 75])
+        tx = [
+            len(tx_times),
+            median,
+            tx_times.mean(),
+            tx_times.std(),
+            q1,
+            q3,
+            tx_times.max(),
+            tx_times.min(),
+        ]
+    else:
+        tx = [0] + [np.nan] * (len(TX_COLUMNS) - 1)
+    return {
+        "tx_time": tx_times,
+        "trust_value": trust_values,
+        "summary": np.array(trust + tx, dtype=np.float64),
+    }
+
+
+class ResultsCatalog:
+    """
+    Results of all simulations of batch directory in one columnar dataset.
+    Simulations are analyzed in process pool. Catalog keeps signature of
+    storages of nodes or result files of every simulation, so only new or
+    changed simulations are analyzed again
+    """
+
+    CATALOG = "catalog.json"
+    DATASET = "results.npz"
+
+    batch_dir: str
+    workers: int | None
+    _catalog: dict[str, list]
+    _data: dict[str, np.ndarray]
+
+    def __init__(self, batch_dir: str, workers: int | None = None):
+        self.batch_dir = batch_dir
+        self.workers = workers
+        self._catalog = {}
+        self._data = {
+            "tx_simulation": np.zeros(0, dtype=np.int64),
+            "tx_time": np.zeros(0),
+            "trust_simulation": np.zeros(0, dtype=np.int64),
+            "trust_value": np.zeros(0),
+            "summary_simulation": np.zeros(0, dtype=np.int64),
+            "summary": np.zeros((0, len(SUMMARY_COLUMNS))),
+        }
+        catalog_path = os.path.join(batch_dir, self.CATALOG)
+        dataset_path = os.path.join(batch_dir, self.DATASET)
+        if os.path.isfile(catalog_path) and os.path.isfile(dataset_path):
+            with open(catalog_path, "r") as f:
+                self._catalog = json.load(f)
+            with np.load(dataset_path) as data:
+                self._data = {key: data[key] for key in self._data}
+
+    def simulations(self) -> list[str]:
+        names = []
+        for name in sorted(os.listdir(self.batch_dir)):
+            if not os.path.isdir(os.path.join(self.batch_dir, name)):
+                continue
+            try:
+                simulation_number(name)
+            except (IndexError, ValueError):
+                continue
+            names.append(name)
+        return names
+
+    def _signature(self, name: str) -> list:
+        storage_path = os.path.join(self.batch_dir, name, STORAGE_DIR)
+        if os.path.isdir(storage_path):
+            signature = []
+            for node in sorted(os.listdir(storage_path)):
+                storage_dir = os.path.join(storage_path, node, "storage")
+                if not os.path.isdir(storage_dir):
+                    continue
+                for filename in sorted(os.listdir(storage_dir)):
+                    stat = os.stat(os.path.join(storage_dir, filename))
+                    signature.append(
+                        [f"{node}/{filename}", stat.st_size, stat.st_mtime_ns]
+                    )
+            return signature
+        result_dir = os.path.join(self.batch_dir, name, RESULT_DIR)
+        signature = []
+        for filename in [TX_FILE, TRUST_FILE, TRUST_VALUES_FILE]:
+            path = os.path.join(result_dir, filename)
+            if os.path.isfile(path):
+                stat = os.stat(path)
+                signature.append([filename, stat.st_size, stat.st_mtime_ns])
+        return signature
+
+    def update(self) -> list[str]:
+        """
+        Analyze simulations added or changed since last update
+        :return: analyzed simulations
+        """
+        signatures = {name: self._signature(name) for name in self.simulations()}
+        changed = [
+            name
+            for name, signature in signatures.items()
+            if self._catalog.get(name) != signature
+        ]
+        removed = [name for name in self._catalog if name not in signatures]
+        if not changed and not removed:
+            return []
+        with ProcessPoolExecutor(self.workers) as executor:
+            results = list(
+                executor.map(
+                    analyze_simulation,
+                    [os.path.join(self.batch_dir, name) for name in changed],
+                )
+            )
+        self._merge(
+            [simulation_number(name) for name in changed + removed],
+            [simulation_number(name) for name in changed],
+            results,
+        )
+        # Missing storage files may be created while storages are opened
+        signatures.update({name: self._signature(name) for name in changed})
+        self._catalog = signatures
+        self._save()
+        return changed
+
+    def _merge(
+        self,
+        replaced: list[int],
+        numbers: list[int],
+        results: list[dict[str, np.ndarray]],
+    ) -> None:
+        data = self._data
+        for prefix, column in [
+            ("tx", "tx_time"),
+            ("trust", "trust_value"),
+            ("summary", "summary"),
+        ]:
+            keep = ~np.isin(data[f"{prefix}_simulation"], replaced)
+            values = [result[column] for result in results]
+            if prefix == "summary":
+                simulations = np.array(numbers, dtype=np.int64)
+                values = [
+                    data[column][keep],
+                    np.array(values).reshape(-1, len(SUMMARY_COLUMNS)),
+                ]
+            else:
+                simulations = np.concatenate(
+                    [np.full(len(v), n, dtype=np.int64) for n, v in zip(numbers, values)]
+                    or [np.zeros(0, dtype=np.int64)]
+                )
+                values = [data[column][keep]] + values
+            data[f"{prefix}_simulation"] = np.concatenate(
+                [data[f"{prefix}_simulation"][keep], simulations]
+            )
+            data[column] = np.concatenate(values)
+
+    def _save(self) -> None:
+        dataset_path = os.path.join(self.batch_dir, self.DATASET)
+        with open(dataset_path + ".tmp", "wb") as f:
+            np.savez(f, **self._data)
+        os.replace(dataset_path + ".tmp", dataset_path)
+        with open(os.path.join(self.batch_dir, self.CATALOG), "w") as f:
+            json.dump(self._catalog, f)
+
+    def tx_times(self) -> dict[int, list[float]]:
+        """
+        :return: transaction confirmation times of every simulation
+        """
+        return {
+            int(number): self._data["tx_time"][
+                self._data["tx_simulation"] == number
+            ].tolist()
+            for number in np.unique(self._data["tx_simulation"])
+        }
+
+    def summary(self) -> pd.DataFrame:
+        """
+        :return: trust and transaction time statistics indexed by simulation
+        """
+        return pd.DataFrame(
+            self._data["summary"],
+            columns=SUMMARY_COLUMNS,
+            index=pd.Index(self._data["summary_simulation"], name="simulation"),
+        ).sort_index()
+
+    def trust_rows(self) -> dict[int, list[float]]:
+        """
+        :return: row of result_trust.csv of every simulation having it
+        """
+        summary = self.summary()[TRUST_COLUMNS].dropna()
+        return {int(number): row.tolist() for number, row in summary.iterrows()}
+
+    def write_trust_table(self) -> str:
+        """
+        Write LaTeX table of trust statistics of simulations
+        :return: path of table
+        """
+        path = os.path.join(self.batch_dir, "result_trust.tex")
+        with open(path, "w") as file:
+            file.write("\\begin{center}\n")
+            file.write("\\begin{tabular}{|c|c|c|c|c|c|c|c|}\n")
+            file.write("\\hline\n")
+            file.write("Number & Median & Mean & Std & Q1 & Q3 & Max & Min \\\\\n")
+            for number, line in self.trust_rows().items():
+                file.write("\\hline\n")
+                file.write(f"{number} & " + " & ".join([str(x) for x in line]) + "\\\\\n")
+            file.write("\\hline\n")
+            file.write("\\end{tabular}\n")
+            file.write("\\end{center}\n")
+        return path
+
+    def write_summary(self) -> str:
+        """
+        Write statistics of all simulations to CSV file
+        :return: path of file
+        """
+        path = os.path.join(self.batch_dir, "result_summary.csv")
+        self.summary().to_csv(path)
+        return path
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Usage: python -m post.monitor.pipeline <path_to_simulation_dir>")
+        sys.exit(1)
+
+    catalog = ResultsCatalog(sys.argv[1])
+    analyzed = catalog.update()
+    print(f"Analyzed {len(analyzed)} simulations: {analyzed}")
+    print(f"Written {catalog.write_trust_table()}")
+    print(f"Written {catalog.write_summary()}")
@@ -1,8 +1,7 @@
-from base64 import b64encode
 from dataclasses import dataclass
 from hashlib import sha256
-from io import BytesIO
-from time import time
+from io import BytesIO, SEEK_CUR
+from typing import BinaryIO
 from uuid import UUID
 
 from cryptography.exceptions import InvalidSignature
@@ -11,24 +10,31 @@ from cryptography.hazmat.primitives.asymmetric.ed25519 import (
     Ed25519PublicKey,
 )
 
+from .clock import time
+from .merkle import merkle_root, merkle_proof
 from .transaction import Tx
 from .utils import decode_int, encode_int, read_bytes
+from .wire import WireEncoding
 
 
 @dataclass
 class Block:
+    MERKLE_VERSION = 2
+
     version: int
     timestamp: int
     prev_hash: bytes
     validator: UUID
     signature: bytes
     transactions: list[Tx]
+    merkle_root: bytes | None = None
 
     @classmethod
     def decode(cls, s: BytesIO):
         """
         Decode Block from bytes
-        <version><timestamp><prev_hash><validator><signature><n_transaction><transactions>
+        version 1: <version><timestamp><prev_hash><validator><signature><n_transaction><transactions>
+        version 2: <version><timestamp><prev_hash><merkle_root><validator><signature><n_transaction><transactions>
         :param s:
         :return:
         """
@@ -38,6 +44,8 @@ class Block:
         timestamp = decode_int(s, 4)
         # decode prev_hash (sha256: 256 bits = 32 bytes)
         prev_hash = read_bytes(s, 32)
+        # decode merkle_root (sha256: 32 bytes)
+        root = read_bytes(s, 32) if version >= cls.MERKLE_VERSION else None
         # decode validator (uuid: 16 bytes)
         validator = UUID(bytes_le=read_bytes(s, 16))
         # decode signature (64 bytes)
@@ -47,48 +55,204 @@ class Block:
         transactions = []
         for n in range(0, n_transaction):
             transactions.append(Tx.decode(s))
-        return cls(version, timestamp, prev_hash, validator, signature, transactions)
+        return cls(
+            version, timestamp, prev_hash, validator, signature, transactions, root
+        )
 
-    def encode(self) -> bytes:
+    @classmethod
+    def skip(cls, s: BinaryIO) -> int:
+        """
+        Move stream after encoded Block, transactions are skipped without decoding
+        :return: number of transactions in block
+        """
+        version = decode_int(s, 4)
+        # timestamp, prev_hash, merkle_root, validator and signature
+        s.seek(
+            4 + 32 + (32 if version >= cls.MERKLE_VERSION else 0) + 16 + 64, SEEK_CUR
+        )
+        n_transaction = decode_int(s, 4)
+        for n in range(0, n_transaction):
+            Tx.skip(s)
+        return n_transaction
+
+    def encode_header(self, with_signature: bool = True) -> bytes:
         out = []
         out += [encode_int(self.version, 4)]
         out += [encode_int(self.timestamp, 4)]
         out += [self.prev_hash]
+        if self.version >= self.MERKLE_VERSION:
+            out += [self.merkle_root]
         out += [self.validator.bytes_le]
-        out += [self.signature]
+        if with_signature:
+            out += [self.signature]
+        return b"".join(out)
+
+    def encode(self) -> bytes:
+        out = [self.encode_header()]
         out += [encode_int(len(self.transactions), 4)]
         if len(self.transactions) > 0:
             out += [b"".join([tx.encode() for tx in self.transactions])]
         return b"".join(out)
 
     def hash(self) -> bytes:
+        if self.version >= self.MERKLE_VERSION:
+            # transactions are committed by merkle root
+            return sha256(self.encode_header()).digest()
         return sha256(self.encode()).digest()
 
     def verify(self, public_key: Ed25519PublicKey) -> bool:
-        all_data = bytearray(self.encode())
-        data = b"".join([bytes(all_data[:56]) + bytes(all_data[120:])])
+        tx_hashes = [tx.hash() for tx in self.transactions]
+        if len(set(tx_hashes)) != len(tx_hashes):
+            # Transaction cannot be included twice
+            return False
+        if self.version >= self.MERKLE_VERSION:
+            if self.merkle_root != merkle_root(tx_hashes):
+                return False
+            data = self.encode_header(False)
+        else:
+            all_data = bytearray(self.encode())
+            data = b"".join([bytes(all_data[:56]) + bytes(all_data[120:])])
         try:
             public_key.verify(self.signature, data)
         except InvalidSignature:
             return False
         return True
 
-    def to_dict(self):
-        return {
+    def calculate_merkle_root(self) -> bytes:
+        return merkle_root([tx.hash() for tx in self.transactions])
+
+    def find_transaction(self, tx_hash: bytes) -> int | None:
+        for index, tx in enumerate(self.transactions):
+            if tx.hash() == tx_hash:
+                return index
+        return None
+
+    def prove_transaction(self, index: int) -> list[tuple[bytes, bool]]:
+        """
+        Inclusion proof of transaction at index, checked against merkle_root
+        """
+        return merkle_proof([tx.hash() for tx in self.transactions], index)
+
+    def header(self) -> "BlockHeader":
+        if self.version < self.MERKLE_VERSION:
+            raise Exception(
+                f"Block of version {self.version} cannot be stored as header"
+            )
+        return BlockHeader(
+            self.version,
+            self.timestamp,
+            self.prev_hash,
+            self.merkle_root,
+            self.validator,
+            self.signature,
+            len(self.transactions),
+        )
+
+    def to_dict(
+        self, headers_only: bool = False, encoding: WireEncoding = WireEncoding.LEGACY
+    ):
+        data = {
             "version": self.version,
             "timestamp": self.timestamp,
-            "prev_hash": b64encode(self.prev_hash).hex(),
+            "prev_hash": encoding.encode_bytes(self.prev_hash),
             "validator": self.validator.hex,
-            "signature": b64encode(self.signature).hex(),
-            "transactions": [
+            "signature": encoding.encode_bytes(self.signature),
+        }
+        if self.merkle_root is not None:
+            data["merkle_root"] = encoding.encode_bytes(self.merkle_root)
+        if headers_only:
+            data["n_transaction"] = len(self.transactions)
+        else:
+            data["transactions"] = [
                 transaction.to_dict() for transaction in self.transactions
-            ],
+            ]
+        return data
+
+
+@dataclass
+class BlockHeader:
+    """
+    Block without transactions, which are committed by merkle_root.
+    Only blocks of version 2 (Block.MERKLE_VERSION) can be stored as headers
+    """
+
+    version: int
+    timestamp: int
+    prev_hash: bytes
+    merkle_root: bytes
+    validator: UUID
+    signature: bytes
+    n_transaction: int
+
+    @classmethod
+    def decode(cls, s: BytesIO):
+        """
+        Decode BlockHeader from bytes
+        <version><timestamp><prev_hash><merkle_root><validator><signature><n_transaction>
+        :param s:
+        :return:
+        """
+        version = decode_int(s, 4)
+        timestamp = decode_int(s, 4)
+        prev_hash = read_bytes(s, 32)
+        root = read_bytes(s, 32)
+        validator = UUID(bytes_le=read_bytes(s, 16))
+        signature = read_bytes(s, 64)
+        n_transaction = decode_int(s, 4)
+        return cls(
+            version, timestamp, prev_hash, root, validator, signature, n_transaction
+        )
+
+    @classmethod
+    def skip(cls, s: BinaryIO) -> int:
+        """
+        Move stream after encoded BlockHeader
+        :return: number of transactions in block
+        """
+        s.seek(4 + 4 + 32 + 32 + 16 + 64, SEEK_CUR)
+        return decode_int(s, 4)
+
+    def encode_header(self, with_signature: bool = True) -> bytes:
+        out = []
+        out += [encode_int(self.version, 4)]
+        out += [encode_int(self.timestamp, 4)]
+        out += [self.prev_hash]
+        out += [self.merkle_root]
+        out += [self.validator.bytes_le]
+        if with_signature:
+            out += [self.signature]
+        return b"".join(out)
+
+    def encode(self) -> bytes:
+        return self.encode_header() + encode_int(self.n_transaction, 4)
+
+    def hash(self) -> bytes:
+        return sha256(self.encode_header()).digest()
+
+    def verify(self, public_key: Ed25519PublicKey) -> bool:
+        try:
+            public_key.verify(self.signature, self.encode_header(False))
+        except InvalidSignature:
+            return False
+        return True
+
+    def to_dict(
+        self, headers_only: bool = True, encoding: WireEncoding = WireEncoding.LEGACY
+    ):
+        return {
+            "version": self.version,
+            "timestamp": self.timestamp,
+            "prev_hash": encoding.encode_bytes(self.prev_hash),
+            "validator": self.validator.hex,
+            "signature": encoding.encode_bytes(self.signature),
+            "merkle_root": encoding.encode_bytes(self.merkle_root),
+            "n_transaction": self.n_transaction,
         }
 
 
 @dataclass
 class BlockCandidate:
-    _DEFAULT_VERSION = 1
+    _DEFAULT_VERSION = Block.MERKLE_VERSION
 
     version: int
     timestamp: int
@@ -120,17 +284,29 @@ class BlockCandidate:
         return cls(version, timestamp, None, None, transactions)
 
     def encode(self) -> bytes:
+        """
+        Encode data signed by validator
+        version 1: <version><timestamp><prev_hash><validator><n_transaction><transactions>
+        version 2: <version><timestamp><prev_hash><merkle_root><validator>
+        """
         if not self.prev_hash or not self.validator:
             raise Exception("Cannot encode without prev_hash and validator")
         out = []
         out += [encode_int(self.version, 4)]
         out += [encode_int(self.timestamp, 4)]
         out += [self.prev_hash]
+        if self.version >= Block.MERKLE_VERSION:
+            out += [self.calculate_merkle_root()]
+            out += [self.validator.bytes_le]
+            return b"".join(out)
         out += [self.validator.bytes_le]
         out += [encode_int(len(self.transactions), 4)]
         out += [b"".join([tx.encode() for tx in self.transactions])]
         return b"".join(out)
 
+    def calculate_merkle_root(self) -> bytes:
+        return merkle_root([tx.hash() for tx in self.transactions])
+
     def add_transaction(self, tx: Tx) -> None:
         self.transactions.append(tx)
 
@@ -148,4 +324,7 @@ class BlockCandidate:
             self.validator,
             signature,
             self.transactions,
+            self.calculate_merkle_root()
+            if self.version >= Block.MERKLE_VERSION
+            else None,
         )
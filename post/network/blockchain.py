@@ -1,45 +1,118 @@
 import logging
 import os
-import socket
-from base64 import b64encode, b64decode
 from io import BytesIO
-from threading import Thread
-from time import time
+from time import perf_counter
+from typing import Iterator
 from uuid import uuid4, UUID
 
-import requests
 
-from .manager import RejectedTransactionManager
-from .service import Blockchain, Node as NodeService, TransactionToVerify
-from .storage import encode_chain, decode_chain, TransactionTime
+from .block import Block, BlockHeader
+from .clock import time
+from .manager import RejectedTransactionManager, SettledTransactionManager
+from .service import (
+    Blockchain,
+    LightBlockchain,
+    Node as NodeService,
+    TransactionToVerify,
+)
+from .storage import (
+    encode_chain,
+    decode_chain,
+    decode_headers,
+    TransactionTime,
+    TransactionLatency,
+)
 from .transaction import Tx, TxToVerify, TxVerified
 from .node import Node, SelfNodeInfo, NodeType
 from .request import Request
-from .exception import PoTException
+from .resolver import resolver
+from . import transport
+from .transport import SenderThread
+from .exception import (
+    PoTException,
+    BlockNotFoundException,
+    BlockchainSyncException,
+)
 from .trust import NodeTrustChange, TrustChangeType
+from .utils import lazy_property, is_loaded
+from .wire import WireEncoding, ENCODING_HEADER, BINARY_MIMETYPE
 
 
 class PoST:
-    blockchain: Blockchain
-    nodes: NodeService
-    tx_to_verified: TransactionToVerify
-    self_node: SelfNodeInfo
-    txs_rejected: RejectedTransactionManager
-    tx_time_storage: TransactionTime
+    """
+    Node of PoST network. Storages are loaded on first access, so workers
+    load only storages they use
+    """
+
+    SYNC_CHUNK_SIZE = 100
+    TX_SETTLEMENT_ALL = "all"
+    TX_SETTLEMENT_MAJORITY = "majority"
+
+    tx_settlement: str
+    tx_vote_timeout: float
+    light: bool
 
     def __init__(self):
-        self.self_node = SelfNodeInfo()
-        self.blockchain = Blockchain()
-        self.nodes = NodeService()
-        self.tx_to_verified = TransactionToVerify()
-        self.txs_rejected = RejectedTransactionManager()
-        self.tx_time_storage = TransactionTime()
+        self.light = (
+            os.getenv("LIGHT_NODE") == "1"
+            and os.getenv("NODE_TYPE", "").upper() == NodeType.SENSOR.name
+        )
+        self.tx_settlement = os.getenv("TX_SETTLEMENT", self.TX_SETTLEMENT_ALL)
+        self.tx_vote_timeout = float(os.getenv("TX_VOTE_TIMEOUT", 30))
+
+    @lazy_property
+    def self_node(self) -> SelfNodeInfo:
+        return SelfNodeInfo()
+
+    @lazy_property
+    def blockchain(self) -> Blockchain | LightBlockchain:
+        return LightBlockchain() if self.light else Blockchain()
+
+    @lazy_property
+    def nodes(self) -> NodeService:
+        return NodeService(self.light)
+
+    @lazy_property
+    def tx_to_verified(self) -> TransactionToVerify:
+        return TransactionToVerify()
+
+    @lazy_property
+    def txs_rejected(self) -> RejectedTransactionManager:
+        return RejectedTransactionManager()
+
+    @lazy_property
+    def txs_settled(self) -> SettledTransactionManager:
+        return SettledTransactionManager()
+
+    @lazy_property
+    def tx_time_storage(self) -> TransactionTime:
+        return TransactionTime()
+
+    @lazy_property
+    def tx_latency_storage(self) -> TransactionLatency:
+        return TransactionLatency()
+
+    def log_load_times(self) -> None:
+        load_times = dict(self.__dict__.get("load_times", {}))
+        if is_loaded(self, "nodes"):
+            for name, elapsed in self.nodes.__dict__.get("load_times", {}).items():
+                load_times["nodes." + name] = elapsed
+        logging.info(
+            "Loaded storages: "
+            + ", ".join(
+                f"{name} {elapsed * 1000:.1f} ms" for name, elapsed in load_times.items()
+            )
+        )
 
     def load(self, only_from_file: bool = False) -> None:
-        hostname = socket.gethostname()
-        ip = socket.gethostbyname(hostname)
-        genesis_hostname = os.getenv("GENESIS_NODE")
-        genesis_ip = socket.gethostbyname(genesis_hostname)
+        start = perf_counter()
+        self._load(only_from_file)
+        logging.info(f"Node loaded in {(perf_counter() - start) * 1000:.1f} ms")
+        self.log_load_times()
+
+    def _load(self, only_from_file: bool) -> None:
+        ip = resolver.self_ip()
+        genesis_ip = resolver.resolve(os.getenv("GENESIS_NODE"))
 
         name = "genesis" if ip == genesis_ip else "node"
         logging.debug(f"=== Running as {name} ===")
@@ -49,9 +122,10 @@ class PoST:
             self.nodes.add(node)
             self.nodes.node_trust.add_new_node_trust(node)
 
-        self.blockchain.refresh()
-        self.nodes.refresh()
-        self.tx_to_verified.refresh()
+        # Storages not loaded yet will be loaded from files on first access
+        for name in ["blockchain", "nodes", "tx_to_verified"]:
+            if is_loaded(self, name):
+                getattr(self, name).refresh()
 
         if only_from_file:
             return
@@ -77,7 +151,7 @@ class PoST:
     """
 
     def is_self_node_is_registered(self, genesis_ip: str) -> bool:
-        response = requests.get(
+        response = transport.get(
             f"http://{genesis_ip}:{5000}/node/{self.self_node.identifier.hex}"
         )
         return response.status_code == 200
@@ -88,7 +162,7 @@ class PoST:
         node = self.nodes.find_by_identifier(self.self_node.identifier)
         data = {"identifier": node.identifier.hex, "port": 5000, "type": node.type.name}
         logging.info("Registering node")
-        response = requests.post(f"http://{genesis_ip}:{5000}/node/register", json=data)
+        response = transport.post(f"http://{genesis_ip}:{5000}/node/register", json=data)
         if response.status_code != 200:
             raise Exception(
                 f"Cannot register node in genesis node: {genesis_ip}:{5000}. Code: {response.status_code} "
@@ -97,17 +171,169 @@ class PoST:
         self.update_from_validator_node(genesis_ip)
 
     def update_from_validator_node(self, genesis_ip: str) -> None:
-        response = requests.get(f"http://{genesis_ip}:{5000}/node/update")
-        if response.status_code != 200:
-            raise Exception(
-                f"Cannot update from genesis node: {genesis_ip}:{5000} Code: {response.status_code} "
-                f"Response data: " + response.text
-            )
-        response_json = response.json()
-        self.blockchain.load_from_bytes(
-            b64decode(bytes.fromhex(response_json.get("blockchain")))
+        if self.light:
+            self.update_headers_from_validator_node(genesis_ip)
+            return
+        response_json, encoding = Request.get_node_update(
+            genesis_ip, 5000, {"blockchain": "0"}
         )
         self.nodes.update_from_json(response_json.get("nodes"))
+        if "blockchain" in response_json:
+            # Node does not support sync protocol
+            self.blockchain.load_from_bytes(
+                encoding.decode_bytes(response_json.get("blockchain"))
+            )
+            return
+        try:
+            self.sync_blockchain()
+        except BlockchainSyncException as e:
+            logging.warning(f"Cannot synchronize blockchain, downloading whole: {e}")
+            response_json, encoding = Request.get_node_update(
+                genesis_ip, 5000, {"blockchain": "1"}
+            )
+            self.blockchain.load_from_bytes(
+                encoding.decode_bytes(response_json.get("blockchain"))
+            )
+
+    def update_headers_from_validator_node(self, genesis_ip: str) -> None:
+        """
+        Update nodes and block headers of light node from validator.
+        Headers are verified (prev_hash linkage and validator signature) before storing
+        """
+        params = {"blockchain": "headers"}
+        if self.blockchain.height() > 0:
+            params["lastBlock"] = self.blockchain.get_last_block().hash().hex()
+        try:
+            response_json, encoding = Request.get_node_update(genesis_ip, 5000, params)
+        except Exception as e:
+            if "lastBlock" not in params:
+                raise e
+            logging.warning(f"Cannot get headers after local tip, downloading all. {e}")
+            params.pop("lastBlock")
+            response_json, encoding = Request.get_node_update(genesis_ip, 5000, params)
+        self.nodes.update_from_json(response_json.get("nodes"))
+        headers = decode_headers(encoding.decode_bytes(response_json.get("headers")))
+        if "lastBlock" in params:
+            self._verify_blocks(self.blockchain.get_last_block().hash(), headers)
+            self.blockchain.append_blocks(headers)
+        else:
+            self._verify_blocks(None, headers)
+            self.blockchain.set_headers(headers)
+        logging.info(f"Updated {len(headers)} block headers")
+
+    def sync_blockchain(self, validators: list[Node] | None = None) -> int:
+        """
+        Download blocks missing after local tip from validators (in chunks, from
+        several validators at once), verify and append them to local chain
+        :param validators: nodes to download from, by default all other validators
+        :return: number of appended blocks
+        :raise BlockchainSyncException: when some blocks cannot be downloaded
+        """
+        if validators is None:
+            validators = [
+                validator
+                for validator in self.nodes.get_validator_nodes()
+                if validator.identifier != self.self_node.identifier
+            ]
+        tips = {}
+        for validator in validators:
+            try:
+                tips[validator.identifier] = Request.get_blockchain_tip(
+                    validator.host, validator.port
+                ).get("height")
+            except Exception as e:
+                logging.warning(f"Cannot get tip of node {validator.identifier.hex}: {e}")
+        if not tips:
+            logging.warning("No validator available to synchronize blockchain")
+            return 0
+        remote_height = max(tips.values())
+        sources = [
+            validator for validator in validators
+            if tips.get(validator.identifier) == remote_height
+        ]
+
+        local_height = self.blockchain.height()
+        last_block = self.blockchain.get_last_block() if local_height > 0 else None
+        try:
+            blocks = self._fetch_blocks(
+                sources,
+                last_block.hash().hex() if last_block else None,
+                remote_height - local_height,
+            )
+        except BlockNotFoundException as e:
+            logging.warning(f"Local chain diverged, downloading whole blockchain: {e}")
+            blocks = self._fetch_blocks(sources, None, remote_height)
+            self._verify_blocks(None, blocks)
+            self.blockchain.load_from_bytes(encode_chain(blocks))
+            return len(blocks)
+        self._verify_blocks(last_block.hash() if last_block else None, blocks)
+        self.blockchain.append_blocks(blocks)
+        logging.info(f"Synchronized {len(blocks)} blocks from {len(sources)} validators")
+        return len(blocks)
+
+    def _fetch_blocks(
+        self, sources: list[Node], last_block: str | None, count: int
+    ) -> list[Block]:
+        if count <= 0:
+            return []
+        chunks: dict[int, list[Block]] = {}
+        offsets = list(range(0, count, self.SYNC_CHUNK_SIZE))
+
+        def fetch(offset: int, source: Node):
+            try:
+                data = Request.get_blockchain_sync(
+                    source.host, source.port, last_block, offset, self.SYNC_CHUNK_SIZE
+                )
+                chunks[offset] = decode_chain(data) if data else []
+            except BlockNotFoundException as e:
+                chunks[offset] = e
+            except Exception as e:
+                logging.warning(
+                    f"Cannot get blocks from offset {offset} from node {source.identifier.hex}: {e}"
+                )
+
+        threads = []
+        for i, offset in enumerate(offsets):
+            th = SenderThread(target=fetch, args=[offset, sources[i % len(sources)]])
+            th.start()
+            threads.append(th)
+        for thread in threads:
+            thread.join()
+
+        blocks = []
+        for i, offset in enumerate(offsets):
+            # Retry missing chunk with other sources
+            for source in sources[i % len(sources) + 1:] + sources[: i % len(sources)]:
+                if offset in chunks:
+                    break
+                fetch(offset, source)
+            chunk = chunks.get(offset)
+            if isinstance(chunk, BlockNotFoundException):
+                raise chunk
+            if chunk is None:
+                raise BlockchainSyncException(
+                    f"Cannot download blocks from offset {offset} from any validator"
+                )
+            blocks += chunk
+        return blocks
+
+    def _verify_blocks(self, prev_hash: bytes | None, blocks: list[Block]) -> None:
+        public_keys = {}
+        for block in blocks:
+            if prev_hash is not None and block.prev_hash != prev_hash:
+                raise PoTException("Block hash does not equal prev hash", 400)
+            if block.validator not in public_keys:
+                if block.validator == self.self_node.identifier:
+                    public_keys[block.validator] = self.self_node.public_key
+                else:
+                    public_keys[block.validator] = self._get_node_by_identifier(
+                        block.validator
+                    ).get_public_key()
+            if not block.verify(public_keys[block.validator]):
+                raise PoTException(
+                    f"Invalid signature of block created by {block.validator.hex}", 400
+                )
+            prev_hash = block.hash()
 
     def send_transaction_populate(self, uuid: UUID, tx: Tx):
         tx_encoded = tx.encode()
@@ -143,10 +369,19 @@ class PoST:
                 f"Transaction not find in to verify {uuid.hex} from "
                 f"{', '.join([uuid.hex for uuid in self.tx_to_verified.all().keys()])}"
             )
+            settled_result = (
+                self.txs_settled.find_result(uuid)
+                if self.tx_settlement == self.TX_SETTLEMENT_MAJORITY
+                else None
+            )
+            if settled_result is not None:
+                self._add_late_verification_result(
+                    uuid, node, result, settled_result
+                )
             tx_verified = self.blockchain.find_tx_verified(uuid)
-            if tx_verified:
+            if tx_verified or settled_result:
                 raise PoTException("Transaction already verified", 418)
-            if self.txs_rejected.has(uuid):
+            if self.txs_rejected.has(uuid) or settled_result is False:
                 raise PoTException("Transaction was already rejected", 418)
 
             tx_bytes = None
@@ -179,50 +414,119 @@ class PoST:
         logging.info(
             f"Printing result verification for transaction {uuid.hex}: {tx_to_verified.voting}"
         )
-        if len(tx_to_verified.voting) == self.nodes.count_validator_nodes():
-            logging.info(f"Transaction {uuid.hex} voting")
-            tx_to_verified = self.tx_to_verified.pop(uuid)
-            trust_change = TrustChangeType.TRANSACTION_VALIDATED
-            nodes_positive, nodes_negative = tx_to_verified.get_voters_id_by_result()
-            if tx_to_verified.is_voting_positive():
-                tx_verified = tx_to_verified.get_verified_tx()
-                self.blockchain.add_new_transaction(uuid, tx_verified)
-                self.send_new_transaction_verified(uuid, tx_verified)
-                self.send_multiple_trust_change(
-                    nodes_positive, trust_change, trust_change, uuid.hex
-                )
-                self.send_multiple_trust_change(
-                    nodes_negative, trust_change, -10 * trust_change.value, uuid.hex
-                )
-                self.tx_time_storage.append(uuid, True, time() - tx_verified.tx.timestamp)
-                if self.tx_to_verified.find(uuid):
-                    logging.warning(f"Transaction {uuid.hex} is still in to verify. Removing it")
-                    self.tx_to_verified.pop(uuid)
-            else:
-                logging.info(f"Transaction {uuid.hex} was rejected")
-                self.txs_rejected.add(uuid)
-                if self.tx_to_verified.find(uuid):
-                    logging.warning(f"Transaction {uuid.hex} is still in to verify. Removing it")
-                    self.tx_to_verified.pop(uuid)
-                self.send_multiple_trust_change(
-                    nodes_positive, trust_change, -10 * trust_change.value, uuid.hex
-                )
-                self.send_multiple_trust_change(
-                    nodes_negative, trust_change, trust_change.value, uuid.hex
-                )
-                self.tx_time_storage.append(uuid, False, time() - tx_to_verified.tx.timestamp)
+        if self._is_transaction_ready_to_settle(tx_to_verified):
+            self._settle_transaction(uuid)
+
+    def _is_transaction_ready_to_settle(self, tx_to_verified: TxToVerify) -> bool:
+        n_validators = self.nodes.count_validator_nodes()
+        if self.tx_settlement == self.TX_SETTLEMENT_MAJORITY:
+            return tx_to_verified.is_ready_to_vote(n_validators)
+        return len(tx_to_verified.voting) >= n_validators
+
+    def settle_timed_out_transactions(self) -> list[UUID]:
+        """
+        Settle transactions waiting for missing votes longer than TX_VOTE_TIMEOUT
+        with votes already given. Used only in majority settlement mode
+        :return: identifiers of settled transactions
+        """
+        if self.tx_settlement != self.TX_SETTLEMENT_MAJORITY:
+            return []
+        timeout = time() - self.tx_vote_timeout
+        settled = []
+        for uuid, tx_to_verified in list(self.tx_to_verified.all().items()):
+            if tx_to_verified.time > timeout or len(tx_to_verified.voting) == 0:
+                continue
+            logging.warning(
+                f"Transaction {uuid.hex} voting timed out with "
+                f"{len(tx_to_verified.voting)}/{self.nodes.count_validator_nodes()} votes"
+            )
+            try:
+                self._settle_transaction(uuid)
+            except KeyError:
+                # Settled in the meantime by other process
+                continue
+            settled.append(uuid)
+        return settled
+
+    def _settle_transaction(self, uuid: UUID) -> None:
+        logging.info(f"Transaction {uuid.hex} voting")
+        tx_to_verified = self.tx_to_verified.pop(uuid)
+        trust_change = TrustChangeType.TRANSACTION_VALIDATED
+        nodes_positive, nodes_negative = tx_to_verified.get_voters_id_by_result()
+        if tx_to_verified.is_voting_positive():
+            tx_verified = tx_to_verified.get_verified_tx()
+            self._record_settled_votes(uuid, True, nodes_positive + nodes_negative)
+            self.blockchain.add_new_transaction(uuid, tx_verified)
+            self.send_new_transaction_verified(uuid, tx_verified)
+            self.send_multiple_trust_change(
+                nodes_positive, trust_change, trust_change, uuid.hex
+            )
+            self.send_multiple_trust_change(
+                nodes_negative, trust_change, -10 * trust_change.value, uuid.hex
+            )
+            self.tx_time_storage.append(uuid, True, time() - tx_verified.tx.timestamp)
+        else:
+            logging.info(f"Transaction {uuid.hex} was rejected")
+            self._record_settled_votes(uuid, False, nodes_positive + nodes_negative)
+            self.txs_rejected.add(uuid)
+            self.send_multiple_trust_change(
+                nodes_positive, trust_change, -10 * trust_change.value, uuid.hex
+            )
+            self.send_multiple_trust_change(
+                nodes_negative, trust_change, trust_change.value, uuid.hex
+            )
+            self.tx_time_storage.append(uuid, False, time() - tx_to_verified.tx.timestamp)
+        if self.tx_to_verified.find(uuid):
+            logging.warning(f"Transaction {uuid.hex} is still in to verify. Removing it")
+            self.tx_to_verified.pop(uuid)
+
+    def _record_settled_votes(
+        self, uuid: UUID, result: bool, voters: list[UUID]
+    ) -> None:
+        # Votes can come after settlement only when settled by majority
+        if self.tx_settlement == self.TX_SETTLEMENT_MAJORITY:
+            self.txs_settled.add(uuid, result, voters)
+
+    def _add_late_verification_result(
+        self, uuid: UUID, node: Node, result: bool, settled_result: bool
+    ) -> None:
+        """
+        Change trust of validator which voted after transaction was settled
+        the same way as if vote was counted. Every voter is accounted only once
+        """
+        if self.txs_settled.has_voter(uuid, node.identifier):
+            logging.info(
+                f"Vote of node {node.identifier.hex} for transaction {uuid.hex} already accounted"
+            )
+            return
+        logging.info(
+            f"Late vote {result} of node {node.identifier.hex} for settled transaction {uuid.hex}"
+        )
+        self.txs_settled.add(uuid, settled_result, [node.identifier])
+        trust_change = TrustChangeType.TRANSACTION_VALIDATED
+        change = trust_change.value if result == settled_result else -10 * trust_change.value
+        self.send_multiple_trust_change([node], trust_change, change, uuid.hex)
 
     def send_new_transaction_verified(self, identifier: UUID, tx_verified: TxVerified):
-        data = str(tx_verified)
+        data = tx_verified.encode()
 
         def send(node: Node):
             logging.info(
-                f"Sending verified transaction {identifier.hex} to node {node.identifier.hex} {data}"
+                f"Sending verified transaction {identifier.hex} to node {node.identifier.hex}"
             )
-            response = requests.post(
-                f"http://{node.host}:{node.port}/transaction/{identifier.hex}/verified",
+            url = f"http://{node.host}:{node.port}/transaction/{identifier.hex}/verified"
+            response = transport.post(
+                url,
                 data=data,
+                headers={
+                    "Content-Type": BINARY_MIMETYPE,
+                    **WireEncoding.BASE64.to_headers(),
+                },
             )
+            if response.status_code == 400 and ENCODING_HEADER not in response.headers:
+                # Node does not negotiate encoding, so it does not support binary
+                # format, fallback to string format
+                response = transport.post(url, data=str(tx_verified))
             if response.status_code != 200:
                 logging.error(
                     f"Error while sending verified transaction {identifier.hex} to node {node.identifier.hex}. Error: {response.text}"
@@ -232,7 +536,7 @@ class PoST:
         for node in self.nodes.all():
             if node.identifier == self.self_node.identifier:
                 continue
-            th = Thread(target=send, args=[node])
+            th = SenderThread(target=send, args=[node])
             th.start()
             threads.append(th)
         while True:
@@ -271,7 +575,7 @@ class PoST:
             logging.info(
                 f"Sending validators list to node {node.identifier.hex} {data}"
             )
-            response = requests.post(
+            response = transport.post(
                 f"http://{node.host}:{node.port}/node/validator/new", json=data
             )
             if response.status_code != 200:
@@ -283,7 +587,7 @@ class PoST:
         for node in self.nodes.all():
             if node.identifier == self.self_node.identifier:
                 continue
-            th = Thread(target=send, args=[node])
+            th = SenderThread(target=send, args=[node])
             th.start()
             threads.append(th)
         while True:
@@ -293,6 +597,32 @@ class PoST:
                 if not thread.is_alive():
                     threads.remove(thread)
 
+    def publish_block(self, block: Block) -> None:
+        """
+        Send block created by self node to other nodes and reward self node
+        """
+
+        def send(node: Node):
+            try:
+                Request.send_blockchain_new_block(node.host, node.port, block.encode())
+            except Exception as e:
+                logging.error(f"Error while sending block to node {node.identifier.hex}: {e}")
+
+        self_node = self.nodes.find_by_identifier(self.self_node.identifier)
+        for node in self.nodes.all():
+            if node.identifier == self_node.identifier:
+                continue
+            logging.debug(
+                f"Sending new block to host: {node.host}:{node.port} - starting thread"
+            )
+            SenderThread(target=send, args=[node]).start()
+
+        self.change_node_trust(
+            self_node,
+            TrustChangeType.BLOCK_CREATED,
+            additional_data=block.signature.hex(),
+        )
+
     def change_node_trust(
         self,
         change_node: Node,
@@ -333,7 +663,7 @@ class PoST:
         for node in self.nodes.all():
             if node.identifier == self.self_node.identifier:
                 continue
-            th = Thread(target=send_data, args=[node])
+            th = SenderThread(target=send_data, args=[node])
             th.start()
             threads.append(th)
         while True:
@@ -347,6 +677,38 @@ class PoST:
     API methods
     """
 
+    BLOCKCHAIN_FORMATS = ["json", "ndjson", "binary"]
+
+    def blockchain_get(
+        self, data: dict
+    ) -> tuple[Iterator[Block | BlockHeader | bytes], bool, str]:
+        """
+        Validate query of blockchain endpoint
+        :param data: request args (from_height, limit, headers, format)
+        :return: selected blocks read lazily from storage (encoded for binary
+            format, headers for headers view), headers only flag and response format
+        """
+        from_height = self._validate_create_int(data.get("from_height", 0), "from_height")
+        limit = data.get("limit")
+        if limit is not None:
+            limit = self._validate_create_int(limit, "limit")
+        headers_only = data.get("headers", "0") in ["1", "true", "True"]
+        response_format = data.get("format", "json")
+        if response_format not in self.BLOCKCHAIN_FORMATS:
+            raise PoTException(
+                f"Unknown format {response_format}. Available formats: "
+                + ", ".join(self.BLOCKCHAIN_FORMATS),
+                400,
+            )
+        if headers_only and response_format == "binary":
+            raise PoTException("Headers view is not available in binary format", 400)
+        if self.light and not headers_only:
+            raise PoTException("Light node stores only block headers", 400)
+        blocks = self.blockchain.slice(
+            from_height, limit, headers_only, response_format == "binary"
+        )
+        return blocks, headers_only, response_format
+
     def transaction_new(self, data: bytes, request_addr: str) -> dict:
         self._validate_if_i_am_validator()
         b = BytesIO(data)
@@ -368,11 +730,16 @@ class PoST:
         )
         return {"id": uuid.hex}
 
-    def transaction_verified_new(self, identifier: str, data: str, request_addr: str):
+    def transaction_verified_new(
+        self, identifier: str, data: str | bytes, request_addr: str
+    ):
         tx_id = self._validate_create_uuid(identifier)
         self._validate_request_from_validator(request_addr)
-        tx_verified = TxVerified.from_str(data)
-        self.blockchain.txs_verified.add(tx_id, tx_verified)
+        if isinstance(data, bytes):
+            tx_verified = TxVerified.decode(BytesIO(data))
+        else:
+            tx_verified = TxVerified.from_str(data)
+        self.blockchain.add_new_transaction(tx_id, tx_verified)
 
     def block_new(self, data: bytes, request_addr: str):
         self._validate_request_from_validator(request_addr)
@@ -394,7 +761,7 @@ class PoST:
             f"Transaction not find {identifier} from "
             f"{', '.join([uuid.hex for uuid in self.tx_to_verified.all().keys()])}"
         )
-        tx_verified = self.blockchain.txs_verified.find(uuid)
+        tx_verified = self.blockchain.find_tx_verified(uuid)
         if tx_verified:
             tx_verified.tx.encode()
         raise PoTException(f"Cannot find transaction of given id {identifier}", 404)
@@ -427,6 +794,8 @@ class PoST:
         block = decode_chain(data)[0]
         if block.prev_hash != self.blockchain.get_last_block().hash():
             raise PoTException("Prev hash does not match hash of previous block", 400)
+        if self.light:
+            self._verify_blocks(None, [block])
         if self.nodes.is_validator(self.self_node.get_node()):
             self._register_new_block_validator(block)
         else:
@@ -434,11 +803,7 @@ class PoST:
             for b in self.blockchain.all():
                 if b.hash() == block_hash:
                     return "Block is already in blockchain", 200
-        txs_verified_ids = []
-        for tx_id, tx_verified in self.blockchain.txs_verified.all().items():
-            if tx_verified.tx in block.transactions:
-                txs_verified_ids.append(tx_id)
-        self.blockchain.txs_verified.delete(txs_verified_ids)
+        self.blockchain.remove_block_transactions(block)
         self.blockchain.add(block)
         return "", 204
 
@@ -508,22 +873,19 @@ class PoST:
             if node.identifier == new_node.identifier or node.identifier == self.self_node.identifier:
                 continue
             logging.info(f"Populating node {new_node.identifier.hex} to node {node.identifier}")
-            res = requests.post(f"http://{node.host}:{node.port}/node/populate-new", json=data_to_send, timeout=15)
+            res = transport.post(f"http://{node.host}:{node.port}/node/populate-new", json=data_to_send, timeout=15)
             logging.info(f"Response of populate {res.status_code} {res.text}")
         return data_to_send
 
-    def node_update(self, data: dict) -> dict | tuple:
+    def node_update(
+        self, data: dict, encoding: WireEncoding = WireEncoding.LEGACY
+    ) -> dict | tuple:
         self._validate_if_i_am_validator()
         logging.info(f"Updating nodes data {data}")
         last_block_hash = data.get("lastBlock", None)
         excluded_nodes = data.get("nodeIdentifiers", [])
         if last_block_hash is not None:
-            blocks_to_show = []
-            for block in self.blockchain.blocks[::-1]:
-                blocks_to_show.append(block)
-                if block.prev_hash == last_block_hash:
-                    break
-            blocks_to_show.reverse()
+            blocks_to_show = self._get_blocks_after(last_block_hash)
         else:
             blocks_to_show = self.blockchain.all()
         if excluded_nodes:
@@ -533,11 +895,89 @@ class PoST:
                     nodes_to_show.append(node)
         else:
             nodes_to_show = self.nodes.all()
+        response = {"nodes": self.nodes.prepare_nodes_info(nodes_to_show)}
+        match data.get("blockchain", "1"):
+            case "0":
+                pass
+            case "headers":
+                try:
+                    headers = [block.header() for block in blocks_to_show]
+                except Exception as e:
+                    raise PoTException(str(e), 409)
+                response["headers"] = encoding.encode_bytes(encode_chain(headers))
+            case _:
+                response["blockchain"] = encoding.encode_bytes(
+                    encode_chain(blocks_to_show)
+                )
+        return response
+
+    def blockchain_tip(self) -> dict:
+        height = self.blockchain.height()
         return {
-            "blockchain": b64encode(encode_chain(blocks_to_show)).hex(),
-            "nodes": self.nodes.prepare_nodes_info(nodes_to_show),
+            "height": height,
+            "hash": self.blockchain.get_last_block().hash().hex() if height > 0 else None,
         }
 
+    def blockchain_sync(self, data: dict) -> list[Block]:
+        """
+        Return blocks after block of hash lastBlock (from genesis if not given)
+        :param data: request args (lastBlock, offset, limit)
+        :return:
+        """
+        offset = self._validate_create_int(data.get("offset", 0), "offset")
+        limit = self._validate_create_int(
+            data.get("limit", self.SYNC_CHUNK_SIZE), "limit"
+        )
+        last_block_hash = data.get("lastBlock")
+        if last_block_hash is None:
+            blocks = self.blockchain.all()
+        else:
+            blocks = self._get_blocks_after(last_block_hash)
+        return blocks[offset : offset + limit]
+
+    def blockchain_proof(
+        self, tx_hash: str, encoding: WireEncoding = WireEncoding.LEGACY
+    ) -> dict:
+        """
+        Merkle inclusion proof of transaction of given hash (hex of sha256 of encoded transaction)
+        :param tx_hash:
+        :param encoding: encoding of bytes in block header
+        :return:
+        """
+        try:
+            tx_hash_bytes = bytes.fromhex(tx_hash)
+        except ValueError:
+            raise PoTException(f"Transaction hash {tx_hash} is not valid hex", 400)
+        position = self.blockchain.find_transaction(tx_hash_bytes)
+        if position is None:
+            raise PoTException(f"Transaction {tx_hash} not found in blockchain", 404)
+        height, index = position
+        block = self.blockchain.all()[height]
+        if block.merkle_root is None:
+            raise PoTException(
+                f"Block of version {block.version} has no merkle root", 409
+            )
+        return {
+            "height": height,
+            "hash": block.hash().hex(),
+            "header": block.to_dict(True, encoding),
+            "index": index,
+            "proof": [
+                {"hash": sibling.hex(), "left": is_left}
+                for sibling, is_left in block.prove_transaction(index)
+            ],
+        }
+
+    def _get_blocks_after(self, block_hash: str) -> list[Block]:
+        try:
+            block_hash = bytes.fromhex(block_hash)
+        except ValueError:
+            raise PoTException(f"Block hash {block_hash} is not valid hex", 400)
+        blocks = self.blockchain.blocks_after(block_hash)
+        if blocks is None:
+            raise PoTException(f"Block {block_hash.hex()} not found", 409)
+        return blocks
+
     def node_validator_agreement_get(self, remote_addr: str) -> dict:
         self._validate_if_i_am_validator()
         # self._validate_request_from_validator(remote_addr)
@@ -577,12 +1017,52 @@ class PoST:
         self.change_node_trust(
             leader, TrustChangeType.AGREEMENT_STARTED, additional_data=node_ids
         )
+        SenderThread(target=self.validate_agreement, daemon=True).start()
         return {
             "isStarted": is_started,
             "leader": self.nodes.get_agreement_leader().hex,
             "list": [node.hex for node in self.nodes.get_agreement_list()],
         }
 
+    def validate_agreement(self) -> bool | None:
+        """
+        Validate started agreement and send vote to other validators
+        :return: vote or None if node is not validator, agreement is not started
+        or node has already voted
+        """
+        self_node = self.nodes.find_by_identifier(self.self_node.identifier)
+        if (
+            self_node is None
+            or not self.nodes.is_validator(self_node)
+            or not self.nodes.is_agreement_started()
+            or self.nodes.validator_agreement_result.find(self_node.identifier)
+            is not None
+        ):
+            return None
+        error = self.nodes.check_agreement_proposal(self.nodes.get_agreement_list())
+        if error is not None:
+            logging.warning(f"Agreement is not valid: {error}")
+        result = error is None
+        logging.info(f"Result of agreement validation: {result}")
+        if not self.nodes.validator_agreement_result.add(self_node.identifier, result):
+            logging.info("Agreement was already validated by other process")
+            return None
+        vote_data = {"result": result}
+        self._send_to_validators(
+            lambda node: Request.send_validator_agreement_vote(
+                node.host, node.port, vote_data
+            )
+        )
+        self._end_agreement_if_voted()
+        return result
+
+    def _end_agreement_if_voted(self) -> None:
+        if (
+            self.nodes.is_agreement_voting_ended()
+            and self.nodes.get_agreement_leader() == self.self_node.identifier
+        ):
+            self.validator_agreement_end()
+
     def node_validator_agreement_list_set(self, uuids: list[UUID]):
         valid_id_nodes = set(uuids).intersection(set(self.nodes.all()))
         if len(valid_id_nodes) == len(uuids):
@@ -599,20 +1079,26 @@ class PoST:
             raise PoTException("Missing vote result", 400)
         if not isinstance(vote, bool):
             raise PoTException("Vote result must be of type bool", 400)
-        if self.nodes.validator_agreement_result.find(node.identifier):
+        if not self.nodes.validator_agreement_result.add(node.identifier, vote):
             raise PoTException("Vote result is already saved", 400)
-        self.nodes.validator_agreement_result.add(node.identifier, vote)
-        if (
-            self.nodes.is_agreement_voting_ended()
-            and self.nodes.get_agreement_leader() == self.self_node.identifier
-        ):
-            self.validator_agreement_end()
+        self._end_agreement_if_voted()
 
     def validator_agreement_end(self):
         new_validators = self.nodes.validator_agreement.all()
-        self.nodes.clear_agreement_list()
         last_leader = self.nodes.get_agreement_leader()
-        if self.nodes.is_agreement_result_success():
+        is_success = self.nodes.is_agreement_result_success()
+        new_leader = None if is_success else self.nodes.get_most_trusted_validator()
+        done_data = {
+            "validators": [identifier.hex for identifier in new_validators],
+            "leader": last_leader.hex if is_success else new_leader.identifier.hex,
+        }
+        self._send_to_validators(
+            lambda node: Request.send_validator_agreement_done(
+                node.host, node.port, done_data
+            )
+        )
+        self.nodes.clear_agreement_list()
+        if is_success:
             self.nodes.validators.set_validators(new_validators)
             self.nodes.validator_agreement_info.set_last_successful_agreement(
                 int(time())
@@ -620,7 +1106,6 @@ class PoST:
             self.nodes.validator_agreement_info.set_info_data(False, [])
             self.send_validators_list()
         else:
-            new_leader = self.nodes.get_most_trusted_validator()
             self.nodes.validator_agreement_info.add_leader(new_leader)
         positives_results_nodes = []
         negatives_results_nodes = []
@@ -671,7 +1156,7 @@ class PoST:
     def _check_validator_list(self, validator_list):
         if (
                 self.nodes.is_agreement_started() is False
-                or len(self.nodes.validator_agreement.all()) > 0
+                or len(self.nodes.validator_agreement.all()) == 0
         ):
             raise PoTException("Agreement is not started or list is not send", 400)
         if validator_list != self.nodes.validator_agreement.all():
@@ -760,6 +1245,15 @@ class PoST:
             logging.info(msg)
             raise PoTException(msg, 400)
 
+    def _validate_create_int(self, value: str | int, name: str) -> int:
+        try:
+            number = int(value)
+        except (TypeError, ValueError):
+            raise PoTException(f"Parameter {name} must be integer", 400)
+        if number < 0:
+            raise PoTException(f"Parameter {name} cannot be negative", 400)
+        return number
+
     def _validate_request_dict_keys(self, data: dict, keys: list[str]) -> None:
         if not isinstance(data, dict):
             raise PoTException(
@@ -776,13 +1270,25 @@ class PoST:
                 400,
             )
 
+    def _send_to_validators(self, func) -> None:
+        def send(node: Node):
+            try:
+                func(node)
+            except Exception:
+                logging.exception(f"Error while sending to validator {node.identifier.hex}")
+
+        for node in self.nodes.get_validator_nodes():
+            if node.identifier == self.self_node.identifier:
+                continue
+            SenderThread(target=send, args=[node]).start()
+
     def _send_to_all_nodes(self, func, args: list):
         threads = []
         for node in self.nodes.all():
             if node.identifier == self.self_node.identifier:
                 continue
             args.append(node)
-            th = Thread(target=func, args=args)
+            th = SenderThread(target=func, args=args)
             th.start()
             threads.append(th)
         while True:
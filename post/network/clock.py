@@ -0,0 +1,51 @@
+import time as system_time
+from abc import ABC, abstractmethod
+
+
+class Clock(ABC):
+    """
+    Source of time of node. Nodes and workers read time and wait through
+    clock of process, so simulation can replace it with virtual clock
+    """
+
+    @abstractmethod
+    def time(self) -> float:
+        pass
+
+    @abstractmethod
+    def sleep(self, seconds: float) -> None:
+        pass
+
+
+class SystemClock(Clock):
+    def time(self) -> float:
+        return system_time.time()
+
+    def sleep(self, seconds: float) -> None:
+        system_time.sleep(seconds)
+
+
+_clock: Clock = SystemClock()
+
+
+def set_clock(clock: Clock) -> Clock:
+    """
+    Replace clock used by all nodes of process
+    :return: previous clock
+    """
+    global _clock
+    previous = _clock
+    _clock = clock
+    return previous
+
+
+def get_clock() -> Clock:
+    return _clock
+
+
+def time() -> float:
+    return _clock.time()
+
+
+def sleep(seconds: float) -> None:
+    _clock.sleep(seconds)
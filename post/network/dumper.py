@@ -1,37 +1,211 @@
+import json
 import logging
 import os
 from pathlib import Path
 from time import time
 from shutil import copy
+from typing import BinaryIO
 
 from post.network.blockchain import PoST
 
 
+def copy_bytes(src: BinaryIO, dst: BinaryIO, size: int) -> None:
+    """
+    Copy at most size bytes from actual position of src
+    """
+    while size > 0:
+        chunk = src.read(min(size, 1024 * 1024))
+        if not chunk:
+            break
+        dst.write(chunk)
+        size -= len(chunk)
+
+
 class Dumper:
+    """
+    Incremental snapshots of storage directory. File not changed since previous
+    snapshot is hard-linked to it. File which has grown since previous snapshot
+    is appended to data file and snapshot records its size in manifest, so cost
+    of snapshot depends only on changes
+    """
+
     SECOND_PART = 10.0
+    DATA_DIR = "_data"
+    MANIFEST = "manifest.json"
+    # Size of end of previous content compared to detect files rewritten in place
+    TAIL_CHECK_SIZE = 4096
 
     dump_dir: str
     paths: list[str]
     storage_dir: str
+    _previous_dir: str | None
+    _previous: dict[str, tuple[int, int, int]]
+    _previous_manifest: dict[str, list]
 
     def __init__(self, pot: PoST):
         self.storage_dir = os.getenv("STORAGE_DIR")
         self.dump_dir = os.getenv("DUMP_DIR")
         if not os.path.isdir(self.dump_dir):
             os.mkdir(self.dump_dir)
+        os.makedirs(os.path.join(self.dump_dir, self.DATA_DIR), exist_ok=True)
+        self._previous_dir = None
+        self._previous = {}
+        self._previous_manifest = {}
         logging.debug(f"Dumping files to directory: {self.dump_dir}")
 
+    @staticmethod
+    def _is_skipped(name: str) -> bool:
+        return name.endswith((".lock", ".flock", ".tmp"))
+
+    def _has_same_tail(self, path: str, previous: str, size: int) -> bool:
+        start = max(size - self.TAIL_CHECK_SIZE, 0)
+        with open(path, "rb") as f, open(previous, "rb") as p:
+            f.seek(start)
+            p.seek(start)
+            return f.read(size - start) == p.read(size - start)
+
+    def _append_to_data(
+        self, path: str, name: str, previous_size: int, size: int, dump_time_dir: str
+    ) -> list:
+        entry = self._previous_manifest.get(name)
+        if entry is None:
+            # Start data file from copy of previous snapshot
+            data_name = f"{name}.{os.path.basename(dump_time_dir)}"
+            copy(
+                os.path.join(self._previous_dir, name),
+                os.path.join(self.dump_dir, self.DATA_DIR, data_name),
+            )
+        else:
+            data_name = entry[0]
+        with open(path, "rb") as src, open(
+            os.path.join(self.dump_dir, self.DATA_DIR, data_name), "ab"
+        ) as dst:
+            dst.truncate(previous_size)
+            src.seek(previous_size)
+            copy_bytes(src, dst, size - previous_size)
+        return [data_name, size]
+
+    def _previous_path(self, name: str) -> str | None:
+        entry = self._previous_manifest.get(name)
+        if entry is not None:
+            return os.path.join(self.dump_dir, self.DATA_DIR, entry[0])
+        if self._previous_dir is None:
+            return None
+        path = os.path.join(self._previous_dir, name)
+        return path if os.path.isfile(path) else None
+
     def dump(self) -> None:
         utime = int(time() * self.SECOND_PART)
         dump_time_dir = os.path.join(self.dump_dir, str(utime))
 
         os.mkdir(dump_time_dir)
 
+        current = {}
+        manifest = {}
         for path in list(os.scandir(self.storage_dir)):
-            if path.name.endswith(".lock"):
+            if self._is_skipped(path.name) or not path.is_file():
+                continue
+            stat = path.stat()
+            current[path.name] = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+            previous = self._previous.get(path.name)
+            previous_path = self._previous_path(path.name)
+            target = os.path.join(dump_time_dir, path.name)
+
+            if previous_path is not None and previous == current[path.name]:
+                if path.name in self._previous_manifest:
+                    manifest[path.name] = self._previous_manifest[path.name]
+                else:
+                    os.link(previous_path, target)
+                continue
+            if (
+                previous_path is not None
+                and previous is not None
+                and 0 < previous[2] < stat.st_size
+                and self._has_same_tail(path.path, previous_path, previous[2])
+            ):
+                manifest[path.name] = self._append_to_data(
+                    path.path, path.name, previous[2], stat.st_size, dump_time_dir
+                )
                 continue
             copy(path, dump_time_dir)
-            Path(os.path.join(dump_time_dir, path)).chmod(0o777)
+            Path(target).chmod(0o777)
+
+        with open(os.path.join(dump_time_dir, self.MANIFEST), "w") as f:
+            json.dump(manifest, f)
+        self._previous_dir = dump_time_dir
+        self._previous = current
+        self._previous_manifest = manifest
+
+
+class SnapshotReader:
+    """
+    Read snapshots created by Dumper. Snapshots without manifest are plain
+    copies of storage directory
+    """
+
+    dump_dir: str
+
+    def __init__(self, dump_dir: str):
+        self.dump_dir = dump_dir
+
+    def snapshots(self) -> list[int]:
+        """
+        :return: times of snapshots multiplied by Dumper.SECOND_PART
+        """
+        return sorted(
+            int(name) for name in os.listdir(self.dump_dir) if name.isdigit()
+        )
+
+    def _manifest(self, snapshot: int) -> dict[str, list] | None:
+        path = os.path.join(self.dump_dir, str(snapshot), Dumper.MANIFEST)
+        if not os.path.isfile(path):
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    def read(self, snapshot: int, name: str) -> bytes:
+        manifest = self._manifest(snapshot) or {}
+        entry = manifest.get(name)
+        if entry is None:
+            with open(os.path.join(self.dump_dir, str(snapshot), name), "rb") as f:
+                return f.read()
+        data_name, size = entry
+        with open(os.path.join(self.dump_dir, Dumper.DATA_DIR, data_name), "rb") as f:
+            return f.read(size)
+
+    def signature(self, snapshot: int, name: str) -> tuple | None:
+        """
+        Identity of content of file in snapshot, equal for unchanged file
+        :return: None if file is missing in snapshot
+        """
+        entry = (self._manifest(snapshot) or {}).get(name)
+        if entry is not None:
+            return tuple(entry)
+        path = os.path.join(self.dump_dir, str(snapshot), name)
+        if not os.path.isfile(path):
+            return None
+        stat = os.stat(path)
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
 
-        # for path in self.paths:
-        #     copy(path, dump_time_dir)
+    def materialize(self, snapshot: int, target_dir: str) -> str:
+        """
+        Prepare storage directory of snapshot readable by storages
+        :return: directory of storage
+        """
+        manifest = self._manifest(snapshot)
+        snapshot_dir = os.path.join(self.dump_dir, str(snapshot))
+        if not manifest:
+            return snapshot_dir
+        os.makedirs(target_dir, exist_ok=True)
+        # Files are removed, not overwritten, as they may be links to snapshots
+        for path in os.scandir(target_dir):
+            os.remove(path.path)
+        for path in os.scandir(snapshot_dir):
+            if path.name != Dumper.MANIFEST:
+                os.link(path.path, os.path.join(target_dir, path.name))
+        for name, (data_name, size) in manifest.items():
+            with open(
+                os.path.join(self.dump_dir, Dumper.DATA_DIR, data_name), "rb"
+            ) as src, open(os.path.join(target_dir, name), "wb") as dst:
+                copy_bytes(src, dst, size)
+        return target_dir
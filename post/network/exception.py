@@ -9,3 +9,11 @@ class PoTException(Exception):
     def __init__(self, message: str, code: int):
         self.message = message
         self.code = code
+
+
+class BlockNotFoundException(Exception):
+    pass
+
+
+class BlockchainSyncException(Exception):
+    pass
@@ -0,0 +1,221 @@
+from bisect import bisect_left, insort
+from itertools import count
+from typing import Container, Iterable
+from uuid import UUID
+
+import numpy as np
+
+
+class TrustLedger:
+    """
+    Trust of nodes kept in dense NumPy array. Nodes are mapped to consecutive
+    indices in order of addition. Nodes of equal trust are ordered by identifier,
+    so every node computes the same ranking. Version changes on every
+    modification and is unique among all ledgers. Ranking of all nodes is kept
+    sorted and updated on every change, so the least trusted nodes are found
+    without sorting
+    """
+
+    INITIAL_CAPACITY = 64
+    _versions = count()
+
+    _indexes: dict[UUID, int]
+    _nodes: list[UUID]
+    _trust: np.ndarray
+    _id_high: np.ndarray
+    _id_low: np.ndarray
+    _ranking: list[tuple[int, int, UUID]]
+    version: int
+
+    def __init__(self, trusts: dict[UUID, int] | None = None):
+        self._indexes = {}
+        self._nodes = []
+        self._trust = np.zeros(self.INITIAL_CAPACITY, dtype=np.int64)
+        self._id_high = np.zeros(self.INITIAL_CAPACITY, dtype=np.uint64)
+        self._id_low = np.zeros(self.INITIAL_CAPACITY, dtype=np.uint64)
+        self._ranking = []
+        self.version = next(self._versions)
+        if trusts:
+            self.update(trusts)
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def __contains__(self, node_id: UUID) -> bool:
+        return node_id in self._indexes
+
+    def __getitem__(self, node_id: UUID) -> int:
+        return int(self._trust[self._indexes[node_id]])
+
+    def __setitem__(self, node_id: UUID, trust: int) -> None:
+        n_ranked = len(self._nodes)
+        index = self._index(node_id)
+        previous = self._trust[index : index + 1].copy()
+        self._trust[index] = trust
+        self._rerank(np.array([index]), previous, n_ranked)
+        self.version = next(self._versions)
+
+    def get(self, node_id: UUID, default: int | None = None) -> int | None:
+        index = self._indexes.get(node_id)
+        return default if index is None else int(self._trust[index])
+
+    def to_dict(self) -> dict[UUID, int]:
+        return dict(zip(self._nodes, self._trust[: len(self._nodes)].tolist()))
+
+    def _index(self, node_id: UUID) -> int:
+        index = self._indexes.get(node_id)
+        if index is not None:
+            return index
+        index = len(self._nodes)
+        if index == len(self._trust):
+            capacity = 2 * len(self._trust)
+            self._trust = np.resize(self._trust, capacity)
+            self._id_high = np.resize(self._id_high, capacity)
+            self._id_low = np.resize(self._id_low, capacity)
+        self._indexes[node_id] = index
+        self._nodes.append(node_id)
+        self._trust[index] = 0
+        self._id_high[index] = node_id.int >> 64
+        self._id_low[index] = node_id.int & 0xFFFFFFFFFFFFFFFF
+        return index
+
+    def _indexes_of(self, node_ids: Iterable[UUID]) -> np.ndarray:
+        return np.fromiter(
+            (self._index(node_id) for node_id in node_ids), dtype=np.intp
+        )
+
+    def _selected(self, node_ids: Iterable[UUID] | None) -> np.ndarray:
+        if node_ids is None:
+            return np.arange(len(self._nodes))
+        return np.fromiter(
+            (self._indexes[node_id] for node_id in node_ids if node_id in self._indexes),
+            dtype=np.intp,
+        )
+
+    def update(self, trusts: dict[UUID, int]) -> None:
+        """
+        Set trust of nodes, unknown nodes are added
+        """
+        n_ranked = len(self._nodes)
+        indexes = self._indexes_of(trusts.keys())
+        previous = self._trust[indexes]
+        self._trust[indexes] = np.fromiter(trusts.values(), dtype=np.int64)
+        self._rerank(indexes, previous, n_ranked)
+        self.version = next(self._versions)
+
+    def apply(self, changes: dict[UUID, int]) -> None:
+        """
+        Add changes to trust of nodes, unknown nodes start from 0
+        """
+        n_ranked = len(self._nodes)
+        indexes = self._indexes_of(changes.keys())
+        previous = self._trust[indexes]
+        np.add.at(self._trust, indexes, np.fromiter(changes.values(), dtype=np.int64))
+        self._rerank(indexes, previous, n_ranked)
+        self.version = next(self._versions)
+
+    def _rank_key(self, index: int) -> tuple[int, int, UUID]:
+        node_id = self._nodes[index]
+        return int(self._trust[index]), node_id.int, node_id
+
+    def _rerank(self, indexes: np.ndarray, previous: np.ndarray, n_ranked: int) -> None:
+        """
+        Move changed nodes in ranking
+        :param indexes: changed nodes
+        :param previous: trust of nodes before change
+        :param n_ranked: nodes with index below are already in ranking
+        """
+        if len(indexes) > max(16, len(self._ranking) // 8):
+            self._ranking = sorted(self._rank_key(i) for i in range(len(self._nodes)))
+            return
+        for index, trust in zip(indexes.tolist(), previous.tolist()):
+            if index < n_ranked:
+                node_int = self._nodes[index].int
+                del self._ranking[bisect_left(self._ranking, (trust, node_int))]
+            insort(self._ranking, self._rank_key(index))
+
+    def _sort(self, indexes: np.ndarray, descending: bool) -> np.ndarray:
+        trust = self._trust[indexes]
+        order = np.lexsort(
+            (self._id_low[indexes], self._id_high[indexes], -trust if descending else trust)
+        )
+        return indexes[order]
+
+    def order(
+        self, node_ids: Iterable[UUID] | None = None, descending: bool = False
+    ) -> list[UUID]:
+        """
+        Nodes sorted by trust
+        :param node_ids: nodes to sort, all nodes by default
+        :param descending: most trusted first
+        """
+        return [self._nodes[i] for i in self._sort(self._selected(node_ids), descending)]
+
+    def _select_k(
+        self, k: int, node_ids: Iterable[UUID] | None, descending: bool
+    ) -> list[tuple[UUID, int]]:
+        indexes = self._selected(node_ids)
+        if k <= 0 or len(indexes) == 0:
+            return []
+        if k < len(indexes):
+            trust = self._trust[indexes]
+            kth = len(indexes) - k if descending else k - 1
+            threshold = np.partition(trust, kth)[kth]
+            # Keep all nodes equal to threshold, ties are resolved by sorting
+            indexes = indexes[trust >= threshold if descending else trust <= threshold]
+        return [
+            (self._nodes[i], int(self._trust[i]))
+            for i in self._sort(indexes, descending)[:k]
+        ]
+
+    def top_k(
+        self, k: int, node_ids: Iterable[UUID] | None = None
+    ) -> list[tuple[UUID, int]]:
+        """
+        :return: k most trusted nodes with their trust, most trusted first
+        """
+        return self._select_k(k, node_ids, True)
+
+    def bottom_k(
+        self, k: int, node_ids: Iterable[UUID] | None = None
+    ) -> list[tuple[UUID, int]]:
+        """
+        :return: k least trusted nodes with their trust, least trusted first
+        """
+        return self._select_k(k, node_ids, False)
+
+    def lowest(self, k: int, node_ids: Container[UUID] | None = None) -> list[UUID]:
+        """
+        k least trusted nodes read from ranking, least trusted first
+        :param node_ids: nodes to choose from, all nodes by default
+        """
+        lowest = []
+        for _, _, node_id in self._ranking:
+            if len(lowest) >= k:
+                break
+            if node_ids is None or node_id in node_ids:
+                lowest.append(node_id)
+        return lowest
+
+    def percentiles(
+        self,
+        q: Iterable[float] = (0, 25, 50, 75, 100),
+        node_ids: Iterable[UUID] | None = None,
+    ) -> dict[float, float]:
+        q = list(q)
+        indexes = self._selected(node_ids)
+        if len(indexes) == 0:
+            return {}
+        return dict(zip(q, np.percentile(self._trust[indexes], q).tolist()))
+
+    def summary(self, node_ids: Iterable[UUID] | None = None) -> dict:
+        indexes = self._selected(node_ids)
+        trust = self._trust[indexes]
+        if len(trust) == 0:
+            return {"count": 0}
+        return {
+            "count": len(trust),
+            "mean": float(trust.mean()),
+            "std": float(trust.std()),
+            "percentiles": self.percentiles(node_ids=node_ids),
+        }
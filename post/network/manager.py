@@ -1,10 +1,19 @@
+import atexit
 import logging
+import os
 from collections import OrderedDict
-from time import time, sleep
+from heapq import heappop, heappush
+from itertools import count
+from threading import RLock, Timer
+from typing import Iterator
 from uuid import UUID
+from weakref import WeakSet
 
-from .block import Block
+from .block import Block, BlockHeader
+from .clock import time, sleep
+from .ledger import TrustLedger
 from .node import Node, NodeType
+from .recorder import StateRecorder, recorder
 from .storage import (
     BlocksStorage,
     NodeStorage,
@@ -20,11 +29,28 @@ from .storage import (
     NodeTrustHistory,
     NodeTrustFullHistory,
     RejectedTransactions,
+    SettledTransactionVotes,
+    TrustRecord,
 )
 from .transaction import TxToVerify, TxVerified
 from .trust import NodeTrustChange
 
 
+# NodeTrust caches of process, their pending changes are flushed at exit
+_node_trusts: WeakSet = WeakSet()
+
+
+def flush_node_trusts() -> None:
+    """
+    Persist pending trust changes of all NodeTrust caches of process
+    """
+    for node_trust in list(_node_trusts):
+        node_trust.flush()
+
+
+atexit.register(flush_node_trusts)
+
+
 class Manager:
     _storage: Storage
 
@@ -37,19 +63,37 @@ class Manager:
     def get_storage(self):
         return self._storage
 
+    def wait_for_change(self, timeout: float) -> bool:
+        """
+        Wait until storage is changed by other process
+        :return: True if storage was changed, False on timeout
+        """
+        return self._storage.wait_for_change(timeout)
+
+    def _record(self, kind: str, value: int, key: str = "") -> None:
+        """
+        Record change of state in time series of storage directory
+        """
+        recorder.record(os.path.dirname(self._storage.path), kind, value, key)
+
 
 class BlockchainManager(Manager):
     _storage: BlocksStorage
     blocks: list[Block]
+    _tx_index: dict[bytes, tuple[int, int]]
+    _tx_index_tip: bytes | None
 
-    def __init__(self):
-        self._storage = BlocksStorage()
+    def __init__(self, storage: BlocksStorage | None = None):
+        self._storage = storage if storage else BlocksStorage()
         self.blocks = self._storage.load()
+        self._tx_index = {}
+        self._tx_index_tip = None
 
     def add(self, block: Block) -> None:
         self.refresh()
         self.blocks.append(block)
         self._storage.update([block])
+        self._record(StateRecorder.BLOCKS, len(self.blocks))
 
     def all(self) -> list[Block]:
         self.refresh()
@@ -58,9 +102,73 @@ class BlockchainManager(Manager):
     def blocks_to_dict(self) -> list[dict]:
         return [block.to_dict() for block in self.all()]
 
+    def slice(
+        self,
+        from_height: int = 0,
+        limit: int | None = None,
+        headers_only: bool = False,
+        raw: bool = False,
+    ) -> Iterator[Block | BlockHeader | bytes]:
+        """
+        Read blocks from storage lazily, blocks before from_height are not decoded
+        :param from_height:
+        :param limit: all blocks to the end by default
+        :param headers_only: read headers of blocks without transactions
+        :param raw: read encoded blocks
+        """
+        return self._storage.load_range(from_height, limit, headers_only, raw)
+
+    def height(self) -> int:
+        return self._storage.count()[0]
+
     def load_from_bytes(self, b: bytes) -> None:
         self.blocks = decode_chain(b)
         self._storage.dump(self.blocks)
+        self._record(StateRecorder.BLOCKS, len(self.blocks))
+
+    def find_height(self, block_hash: bytes) -> int | None:
+        """
+        Find position of block with given hash, searching from the tip
+        """
+        blocks = self.all()
+        for height in range(len(blocks) - 1, -1, -1):
+            if blocks[height].hash() == block_hash:
+                return height
+        return None
+
+    def blocks_after(self, block_hash: bytes) -> list[Block] | None:
+        height = self.find_height(block_hash)
+        if height is None:
+            return None
+        return self.all()[height + 1 :]
+
+    def find_transaction(self, tx_hash: bytes) -> tuple[int, int] | None:
+        """
+        Find height of block and position in block of transaction with given hash.
+        Index of transactions is extended with blocks added since last search
+        and rebuilt when chain was replaced
+        """
+        blocks = self.all()
+        start = 0
+        if self._tx_index_tip is not None:
+            tip_height = self.find_height(self._tx_index_tip)
+            if tip_height is None:
+                self._tx_index = {}
+            else:
+                start = tip_height + 1
+        for height in range(start, len(blocks)):
+            for index, tx in enumerate(blocks[height].transactions):
+                self._tx_index[tx.hash()] = (height, index)
+        self._tx_index_tip = blocks[-1].hash() if blocks else None
+        return self._tx_index.get(tx_hash)
+
+    def append_blocks(self, blocks: list[Block]) -> None:
+        self.refresh()
+        if self.blocks and blocks and blocks[0].prev_hash != self.blocks[-1].hash():
+            raise Exception("First appended block does not point to the last block")
+        self.blocks += blocks
+        self._storage.update(blocks)
+        self._record(StateRecorder.BLOCKS, len(self.blocks))
 
     def get_last_block(self) -> Block:
         return self.all()[-1]
@@ -86,6 +194,7 @@ class TransactionToVerifyManager(Manager):
         self.refresh()
         self._txs[identifier] = tx
         self._storage.update({identifier: tx})
+        self._record(StateRecorder.PENDING, len(self._txs))
 
     def refresh(self) -> None:
         if self._storage.is_up_to_date():
@@ -115,6 +224,7 @@ class TransactionToVerifyManager(Manager):
         except Exception as e:
             self._storage.unlock()
             raise e
+        self._record(StateRecorder.PENDING, len(self._txs))
         return tx
 
     def add_verification_result(
@@ -161,6 +271,7 @@ class NodeManager(Manager):
         self.refresh()
         self._nodes.append(node)
         self._storage.update([node])
+        self._record(StateRecorder.NODES, len(self._nodes))
 
     def all(self) -> list[Node]:
         self.refresh()
@@ -190,6 +301,7 @@ class NodeManager(Manager):
             if node.host == self_ip:
                 self._nodes.remove(node)
                 self._storage.dump(self._nodes)
+                self._record(StateRecorder.NODES, len(self._nodes))
                 return
 
 
@@ -210,6 +322,11 @@ class ValidatorManager(Manager):
         self.refresh()
         self.identifiers = validators
         self._storage.dump(self.identifiers)
+        self._record(
+            StateRecorder.VALIDATORS,
+            len(self.identifiers),
+            ",".join([v.hex for v in self.identifiers]),
+        )
 
     def set_nodes_type(self, nodes: list[Node]) -> None:
         self.refresh()
@@ -223,47 +340,113 @@ class ValidatorManager(Manager):
 
 
 class NodeTrust(Manager):
+    """
+    Write-back cache of nodes trust. Trust changes are applied in memory and
+    appended to journal storage in batches, at most after TRUST_FLUSH_INTERVAL
+    seconds (0 - every change is written immediately)
+    """
+
     _storage = NodeTrustStorage
-    _trusts = {}
+    _trusts: TrustLedger
+    _pending: dict[UUID, int]
+    _flush_timer: Timer | None
+    _lock: RLock
+    flush_interval: float
 
     BASIC_TRUST = 5000
+    FLUSH_SIZE = 64
+    COMPACT_SIZE = 256 * 1024
 
     def __init__(self):
         self._storage = NodeTrustStorage()
-        self._trusts = self._storage.load()
+        self._trusts = TrustLedger(self._storage.load())
+        self._pending = {}
+        self._flush_timer = None
+        self._lock = RLock()
+        self.flush_interval = float(os.getenv("TRUST_FLUSH_INTERVAL", 0.5))
+        _node_trusts.add(self)
 
     def refresh(self) -> None:
-        if self._storage.is_up_to_date():
+        with self._lock:
+            if self._storage.is_up_to_date():
+                return
+            self._apply_changes(*self._storage.read_changes(), self._pending)
+
+    def _apply_changes(
+        self, full: bool, records: list[TrustRecord], pending: dict[UUID, int]
+    ) -> None:
+        """
+        Apply journal records of other processes to cached trusts.
+        Changes not yet visible in journal are kept on top of them
+        """
+        if full:
+            self._trusts = TrustLedger(self._storage.replay(records))
+            self._trusts.apply(pending)
+            return
+        trusts = {}
+        changes = {}
+        for identifier, value, is_delta in records:
+            if is_delta:
+                changes[identifier] = changes.get(identifier, 0) + value
+            else:
+                changes.pop(identifier, None)
+                trusts[identifier] = value + pending.get(identifier, 0)
+        if trusts:
+            self._trusts.update(trusts)
+        if changes:
+            self._trusts.apply(changes)
+
+    def flush(self) -> None:
+        """
+        Persist pending trust changes
+        """
+        with self._lock:
+            if self._flush_timer:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            if not self._pending:
+                return
+            pending = self._pending
+            self._pending = {}
+            self._apply_changes(*self._storage.append_changes(pending), pending)
+            if self._storage.get_size() > self.COMPACT_SIZE:
+                self._trusts = TrustLedger(self._storage.compact())
+
+    def _schedule_flush(self) -> None:
+        if self.flush_interval <= 0 or len(self._pending) >= self.FLUSH_SIZE:
+            self.flush()
             return
-        self._trusts = self._storage.load()
+        if self._flush_timer is None:
+            self._flush_timer = Timer(self.flush_interval, self.flush)
+            self._flush_timer.daemon = True
+            self._flush_timer.start()
 
     def add_new_node_trust(self, node: Node, trust: None | int = None):
         if trust is None:
             trust = self.BASIC_TRUST
-        self.refresh()
-        self._storage.update({node.identifier: trust})
-        self._trusts[node.identifier] = trust
+        with self._lock:
+            self._pending.pop(node.identifier, None)
+            self._apply_changes(
+                *self._storage.update({node.identifier: trust}), self._pending
+            )
+            self._trusts[node.identifier] = trust
+        self._record(StateRecorder.TRUST, trust, node.identifier.hex)
         logging.warning(f"Adding new node: {node.identifier.hex} trust {trust}")
 
     def add_trust_to_node(self, node: Node, new_trust: int) -> None:
-        #self.refresh()
-        trust = None
-        while trust is None:
+        self.refresh()
+        while node.identifier not in self._trusts:
+            logging.error(f"Node {node.identifier.hex} not found in trust list")
+            sleep(0.1)
             self.refresh()
-            trust = self._trusts.get(node.identifier)
-            if trust is None:
-                logging.error(f"Node {node.identifier.hex} not found in trust list")
-                sleep(0.1)
-
-                # self.add_new_node_trust(node)
-                # self.refresh()
-                # trust = self._trusts.get(node.identifier)
-        #trust = None
-        # while trust is None:
-        #     self.refresh()
-        #     trust = self._trusts.get(node.identifier)
-        self._trusts[node.identifier] = trust + new_trust
-        self._storage.dump(self._trusts)
+        with self._lock:
+            self._trusts[node.identifier] += new_trust
+            self._pending[node.identifier] = (
+                self._pending.get(node.identifier, 0) + new_trust
+            )
+            self._schedule_flush()
+            trust = self._trusts[node.identifier]
+        self._record(StateRecorder.TRUST, trust, node.identifier.hex)
 
     def get_node_trust(self, node: Node) -> int:
         self.refresh()
@@ -274,6 +457,23 @@ class NodeTrust(Manager):
             trust = self.BASIC_TRUST
         return trust
 
+    def get_nodes_trust(self, nodes: list[Node]) -> list[int]:
+        """
+        Trust of nodes, nodes without trust get basic trust
+        """
+        self.refresh()
+        for node in nodes:
+            if node.identifier not in self._trusts:
+                self.add_new_node_trust(node)
+        return [self._trusts[node.identifier] for node in nodes]
+
+    def get_ledger(self) -> TrustLedger:
+        """
+        Actual trust of all nodes, must not be modified
+        """
+        self.refresh()
+        return self._trusts
+
 
 class TransactionVerifiedManager(Manager):
     _storage = TransactionVerifiedStorage
@@ -287,6 +487,7 @@ class TransactionVerifiedManager(Manager):
         self.refresh()
         self._txs[identifier] = tx
         self._storage.update({identifier: tx})
+        self._record(StateRecorder.VERIFIED, len(self._txs))
         logging.debug(f"Added transaction {identifier.hex} to verified")
 
     def refresh(self) -> None:
@@ -314,6 +515,7 @@ class TransactionVerifiedManager(Manager):
         for ident in identifiers:
             txs.append(self._txs.pop(ident))
         self._storage.dump(self._txs)
+        self._record(StateRecorder.VERIFIED, len(self._txs))
         return txs
 
 
@@ -325,10 +527,13 @@ class ValidatorAgreementResult(Manager):
         self._storage = ValidatorAgreementResultStorage()
         self._results = self._storage.load()
 
-    def add(self, identifier: UUID, result: bool) -> None:
-        self.refresh()
-        self._results[identifier] = result
-        self._storage.update({identifier: result})
+    def add(self, identifier: UUID, result: bool) -> bool:
+        """
+        Save vote of node unless node has already voted, also in other process
+        :return: True if vote was saved
+        """
+        added, self._results = self._storage.add_if_absent(identifier, result)
+        return added
 
     def refresh(self) -> None:
         if self._storage.is_up_to_date():
@@ -421,87 +626,229 @@ class ValidatorAgreementInfoManager(Manager):
 
 
 class NodeTrustHistoryManager(Manager):
+    """
+    Recent node trust changes indexed by (node, change, type, additional data).
+    Changes expire after TRUST_PURGE_INTERVAL. Expired changes are dropped from
+    index in order of timestamp, storage is compacted only when most of its rows
+    are expired
+    """
+
     TRUST_PURGE_INTERVAL = 5.0
+    COMPACT_ROWS = 1024
 
     _storage = NodeTrustHistory
-    node_trusts: list[NodeTrustChange]
-    _history_storage = NodeTrustFullHistory
+    _changes: dict[tuple, NodeTrustChange]
+    _expiry: list[tuple[float, int, tuple]]
+    _rows: int
+    _history_storage: NodeTrustFullHistory | None
 
-    def __init__(self):
+    def __init__(self, full_history: bool = True):
         self._storage = NodeTrustHistory()
-        self.node_trusts = self._storage.load()
-        self._history_storage = NodeTrustFullHistory()
+        self._changes = {}
+        self._expiry = []
+        self._rows = 0
+        self._seq = count()
+        self._apply_changes(*self._storage.read_changes(True))
+        self._history_storage = NodeTrustFullHistory() if full_history else None
+
+    @staticmethod
+    def _key(node_trust: NodeTrustChange) -> tuple:
+        return (
+            node_trust.node_id,
+            node_trust.change,
+            node_trust.type,
+            node_trust.additional_data,
+        )
+
+    def _apply_changes(self, full: bool, node_trusts: list[NodeTrustChange]) -> None:
+        if full:
+            self._changes = {}
+            self._expiry = []
+            self._rows = 0
+        for node_trust in node_trusts:
+            self._index(node_trust)
+
+    def _index(self, node_trust: NodeTrustChange) -> None:
+        key = self._key(node_trust)
+        current = self._changes.get(key)
+        if current is None or current.timestamp <= node_trust.timestamp:
+            self._changes[key] = node_trust
+        heappush(self._expiry, (node_trust.timestamp, next(self._seq), key))
+        self._rows += 1
 
     def refresh(self) -> None:
         if self._storage.is_up_to_date():
             return
-        self.node_trusts = self._storage.load()
+        self._apply_changes(*self._storage.read_changes())
 
     def all(self) -> list[NodeTrustChange]:
         self.refresh()
-        return self.node_trusts
+        return list(self._changes.values())
 
     def set(self, node_trusts: list[NodeTrustChange]) -> None:
         self._storage.dump(node_trusts)
-        self.node_trusts = node_trusts
+        self._apply_changes(True, node_trusts)
 
     def purge_old_history(self) -> None:
         purge_timestamp = time() - self.TRUST_PURGE_INTERVAL
         self.refresh()
-        node_trusts_to_remove = []
-        for node_trust in self.all():
-            if node_trust.timestamp < purge_timestamp:
-                node_trusts_to_remove.append(node_trust)
-
-        if len(node_trusts_to_remove) > 0:
-            node_trusts = list(
-                set(self.node_trusts).difference(set(node_trusts_to_remove))
-            )
-            self.set(node_trusts)
+        while self._expiry and self._expiry[0][0] < purge_timestamp:
+            timestamp, _, key = heappop(self._expiry)
+            current = self._changes.get(key)
+            # Skip entries superseded by newer change with the same key
+            if current is not None and current.timestamp == timestamp:
+                del self._changes[key]
+        if self._rows > self.COMPACT_ROWS and len(self._changes) * 2 < self._rows:
+            self._apply_changes(True, self._storage.compact(purge_timestamp))
 
     def has_node_trust(self, new_node_trust: NodeTrustChange) -> bool:
         self.refresh()
-        for node_trust in self.all():
-            if (
-                node_trust.node_id == new_node_trust.node_id
-                and node_trust.change == new_node_trust.change
-                and node_trust.type == new_node_trust.type
-                and node_trust.additional_data == new_node_trust.additional_data
-            ):
-                return True
-        return False
+        return self._key(new_node_trust) in self._changes
 
     def add(self, node_trust: NodeTrustChange) -> None:
-        self.refresh()
-        self._storage.update([node_trust])
-        self.node_trusts.append(node_trust)
+        self._apply_changes(*self._storage.update([node_trust]))
+        self._index(node_trust)
         # TO REMOVE
-        self._history_storage.update([node_trust])
+        if self._history_storage:
+            self._history_storage.update([node_trust])
 
 
 class RejectedTransactionManager(Manager):
+    """
+    Recently rejected transactions. Rejections are forgotten after
+    REJECTED_TX_RETENTION seconds or when more than REJECTED_TX_MAX
+    transactions are remembered, oldest first
+    """
+
+    COMPACT_ROWS = 4096
+
     _storage = RejectedTransactions
-    _rejected_txs: list[UUID]
+    _rejected_txs: OrderedDict[UUID, float]
+    _rows: int
+    retention: float
+    max_size: int
 
     def __init__(self):
         self._storage = RejectedTransactions()
-        self._rejected_txs = self._storage.load()
+        self.retention = float(os.getenv("REJECTED_TX_RETENTION", 3600))
+        self.max_size = int(os.getenv("REJECTED_TX_MAX", 100000))
+        self._rejected_txs = OrderedDict()
+        self._rows = 0
+        self._apply_changes(*self._storage.read_changes(True))
+
+    def _apply_changes(
+        self, full: bool, rejections: list[tuple[UUID, float]]
+    ) -> None:
+        if full:
+            self._rejected_txs = OrderedDict()
+            self._rows = 0
+        for tx_id, timestamp in rejections:
+            self._rejected_txs[tx_id] = timestamp
+            self._rejected_txs.move_to_end(tx_id)
+        self._rows += len(rejections)
+        self._expire()
+
+    def _expire(self) -> None:
+        min_timestamp = time() - self.retention
+        while self._rejected_txs and (
+            len(self._rejected_txs) > self.max_size
+            or next(iter(self._rejected_txs.values())) < min_timestamp
+        ):
+            self._rejected_txs.popitem(last=False)
+        if self._rows > self.COMPACT_ROWS and self._rows > 2 * len(self._rejected_txs):
+            self._apply_changes(
+                True, self._storage.compact(min_timestamp, self.max_size)
+            )
 
     def refresh(self) -> None:
         if self._storage.is_up_to_date():
             return
-        self._rejected_txs = self._storage.load()
+        self._apply_changes(*self._storage.read_changes())
 
     def all(self) -> list[UUID]:
         self.refresh()
-        return self._rejected_txs
+        return list(self._rejected_txs)
 
     def has(self, tx_id: UUID) -> bool:
         self.refresh()
         return tx_id in self._rejected_txs
 
     def add(self, tx_id: UUID) -> None:
+        timestamp = time()
+        self._apply_changes(*self._storage.update([tx_id], timestamp))
+        self._apply_changes(False, [(tx_id, timestamp)])
+
+
+class SettledTransactionManager(Manager):
+    """
+    Outcome of transactions settled by majority with voters whose trust was
+    already changed. Settlements are forgotten after SETTLED_TX_RETENTION
+    seconds, oldest first
+    """
+
+    COMPACT_ROWS = 4096
+
+    _storage = SettledTransactionVotes
+    _settled: OrderedDict[UUID, tuple[bool, set[UUID], float]]
+    _rows: int
+    _votes: int
+    retention: float
+
+    def __init__(self):
+        self._storage = SettledTransactionVotes()
+        self.retention = float(os.getenv("SETTLED_TX_RETENTION", 3600))
+        self._settled = OrderedDict()
+        self._rows = 0
+        self._votes = 0
+        self._apply_changes(*self._storage.read_changes(True))
+
+    def _apply_changes(
+        self, full: bool, votes: list[tuple[UUID, UUID, bool, float]]
+    ) -> None:
+        if full:
+            self._settled = OrderedDict()
+            self._rows = 0
+            self._votes = 0
+        for tx_id, voter, result, timestamp in votes:
+            if tx_id not in self._settled:
+                self._settled[tx_id] = (result, set(), timestamp)
+            voters = self._settled[tx_id][1]
+            if voter not in voters:
+                voters.add(voter)
+                self._votes += 1
+        self._rows += len(votes)
+        self._expire()
+
+    def _expire(self) -> None:
+        min_timestamp = time() - self.retention
+        while self._settled and next(iter(self._settled.values()))[2] < min_timestamp:
+            _, (_, voters, _) = self._settled.popitem(last=False)
+            self._votes -= len(voters)
+        if self._rows > self.COMPACT_ROWS and self._rows > 2 * self._votes:
+            self._apply_changes(True, self._storage.compact(min_timestamp))
+
+    def refresh(self) -> None:
+        if self._storage.is_up_to_date():
+            return
+        self._apply_changes(*self._storage.read_changes())
+
+    def find_result(self, tx_id: UUID) -> bool | None:
+        self.refresh()
+        settled = self._settled.get(tx_id)
+        return settled[0] if settled else None
+
+    def has_voter(self, tx_id: UUID, node_id: UUID) -> bool:
         self.refresh()
-        self._storage.update([tx_id])
-        self._rejected_txs.append(tx_id)
+        settled = self._settled.get(tx_id)
+        return settled is not None and node_id in settled[1]
 
+    def add(self, tx_id: UUID, result: bool, voters: list[UUID]) -> None:
+        self.refresh()
+        result, _, timestamp = self._settled.get(tx_id, (result, set(), time()))
+        voters = [voter for voter in voters if not self.has_voter(tx_id, voter)]
+        if not voters:
+            return
+        self._apply_changes(*self._storage.update(tx_id, result, voters, timestamp))
+        self._apply_changes(
+            False, [(tx_id, voter, result, timestamp) for voter in voters]
+        )
@@ -0,0 +1,69 @@
+"""
+Merkle tree over transaction hashes.
+Leaves and inner nodes are hashed with different prefixes, so inner node
+cannot be presented as a leaf. Odd node on a level is carried to the next
+level unhashed, so list with duplicated last leaf has different root
+(CVE-2012-2459).
+"""
+from hashlib import sha256
+
+LEAF_PREFIX = b"\x00"
+NODE_PREFIX = b"\x01"
+
+
+def hash_leaf(leaf: bytes) -> bytes:
+    return sha256(LEAF_PREFIX + leaf).digest()
+
+
+def hash_node(left: bytes, right: bytes) -> bytes:
+    return sha256(NODE_PREFIX + left + right).digest()
+
+
+def _next_level(level: list[bytes]) -> list[bytes]:
+    next_level = [
+        hash_node(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)
+    ]
+    if len(level) % 2 == 1:
+        next_level.append(level[-1])
+    return next_level
+
+
+def merkle_root(leaves: list[bytes]) -> bytes:
+    """
+    :param leaves: hashes of transactions
+    :return: root of tree, hash of empty bytes for no leaves
+    """
+    if not leaves:
+        return sha256(b"").digest()
+    level = [hash_leaf(leaf) for leaf in leaves]
+    while len(level) > 1:
+        level = _next_level(level)
+    return level[0]
+
+
+def merkle_proof(leaves: list[bytes], index: int) -> list[tuple[bytes, bool]]:
+    """
+    Prepare inclusion proof of leaf
+    :param leaves: hashes of transactions
+    :param index: position of proved leaf
+    :return: list of (sibling hash, is sibling on the left side) from leaf to root
+    """
+    if index < 0 or index >= len(leaves):
+        raise IndexError(f"Leaf index {index} out of range")
+    proof = []
+    level = [hash_leaf(leaf) for leaf in leaves]
+    while len(level) > 1:
+        sibling = index ^ 1
+        # Carried odd node has no sibling on this level
+        if sibling < len(level):
+            proof.append((level[sibling], sibling < index))
+        level = _next_level(level)
+        index //= 2
+    return proof
+
+
+def verify_proof(leaf: bytes, proof: list[tuple[bytes, bool]], root: bytes) -> bool:
+    current = hash_leaf(leaf)
+    for sibling, is_left in proof:
+        current = hash_node(sibling, current) if is_left else hash_node(current, sibling)
+    return current == root
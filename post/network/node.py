@@ -1,5 +1,4 @@
 import os
-import socket
 from dataclasses import dataclass
 from uuid import UUID, uuid4
 import json
@@ -12,6 +11,7 @@ from cryptography.hazmat.primitives.asymmetric.ed25519 import (
 from cryptography.hazmat.primitives import serialization
 
 from .request import Request
+from .resolver import resolver
 
 
 class NodeType(StrEnum):
@@ -97,9 +97,11 @@ class SelfNodeInfo:
     identifier: UUID
     public_key: Ed25519PublicKey
     private_key: Ed25519PrivateKey
+    node_type: str | None
 
     def __init__(self, read_only=False):
         storage = os.getenv("STORAGE_DIR")
+        self.node_type = os.getenv("NODE_TYPE")
         key_path = os.path.join(storage, self.INFO_PATH)
         if os.path.isfile(key_path):
             with open(key_path) as f:
@@ -120,9 +122,9 @@ class SelfNodeInfo:
     def get_node(self) -> Node:
         return Node(
             self.identifier,
-            socket.gethostbyname(socket.gethostname()),
+            resolver.self_ip(),
             5000,
-            os.getenv("NODE_TYPE"),
+            self.node_type,
         )
 
     def get_public_key(self) -> Ed25519PublicKey:
@@ -0,0 +1,50 @@
+import os
+
+from .clock import time
+from .storage import StateEvents
+
+
+class StateRecorder:
+    """
+    Time series of state changes written by managers when STATE_RECORDER=1.
+    Every change of count of nodes, validators, blocks, transactions to verify
+    and verified transactions or trust of node is appended to state_events
+    storage with its exact time, so state does not need to be dumped periodically
+    """
+
+    NODES = "nodes"
+    VALIDATORS = "validators"
+    BLOCKS = "blocks"
+    PENDING = "pending"
+    VERIFIED = "verified"
+    TRUST = "trust"
+
+    enabled: bool
+    _storages: dict[str, StateEvents]
+
+    def __init__(self, enabled: bool | None = None):
+        self.enabled = (
+            os.getenv("STATE_RECORDER", "0") == "1" if enabled is None else enabled
+        )
+        self._storages = {}
+
+    def _storage(self, storage_dir: str) -> StateEvents:
+        storage = self._storages.get(storage_dir)
+        if storage is None:
+            storage = StateEvents(storage_dir)
+            self._storages[storage_dir] = storage
+        return storage
+
+    def record(self, storage_dir: str, kind: str, value: int, key: str = "") -> None:
+        """
+        :param storage_dir: storage directory of changed manager
+        :param kind: one of kinds of state
+        :param value: count of elements or trust after change
+        :param key: identifier of node for trust, list of validators for validators
+        """
+        if not self.enabled:
+            return
+        self._storage(storage_dir).append([(time(), kind, key, value)])
+
+
+recorder = StateRecorder()
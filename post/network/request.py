@@ -1,16 +1,17 @@
 import logging
 from uuid import UUID
 
-import requests
+from post.network import transport
 
-from post.network.exception import PublicKeyNotFoundException
+from post.network.exception import PublicKeyNotFoundException, BlockNotFoundException
+from post.network.wire import WireEncoding
 
 
 class Request:
 
     @staticmethod
     def get_public_key(host: str, port: int) -> bytes:
-        response = requests.get(f"http://{host}:{port}/public-key")
+        response = transport.get(f"http://{host}:{port}/public-key")
         if response.status_code != 200:
             raise PublicKeyNotFoundException(
                 f"Cannot get public key from node: {host}:{port}"
@@ -19,7 +20,7 @@ class Request:
 
     @staticmethod
     def get_info(host: str, port: int) -> dict:
-        response = requests.get(f"http://{host}:{port}/info")
+        response = transport.get(f"http://{host}:{port}/info")
         if response.status_code != 200:
             raise Exception(f"Cannot get info from host: {host}:{port}")
         return response.json()
@@ -28,7 +29,7 @@ class Request:
     def send_transaction_populate(
         host: str, port: int, identifier: str, data: bytes
     ) -> None:
-        response = requests.post(
+        response = transport.post(
             f"http://{host}:{port}/transaction/{identifier}/populate", data
         )
         if response.status_code != 200:
@@ -40,7 +41,7 @@ class Request:
     def send_populate_verification_result(
         host: str, port: int, identifier: str, data: dict
     ) -> None:
-        response = requests.post(
+        response = transport.post(
             f"http://{host}:{port}/transaction/{identifier}/verifyResult", json=data
         )
         if response.status_code == 200:
@@ -53,7 +54,7 @@ class Request:
 
     @staticmethod
     def send_transaction_get_info(host: str, port: int, identifier: str) -> bytes:
-        response = requests.get(f"http://{host}:{port}/transaction/{identifier}")
+        response = transport.get(f"http://{host}:{port}/transaction/{identifier}")
         if response.status_code != 200:
             raise Exception(f"Cannot get transaction from host: {host}:{port}")
         return response.content
@@ -61,7 +62,7 @@ class Request:
     @staticmethod
     def send_blockchain_new_block(host: str, port: int, data: bytes) -> None:
         logging.debug(f"Sending new block to host: {host}:{port}")
-        response = requests.post(f"http://{host}:{port}/blockchain/block/new", data)
+        response = transport.post(f"http://{host}:{port}/blockchain/block/new", data)
         if response.status_code != 200:
             msg = f"Cannot send new block to host: {host}:{port}"
             logging.error(msg)
@@ -70,7 +71,7 @@ class Request:
 
     @staticmethod
     def send_node_trust_change(host: str, port: int, node_id: UUID, data: dict) -> None:
-        response = requests.patch(
+        response = transport.patch(
             f"http://{host}:{port}/node/{node_id.hex}/trust", json=data
         )
         if response.status_code >= 300:
@@ -81,7 +82,7 @@ class Request:
     @staticmethod
     def send_validator_agreement_start(host: str, port: int, data: dict) -> None:
         logging.debug(f"Sending start new validator agreement to host: {host}:{port}")
-        response = requests.post(
+        response = transport.post(
             f"http://{host}:{port}/node/validator/agreement", json=data
         )
         if response.status_code != 200:
@@ -93,7 +94,7 @@ class Request:
     @staticmethod
     def send_validator_agreement_vote(host: str, port: int, data: dict) -> None:
         logging.debug(f"Sending add result validator agreement to host: {host}:{port}")
-        response = requests.patch(
+        response = transport.patch(
             f"http://{host}:{port}/node/validator/agreement/vote", json=data
         )
         if response.status_code != 200:
@@ -105,7 +106,7 @@ class Request:
     @staticmethod
     def send_validator_agreement_done(host: str, port: int, data: dict) -> None:
         logging.debug(f"Sending end validator agreement to host: {host}:{port}")
-        response = requests.post(
+        response = transport.post(
             f"http://{host}:{port}/node/validator/agreement/done", json=data
         )
         if response.status_code != 200:
@@ -113,3 +114,44 @@ class Request:
             logging.error(msg)
             raise Exception(msg)
         logging.info(f"Done validator agreement sent to node in {host}:{port}")
+
+    @staticmethod
+    def get_node_update(
+        host: str, port: int, params: dict
+    ) -> tuple[dict, WireEncoding]:
+        response = transport.get(
+            f"http://{host}:{port}/node/update",
+            params=params,
+            headers=WireEncoding.BASE64.to_headers(),
+        )
+        if response.status_code != 200:
+            raise Exception(
+                f"Cannot update from node: {host}:{port} Code: {response.status_code} "
+                f"Response data: " + response.text
+            )
+        return response.json(), WireEncoding.from_headers(response.headers)
+
+    @staticmethod
+    def get_blockchain_tip(host: str, port: int) -> dict:
+        response = transport.get(f"http://{host}:{port}/blockchain/tip")
+        if response.status_code != 200:
+            raise Exception(f"Cannot get blockchain tip from host: {host}:{port}")
+        return response.json()
+
+    @staticmethod
+    def get_blockchain_sync(
+        host: str, port: int, last_block: str | None, offset: int, limit: int
+    ) -> bytes:
+        params = {"offset": offset, "limit": limit}
+        if last_block is not None:
+            params["lastBlock"] = last_block
+        response = transport.get(f"http://{host}:{port}/blockchain/sync", params=params)
+        if response.status_code == 409:
+            raise BlockNotFoundException(
+                f"Block {last_block} is not known by host: {host}:{port}"
+            )
+        if response.status_code != 200:
+            raise Exception(
+                f"Cannot get blocks from host: {host}:{port} response: {response.text}"
+            )
+        return response.content
@@ -0,0 +1,100 @@
+import logging
+import os
+import socket
+from threading import Lock, Thread
+from time import monotonic
+
+from .transport import get_sender
+
+
+class HostResolver:
+    """
+    Cache of resolved host addresses. Entry older than HOST_CACHE_TTL seconds
+    is returned as it is and refreshed in background, so lookups block only
+    on first resolution of host. Pinned hosts are never refreshed
+    """
+
+    SELF_HOST = ""
+
+    ttl: float
+    _cache: dict[str, tuple[str, float]]
+    _refreshing: set[str]
+    _pinned: dict[str, str]
+    _lock: Lock
+
+    def __init__(self, ttl: float | None = None):
+        self.ttl = float(os.getenv("HOST_CACHE_TTL", 60)) if ttl is None else ttl
+        self._cache = {}
+        self._refreshing = set()
+        self._pinned = {}
+        self._lock = Lock()
+
+    @staticmethod
+    def _lookup(host: str) -> str:
+        if host == HostResolver.SELF_HOST:
+            host = socket.gethostname()
+        return socket.gethostbyname(host)
+
+    def _refresh(self, host: str) -> None:
+        try:
+            ip = self._lookup(host)
+            with self._lock:
+                self._cache[host] = (ip, monotonic())
+        except OSError as e:
+            logging.warning(f"Cannot resolve host '{host}', keeping cached address: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(host)
+
+    def resolve(self, host: str) -> str:
+        """
+        :param host: hostname, SELF_HOST for address of this machine
+        :return: IP address
+        """
+        with self._lock:
+            if host in self._pinned:
+                return self._pinned[host]
+            cached = self._cache.get(host)
+            if cached is not None:
+                ip, resolved_at = cached
+                if monotonic() - resolved_at > self.ttl and host not in self._refreshing:
+                    self._refreshing.add(host)
+                    Thread(target=self._refresh, args=[host], daemon=True).start()
+                return ip
+        ip = self._lookup(host)
+        with self._lock:
+            self._cache[host] = (ip, monotonic())
+        return ip
+
+    def self_ip(self) -> str:
+        """
+        Address of this node. In-process simulation sets host of node sending
+        requests from actual thread
+        """
+        sender = get_sender()
+        return self.resolve(self.SELF_HOST if sender is None else sender)
+
+    def pin(self, host: str, ip: str) -> None:
+        """
+        Set static address of host, e.g. for nodes of in-process simulation
+        """
+        with self._lock:
+            self._pinned[host] = ip
+
+    def unpin(self, host: str) -> None:
+        with self._lock:
+            self._pinned.pop(host, None)
+
+    def invalidate(self, host: str | None = None) -> None:
+        """
+        Forget resolved address, e.g. after network change
+        :param host: host to forget, all hosts by default
+        """
+        with self._lock:
+            if host is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(host, None)
+
+
+resolver = HostResolver()
@@ -0,0 +1,122 @@
+import logging
+import os
+from dataclasses import dataclass
+from enum import StrEnum, auto
+from uuid import UUID
+
+from .block import Block
+from .clock import time
+from .node import SelfNodeInfo
+from .service import Blockchain
+from .storage import BlockSchedulerMetrics
+
+
+class BlockCut(StrEnum):
+    INTERVAL = auto()
+    SIZE = auto()
+
+
+@dataclass
+class BlockDecision:
+    reason: BlockCut
+    identifiers: list[UUID]
+    n_bytes: int
+    pending: int
+    oldest_age: float
+
+
+class BlockScheduler:
+    """
+    Decide when verified transactions are cut into a new block.
+    Block is created when BLOCK_INTERVAL passed since last block or immediately
+    when pending transactions reach BLOCK_MAX_TXS or BLOCK_MAX_BYTES
+    """
+
+    LOG_PREFIX = "BLOCK_SCHEDULER: "
+
+    blockchain: Blockchain
+    interval: float
+    max_txs: int
+    max_bytes: int
+    metrics: BlockSchedulerMetrics
+
+    def __init__(self, blockchain: Blockchain):
+        self.blockchain = blockchain
+        self.interval = float(os.getenv("BLOCK_INTERVAL", 150))
+        self.max_txs = int(os.getenv("BLOCK_MAX_TXS", 1000))
+        self.max_bytes = int(os.getenv("BLOCK_MAX_BYTES", 512 * 1024))
+        self.metrics = BlockSchedulerMetrics()
+
+    def decide(self, now: float | None = None) -> BlockDecision | None:
+        """
+        Select oldest verified transactions fitting in block limits
+        :param now:
+        :return: decision or None if block should not be created yet
+        """
+        if now is None:
+            now = time()
+        txs = sorted(
+            self.blockchain.txs_verified.all().items(), key=lambda item: item[1].time
+        )
+        if not txs:
+            return None
+        identifiers = []
+        n_bytes = 0
+        reason = None
+        for identifier, tx_verified in txs:
+            tx_size = len(tx_verified.tx.encode())
+            if identifiers and n_bytes + tx_size > self.max_bytes:
+                reason = BlockCut.SIZE
+                break
+            identifiers.append(identifier)
+            n_bytes += tx_size
+            if len(identifiers) >= self.max_txs or n_bytes >= self.max_bytes:
+                reason = BlockCut.SIZE
+                break
+        if reason is None:
+            if self.blockchain.get_last_block().timestamp + self.interval > now:
+                return None
+            reason = BlockCut.INTERVAL
+        return BlockDecision(reason, identifiers, n_bytes, len(txs), now - txs[0][1].time)
+
+    def wait_time(self, now: float | None = None) -> float:
+        """
+        Time until block should be created by interval if no new transactions arrive
+        """
+        if now is None:
+            now = time()
+        if not self.blockchain.txs_verified.all():
+            return self.interval
+        return max(self.blockchain.get_last_block().timestamp + self.interval - now, 0)
+
+    def wait(self) -> bool:
+        """
+        Wait for new verified transactions or end of block interval
+        :return: True if verified transactions changed
+        """
+        return self.blockchain.txs_verified.wait_for_change(self.wait_time())
+
+    def create_block(
+        self, self_node: SelfNodeInfo, now: float | None = None
+    ) -> Block | None:
+        decision = self.decide(now)
+        if decision is None:
+            return None
+        block = self.blockchain.create_block(self_node, decision.identifiers)
+        logging.info(
+            self.LOG_PREFIX
+            + f"Block {block.hash().hex()} created by {decision.reason}: "
+            f"{len(decision.identifiers)}/{decision.pending} transactions, {decision.n_bytes} bytes, "
+            f"oldest transaction waited {decision.oldest_age:.3f} s"
+        )
+        self.metrics.append(
+            [
+                block.timestamp,
+                decision.reason.value,
+                len(decision.identifiers),
+                decision.n_bytes,
+                decision.pending,
+                round(decision.oldest_age, 3),
+            ]
+        )
+        return block
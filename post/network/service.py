@@ -1,8 +1,9 @@
 import os
 from hashlib import sha256
+from random import Random
 from uuid import UUID
 
-from post.network.block import BlockCandidate, Block
+from post.network.block import BlockCandidate, Block, BlockHeader
 from post.network.manager import (
     BlockchainManager,
     NodeManager,
@@ -16,30 +17,51 @@ from post.network.manager import (
     NodeTrustHistoryManager,
 )
 from post.network.node import Node as NodeDto, SelfNodeInfo, NodeType
+from post.network.recorder import StateRecorder
+from post.network.storage import BlocksStorage, BlockHeadersStorage, decode_chain
 from post.network.transaction import TxVerified, Tx
+from post.network.utils import lazy_property
 
 
 class Blockchain(BlockchainManager):
     VERSION = 1
-    txs_verified: TransactionVerifiedManager
 
-    def __init__(self):
-        super().__init__()
-        self.txs_verified = TransactionVerifiedManager()
+    def __init__(self, storage: BlocksStorage | None = None):
+        super().__init__(storage)
+
+    @lazy_property
+    def txs_verified(self) -> TransactionVerifiedManager:
+        return TransactionVerifiedManager()
 
     def add_new_transaction(self, uuid: UUID, tx: TxVerified) -> None:
         self.txs_verified.add(uuid, tx)
 
-    def create_block(self, self_node: SelfNodeInfo) -> Block:
+    def create_block(
+        self, self_node: SelfNodeInfo, identifiers: list[UUID] | None = None
+    ) -> Block:
+        """
+        Create block from verified transactions
+        :param self_node:
+        :param identifiers: verified transactions to include, by default all
+        :return:
+        """
         txs_verified = self.txs_verified.all()
-        txs = [txs_verified.tx for txs_verified in list(txs_verified.values())]
+        if identifiers is None:
+            identifiers = list(txs_verified.keys())
+        txs = []
+        tx_hashes = set()
+        for identifier in identifiers:
+            tx = txs_verified[identifier].tx
+            # Transaction verified again under other identifier is included once
+            if tx.hash() not in tx_hashes:
+                tx_hashes.add(tx.hash())
+                txs.append(tx)
         cblock = BlockCandidate.create_new(txs)
-        self.txs_verified.delete(list(txs_verified.keys()))
+        self.txs_verified.delete(identifiers)
         block = cblock.sign(
             self.get_last_block().hash(), self_node.identifier, self_node.private_key
         )
         self.add(block)
-        self.txs_verified.delete(list(txs_verified.keys()))
         return block
 
     def create_first_block(self, self_node: SelfNodeInfo) -> None:
@@ -52,6 +74,17 @@ class Blockchain(BlockchainManager):
             )
         )
 
+    def remove_block_transactions(self, block: Block) -> None:
+        """
+        Remove verified transactions included in block
+        """
+        identifiers = [
+            identifier
+            for identifier, tx_verified in self.txs_verified.all().items()
+            if tx_verified.tx in block.transactions
+        ]
+        self.txs_verified.delete(identifiers)
+
     def find_tx_verified(self, identifier: UUID) -> TxVerified | None:
         if identifier in list(self.txs_verified.all().keys()):
             return self.txs_verified.find(identifier)
@@ -96,24 +129,86 @@ class Blockchain(BlockchainManager):
         return txs_values
 
 
+class LightBlockchain(Blockchain):
+    """
+    Blockchain of light node (LIGHT_NODE=1 on SENSOR) keeping only block headers.
+    Verified transactions are not stored
+    """
+
+    blocks: list[BlockHeader]
+
+    def __init__(self):
+        super().__init__(BlockHeadersStorage())
+
+    def add(self, block: Block | BlockHeader) -> None:
+        if isinstance(block, Block):
+            block = block.header()
+        super().add(block)
+
+    def load_from_bytes(self, b: bytes) -> None:
+        self.set_headers([block.header() for block in decode_chain(b)])
+
+    def set_headers(self, headers: list[BlockHeader]) -> None:
+        self.blocks = headers
+        self._storage.dump(self.blocks)
+        self._record(StateRecorder.BLOCKS, len(self.blocks))
+
+    def add_new_transaction(self, uuid: UUID, tx: TxVerified) -> None:
+        return
+
+    def remove_block_transactions(self, block: Block) -> None:
+        return
+
+    def find_tx_verified(self, identifier: UUID) -> TxVerified | None:
+        return None
+
+    def find_transaction(self, tx_hash: bytes) -> tuple[int, int] | None:
+        return None
+
+    def find_last_transactions_values_for_node(
+        self, node: NodeDto, t_type: str | None = None
+    ) -> list[dict]:
+        return []
+
+
 class Node(NodeManager):
-    validator_agreement: ValidatorAgreement
-    validator_agreement_info: ValidatorAgreementInfoManager
-    validator_agreement_result: ValidatorAgreementResult
-    node_trust: NodeTrust
-    node_trust_history: NodeTrustHistoryManager
-    validators: ValidatorManager
+    """
+    Nodes with their trust and validators. Managers are loaded on first access
+    """
+
+    light: bool
     validators_part: float
+    _agreement_members: tuple[list[NodeDto] | None, int, set[UUID]]
 
-    def __init__(self):
+    def __init__(self, light: bool = False):
         super().__init__()
-        self.validator_agreement = ValidatorAgreement()
-        self.validator_agreement_info = ValidatorAgreementInfoManager()
-        self.validator_agreement_result = ValidatorAgreementResult()
-        self.node_trust = NodeTrust()
-        self.node_trust_history = NodeTrustHistoryManager()
-        self.validators = ValidatorManager()
+        self.light = light
         self.validators_part = float(os.environ.get("VALIDATORS_PART", 0.2))
+        self._agreement_members = (None, 0, set())
+
+    @lazy_property
+    def validator_agreement(self) -> ValidatorAgreement:
+        return ValidatorAgreement()
+
+    @lazy_property
+    def validator_agreement_info(self) -> ValidatorAgreementInfoManager:
+        return ValidatorAgreementInfoManager()
+
+    @lazy_property
+    def validator_agreement_result(self) -> ValidatorAgreementResult:
+        return ValidatorAgreementResult()
+
+    @lazy_property
+    def node_trust(self) -> NodeTrust:
+        return NodeTrust()
+
+    @lazy_property
+    def node_trust_history(self) -> NodeTrustHistoryManager:
+        return NodeTrustHistoryManager(not self.light)
+
+    @lazy_property
+    def validators(self) -> ValidatorManager:
+        return ValidatorManager()
 
     def prepare_all_nodes_info(self) -> list[dict]:
         return self.prepare_nodes_info(self.all())
@@ -121,12 +216,25 @@ class Node(NodeManager):
     def prepare_nodes_info(self, nodes: list[NodeDto]) -> list[dict]:
         self.validators.set_nodes_type(nodes)
         info = []
-        for node in nodes:
+        for node, trust in zip(nodes, self.node_trust.get_nodes_trust(nodes)):
             node_info = node.__dict__
-            node_info["trust"] = self.node_trust.get_node_trust(node)
+            node_info["trust"] = trust
             info.append(node_info)
         return info
 
+    def sort_by_trust(self, nodes: list[NodeDto] | None = None) -> list[NodeDto]:
+        """
+        Sort nodes from the least trusted, nodes of equal trust by identifier
+        :param nodes: all nodes by default
+        """
+        nodes = self.all() if nodes is None else nodes
+        self.node_trust.get_nodes_trust(nodes)
+        by_identifier = {node.identifier: node for node in nodes}
+        return [
+            by_identifier[identifier]
+            for identifier in self.node_trust.get_ledger().order(by_identifier)
+        ]
+
     def update_from_json(self, nodes_dict: list[dict]) -> None:
         nodes = []
         validators = []
@@ -140,6 +248,7 @@ class Node(NodeManager):
             nodes.append(node)
         self._nodes += nodes
         self._storage.dump(self._nodes)
+        self._record(StateRecorder.NODES, len(self._nodes))
         # self.validators.set_validators(validators)
 
     def get_validator_nodes(self) -> list[NodeDto]:
@@ -163,13 +272,11 @@ class Node(NodeManager):
         # return False
 
     def get_most_trusted_validator(self) -> NodeDto:
-        trusts = {}
         validators = self.get_validator_nodes()
-        for validator in validators:
-            trusts[self.node_trust.get_node_trust(validator)] = validator
-
-        sorted_trust = sorted(trusts, reverse=True)
-        return trusts[sorted_trust[0]]
+        self.node_trust.get_nodes_trust(validators)
+        by_identifier = {validator.identifier: validator for validator in validators}
+        identifier, _ = self.node_trust.get_ledger().top_k(1, by_identifier)[0]
+        return by_identifier[identifier]
 
     def is_agreement_started(self) -> bool:
         self.validator_agreement_info.refresh()
@@ -209,6 +316,72 @@ class Node(NodeManager):
     def calculate_validators_number(self) -> int:
         return max(2, int(self.len() * self.validators_part))
 
+    def get_agreement_members(self) -> set[UUID]:
+        """
+        Identifiers of nodes which can be part of agreement. Set is rebuilt
+        only when nodes change, nodes without trust get basic trust then
+        """
+        nodes = self.all()
+        cached_nodes, n_nodes, members = self._agreement_members
+        # Nodes are only appended to list or list is replaced on reload
+        if cached_nodes is not nodes or n_nodes != len(nodes):
+            self.node_trust.get_nodes_trust(nodes)
+            members = {node.identifier for node in nodes}
+            self._agreement_members = (nodes, len(nodes), members)
+        return members
+
+    def get_agreement_window(self) -> list[UUID]:
+        """
+        Nodes which can be proposed in agreement, from the least trusted.
+        First half of agreement are first nodes of window, second half is chosen
+        from the rest. Nodes are read from ranking of trust ledger, which is
+        updated on every trust change
+        """
+        members = self.get_agreement_members()
+        size = self.calculate_validators_number()
+        return self.node_trust.get_ledger().lowest(size + 1, members)
+
+    def propose_agreement(self, rng: Random | None = None) -> list[UUID]:
+        """
+        Prepare list of validators for new agreement
+        :param rng: random generator choosing second half of agreement
+        """
+        window = self.get_agreement_window()
+        size = min(self.calculate_validators_number(), len(window))
+        half = size // 2
+        rng = Random() if rng is None else rng
+        return window[:half] + rng.sample(window[half:], size - half)
+
+    def check_agreement_proposal(self, proposal: list[UUID]) -> str | None:
+        """
+        Check if proposal could be prepared by propose_agreement
+        :return: reason of rejection or None if proposal is valid
+        """
+        if len(proposal) != len(set(proposal)):
+            return "There are duplicates in agreement list"
+        size = self.calculate_validators_number()
+        if size != len(proposal):
+            return (
+                f"Calculated length of nodes ({size}) "
+                f"is not equal agreement list ({len(proposal)})"
+            )
+        window = self.get_agreement_window()
+        half = size // 2
+        if proposal[:half] != window[:half]:
+            return (
+                f"First part of agreement {', '.join(n.hex for n in proposal[:half])} "
+                f"is not equal to calculated {', '.join(n.hex for n in window[:half])}"
+            )
+        # Trust of nodes may differ between proposer and validator, so any
+        # node outside of first part is allowed
+        not_allowed = set(proposal[half:]).difference(self.get_agreement_members())
+        if not_allowed:
+            return (
+                f"Nodes {', '.join(n.hex for n in not_allowed)} are not allowed "
+                f"in second part of agreement"
+            )
+        return None
+
 
 class TransactionToVerify(TransactionToVerifyManager):
     pass
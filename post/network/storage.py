@@ -4,14 +4,17 @@ import logging
 import os
 import time
 import fcntl
-from io import BytesIO
-from typing import BinaryIO
+import numpy as np
+from io import BytesIO, SEEK_CUR
+from typing import BinaryIO, Callable, Iterator, TextIO
 from uuid import UUID
 from pathlib import Path
 
-from post.network.block import Block
+from post.network.block import Block, BlockHeader
 from post.network.node import Node
 from post.network.transaction import TxToVerify, TxVerified
+from . import clock
+from .utils import decode_int
 from .trust import NodeTrustChange
 
 
@@ -30,6 +33,19 @@ def decode_chain(byt: bytes) -> list[Block]:
     return blocks
 
 
+# Journal record of node trust: identifier, value, is value a change
+TrustRecord = tuple[UUID, int, bool]
+
+
+def decode_headers(byt: bytes) -> list[BlockHeader]:
+    b = BytesIO(byt)
+    end = len(byt)
+    headers = []
+    while end - b.tell() > 0:
+        headers.append(BlockHeader.decode(b))
+    return headers
+
+
 class Storage:
     PATH = ""
     path: str
@@ -87,9 +103,40 @@ class Storage:
         self._cached_size = 0
         self._cached_mtime = 0
 
+    def count_rows(self, unique: bool = False) -> int:
+        """
+        Count rows of CSV storage without parsing them
+        :param unique: count distinct identifiers in first column, as loaded dict does
+        """
+        f = open(self.path, "r")
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            if unique:
+                return len({line.split(",", 1)[0] for line in f if line.strip()})
+            return sum(1 for line in f if line.strip())
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+            f.close()
+
+    def wait_for_change(self, timeout: float, interval: float = 0.05) -> bool:
+        """
+        Wait until storage file is changed since last load or write
+        :param timeout: maximal time of waiting in seconds
+        :param interval: time between checks of file stat
+        :return: True if file was changed, False on timeout
+        """
+        end = clock.time() + timeout
+        while self.is_up_to_date():
+            if clock.time() >= end:
+                return False
+            clock.sleep(interval)
+        return True
+
 
 class BlocksStorage(Storage):
     PATH = "blockchain"
+    # Blocks read under one lock of file by load_range
+    RANGE_CHUNK = 64
 
     def load(self) -> list[Block]:
         # self._wait_for_lock()
@@ -139,10 +186,139 @@ class BlocksStorage(Storage):
             return []
         return decode_chain(byt)
 
+    def count(self) -> tuple[int, int]:
+        """
+        Count blocks and their transactions without decoding them.
+        Incomplete last block is not counted
+        :return: number of blocks, number of transactions
+        """
+        f = open(self.path, "rb")
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            size = os.fstat(f.fileno()).st_size
+            n_blocks = 0
+            n_transactions = 0
+            while f.tell() < size:
+                n_transaction = self.skip_in_file(f)
+                if f.tell() > size:
+                    break
+                n_blocks += 1
+                n_transactions += n_transaction
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+            f.close()
+        return n_blocks, n_transactions
+
+    def load_range(
+        self,
+        start: int = 0,
+        limit: int | None = None,
+        headers_only: bool = False,
+        raw: bool = False,
+    ) -> Iterator[Block | BlockHeader | bytes]:
+        """
+        Read limit blocks from height start. Blocks before start are skipped
+        without decoding. File is locked only while chunk of RANGE_CHUNK blocks
+        is read, so slow reader does not block writers. Incomplete last block
+        is not read
+        :param start:
+        :param limit: all blocks to the end by default
+        :param headers_only: transactions of blocks are skipped
+        :param raw: encoded blocks are returned without decoding
+        :return: blocks, headers or encoded blocks
+        """
+        f = open(self.path, "rb")
+        try:
+            position = 0
+            height = 0
+            n_read = 0
+            end_of_file = False
+            while not end_of_file and (limit is None or n_read < limit):
+                chunk = []
+                fcntl.flock(f, fcntl.LOCK_SH)
+                try:
+                    size = os.fstat(f.fileno()).st_size
+                    f.seek(position)
+                    for _ in range(self.RANGE_CHUNK):
+                        if f.tell() >= size or (
+                            limit is not None and n_read + len(chunk) >= limit
+                        ):
+                            end_of_file = f.tell() >= size
+                            break
+                        self.skip_in_file(f)
+                        if f.tell() > size:
+                            end_of_file = True
+                            break
+                        if height >= start:
+                            chunk.append(
+                                self._read_block(f, position, headers_only, raw)
+                            )
+                        position = f.tell()
+                        height += 1
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+                n_read += len(chunk)
+                yield from chunk
+        finally:
+            f.close()
+
+    def _read_block(
+        self, f: BinaryIO, position: int, headers_only: bool, raw: bool
+    ) -> Block | BlockHeader | bytes:
+        """
+        Read block from position of file, which is left after the block
+        """
+        end = f.tell()
+        f.seek(position)
+        if raw:
+            return f.read(end - position)
+        if headers_only:
+            block = self.decode_header_from_file(f)
+        else:
+            block = self.decode_from_file(f)
+        f.seek(end)
+        return block
+
+    def decode_from_file(self, f: BinaryIO) -> Block:
+        return Block.decode(f)
+
+    def decode_header_from_file(self, f: BinaryIO) -> Block | BlockHeader:
+        version = decode_int(f, 4)
+        f.seek(-4, SEEK_CUR)
+        if version < Block.MERKLE_VERSION:
+            # Transactions of block without merkle root are part of its header
+            return Block.decode(f)
+        return BlockHeader.decode(f)
+
+    def skip_in_file(self, f: BinaryIO) -> int:
+        return Block.skip(f)
+
+
+class BlockHeadersStorage(BlocksStorage):
+    PATH = "block_headers"
+
+    def load_from_file(self, f: BinaryIO) -> list[BlockHeader]:
+        byt = f.read()
+        if len(byt) == 0:
+            return []
+        return decode_headers(byt)
+
+    def decode_from_file(self, f: BinaryIO) -> BlockHeader:
+        return BlockHeader.decode(f)
+
+    def decode_header_from_file(self, f: BinaryIO) -> BlockHeader:
+        return BlockHeader.decode(f)
+
+    def skip_in_file(self, f: BinaryIO) -> int:
+        return BlockHeader.skip(f)
+
 
 class NodeStorage(Storage):
     PATH = "nodes"
 
+    def count(self) -> int:
+        return self.count_rows()
+
     def load(self) -> list[Node]:
         f = open(self.path, "r")
         try:
@@ -187,59 +363,195 @@ class NodeStorage(Storage):
             f.close()
 
 
-class NodeTrustStorage(Storage):
-    PATH = "nodes_trust"
+class JournalStorage(Storage):
+    """
+    Append-only CSV storage read incrementally from offset of last read.
+    Compaction atomically replaces file with snapshot, so readers and writers
+    are serialized on separate lock file
+    """
 
-    def load(self) -> dict[UUID, int]:
-        f = open(self.path, "r")
+    _offset: int
+    _inode: int
+
+    def __init__(self, storage: str | None = None):
+        super().__init__(storage)
+        self._offset = 0
+        self._inode = 0
+
+    def _open_lock(self):
+        return open(self.path + ".flock", "a")
+
+    def _read_rows(self, f: TextIO, full: bool) -> tuple[bool, list[list[str]]]:
+        inode = os.fstat(f.fileno()).st_ino
+        size = os.fstat(f.fileno()).st_size
+        if inode != self._inode or size < self._offset:
+            full = True
+        offset = 0 if full else self._offset
+        f.seek(offset)
+        data = f.read()
+        # Skip last row if it is not complete (interrupted write)
+        end = data.rfind("\n") + 1
+        self._offset = offset + len(data[:end].encode())
+        self._inode = inode
+        return full, [row for row in csv.reader(data[:end].splitlines()) if row]
+
+    def read_rows(self, full: bool = False) -> tuple[bool, list[list[str]]]:
+        """
+        Read rows appended since last read
+        :param full: read whole file
+        :return: flag if whole file was read and rows
+        """
+        lock = self._open_lock()
         try:
-            fcntl.flock(f, fcntl.LOCK_EX)
+            fcntl.flock(lock, fcntl.LOCK_EX)
             logging.debug(
                 f"Loading '{self.PATH}' from storage of size: {self.get_size()}"
             )
-            trusts = {}
-            if not self.is_empty():
-                reader = csv.reader(f)
-                for row in reader:
-                    trusts[UUID(row[0])] = int(row[1])
+            with open(self.path, "r", newline="") as f:
+                changes = self._read_rows(f, full)
             self.update_cache()
         finally:
-            fcntl.flock(f, fcntl.LOCK_UN)
-            f.close()
-        return trusts
-
-    def update(self, trusts: dict[UUID, int]) -> None:
-        f = open(self.path, "a")
+            fcntl.flock(lock, fcntl.LOCK_UN)
+            lock.close()
+        return changes
+
+    def append_rows(self, rows: list[list]) -> tuple[bool, list[list[str]]]:
+        """
+        Append rows after reading rows of other processes
+        :return: rows appended by others since last read (see read_rows)
+        """
+        lock = self._open_lock()
         try:
-            fcntl.flock(f, fcntl.LOCK_EX)
-            logging.debug(f"Appending {len(trusts)} {self.PATH} to storage")
-            writer = csv.writer(f)
-            for key in list(trusts.keys()):
-                writer.writerow([key.hex, str(trusts[key])])
-            f.flush()
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            logging.debug(f"Appending {len(rows)} {self.PATH} to storage")
+            with open(self.path, "r+", newline="") as f:
+                changes = self._read_rows(f, False)
+                # Drop incomplete row left by interrupted write
+                f.truncate(self._offset)
+                f.seek(self._offset)
+                csv.writer(f).writerows(rows)
+                f.flush()
+                self._offset = f.tell()
             self.update_cache()
         finally:
-            fcntl.flock(f, fcntl.LOCK_UN)
-            f.close()
+            fcntl.flock(lock, fcntl.LOCK_UN)
+            lock.close()
+        return changes
+
+    def compact_rows(
+        self, compact: Callable[[list[list[str]]], list[list]]
+    ) -> list[list]:
+        """
+        Replace file with snapshot prepared from all its rows
+        :param compact: function preparing snapshot rows from all rows
+        :return: snapshot rows
+        """
+        lock = self._open_lock()
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            with open(self.path, "r", newline="") as f:
+                rows = compact(self._read_rows(f, True)[1])
+            logging.debug(f"Compacting {self.PATH} to {len(rows)} rows")
+            self._write_snapshot(rows)
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+            lock.close()
+        return rows
 
-    def dump(self, trusts: dict[UUID, int]) -> None:
-        f = open(self.path, "w")
+    def write_rows(self, rows: list[list]) -> None:
+        lock = self._open_lock()
         try:
-            fcntl.flock(f, fcntl.LOCK_EX)
-            logging.debug(f"Writing {len(trusts)} {self.PATH} to storage")
-            writer = csv.writer(f)
-            for key in list(trusts.keys()):
-                writer.writerow([key.hex, str(trusts[key])])
-            f.flush()
-            self.update_cache()
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            logging.debug(f"Writing {len(rows)} {self.PATH} to storage")
+            self._write_snapshot(rows)
         finally:
-            fcntl.flock(f, fcntl.LOCK_UN)
-            f.close()
+            fcntl.flock(lock, fcntl.LOCK_UN)
+            lock.close()
+
+    def _write_snapshot(self, rows: list[list]) -> None:
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", newline="") as f:
+            csv.writer(f).writerows(rows)
+            f.flush()
+            os.fsync(f.fileno())
+            self._offset = f.tell()
+        os.replace(tmp_path, self.path)
+        self._inode = os.stat(self.path).st_ino
+        self.update_cache()
+
+
+class NodeTrustStorage(JournalStorage):
+    """
+    Journal of nodes trust. Row <identifier>,<trust> sets trust of node,
+    row <identifier>,<change>,+ adds change to trust of node
+    """
+
+    PATH = "nodes_trust"
+    DELTA = "+"
+
+    @classmethod
+    def _to_records(cls, rows: list[list[str]]) -> list[TrustRecord]:
+        return [
+            (UUID(row[0]), int(row[1]), len(row) > 2 and row[2] == cls.DELTA)
+            for row in rows
+        ]
+
+    @staticmethod
+    def _to_rows(trusts: dict[UUID, int]) -> list[list]:
+        return [[key.hex, str(value)] for key, value in trusts.items()]
+
+    @staticmethod
+    def replay(
+        records: list[TrustRecord], trusts: dict[UUID, int] | None = None
+    ) -> dict[UUID, int]:
+        trusts = {} if trusts is None else trusts
+        for identifier, value, is_delta in records:
+            if is_delta:
+                trusts[identifier] = trusts.get(identifier, 0) + value
+            else:
+                trusts[identifier] = value
+        return trusts
+
+    def load(self) -> dict[UUID, int]:
+        return self.replay(self.read_changes(True)[1])
+
+    def read_changes(self, full: bool = False) -> tuple[bool, list[TrustRecord]]:
+        full, rows = self.read_rows(full)
+        return full, self._to_records(rows)
+
+    def update(self, trusts: dict[UUID, int]) -> tuple[bool, list[TrustRecord]]:
+        full, rows = self.append_rows(self._to_rows(trusts))
+        return full, self._to_records(rows)
+
+    def append_changes(
+        self, changes: dict[UUID, int]
+    ) -> tuple[bool, list[TrustRecord]]:
+        full, rows = self.append_rows(
+            [[key.hex, str(value), self.DELTA] for key, value in changes.items()]
+        )
+        return full, self._to_records(rows)
+
+    def dump(self, trusts: dict[UUID, int]) -> None:
+        self.write_rows(self._to_rows(trusts))
+
+    def compact(self) -> dict[UUID, int]:
+        """
+        Replace journal with snapshot of trusts
+        :return: trusts
+        """
+        rows = self.compact_rows(
+            lambda rows: self._to_rows(self.replay(self._to_records(rows)))
+        )
+        return self.replay(self._to_records(rows))
 
 
 class TransactionStorage(Storage):
     PATH = "transaction"
 
+    def count(self) -> int:
+        self._wait_for_lock()
+        return self.count_rows(True)
+
     def dump(self, txs: dict[UUID, TxToVerify], lock: bool = True) -> None:
         if lock:
             self.wait_for_set_lock()
@@ -308,6 +620,9 @@ class TransactionStorage(Storage):
 class TransactionVerifiedStorage(Storage):
     PATH = "transaction_verified"
 
+    def count(self) -> int:
+        return self.count_rows(True)
+
     def load(self) -> dict[UUID, TxVerified]:
         f = open(self.path, "r")
         try:
@@ -338,6 +653,7 @@ class TransactionVerifiedStorage(Storage):
             writer = csv.writer(f)
             for key, value in txs.items():
                 writer.writerow([key.hex, value.__str__()])
+            f.flush()
             self.update_cache()
         finally:
             fcntl.flock(f, fcntl.LOCK_UN)
@@ -351,6 +667,7 @@ class TransactionVerifiedStorage(Storage):
             writer = csv.writer(f)
             for key, value in txs.items():
                 writer.writerow([key.hex, value.__str__()])
+            f.flush()
             self.update_cache()
         finally:
             fcntl.flock(f, fcntl.LOCK_UN)
@@ -438,15 +755,42 @@ class ValidatorAgreementResultStorage(Storage):
             )
             txs = {}
             if not self.is_empty():
-                reader = csv.reader(f)
-                for row in reader:
-                    txs[UUID(row[0])] = bool(row[1])
+                txs = self._read(f)
             self.update_cache()
         finally:
             fcntl.flock(f, fcntl.LOCK_UN)
             f.close()
         return txs
 
+    @staticmethod
+    def _read(f: TextIO) -> dict[UUID, bool]:
+        return {UUID(row[0]): bool(row[1]) for row in csv.reader(f) if row}
+
+    def add_if_absent(
+        self, identifier: UUID, result: bool
+    ) -> tuple[bool, dict[UUID, bool]]:
+        """
+        Append result of node unless node already has result. Check and write
+        are done under one lock, so node cannot vote twice from two processes
+        :return: flag if result was appended and all results
+        """
+        f = open(self.path, "a+")
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            f.seek(0)
+            results = self._read(f)
+            added = identifier not in results
+            if added:
+                logging.debug(f"Appending 1 {self.PATH} to storage")
+                csv.writer(f).writerow([identifier.hex, result.__str__()])
+                f.flush()
+                results[identifier] = result
+            self.update_cache()
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+            f.close()
+        return added, results
+
     def update(self, results: dict[UUID, bool]) -> None:
         f = open(self.path, "a")
         try:
@@ -476,140 +820,529 @@ class ValidatorAgreementResultStorage(Storage):
             f.close()
 
 
-class NodeTrustHistory(Storage):
+class NodeTrustHistory(JournalStorage):
     PATH = "node_trust_history"
 
     def load(self) -> list[NodeTrustChange]:
-        f = open(self.path, "r")
-        try:
-            fcntl.flock(f, fcntl.LOCK_EX)
-            logging.debug(
-                f"Loading '{self.PATH}' from storage of size: {self.get_size()}"
-            )
-            node_trusts = []
-            if not self.is_empty():
-                reader = csv.reader(f)
-                node_trusts = [NodeTrustChange.load_from_list(data) for data in reader]
-            self.update_cache()
-        finally:
-            fcntl.flock(f, fcntl.LOCK_UN)
-            f.close()
-        return node_trusts
+        return self.read_changes(True)[1]
+
+    def read_changes(self, full: bool = False) -> tuple[bool, list[NodeTrustChange]]:
+        full, rows = self.read_rows(full)
+        return full, [NodeTrustChange.load_from_list(row) for row in rows]
 
     def dump(self, nodes_trusts: list[NodeTrustChange]) -> None:
-        f = open(self.path, "w")
+        self.write_rows([node_trust.to_list() for node_trust in nodes_trusts])
+
+    def update(
+        self, node_trusts: list[NodeTrustChange]
+    ) -> tuple[bool, list[NodeTrustChange]]:
+        full, rows = self.append_rows(
+            [node_trust.to_list() for node_trust in node_trusts]
+        )
+        return full, [NodeTrustChange.load_from_list(row) for row in rows]
+
+    def compact(self, min_timestamp: float) -> list[NodeTrustChange]:
+        """
+        Remove changes older than min_timestamp
+        :return: kept changes
+        """
+        rows = self.compact_rows(
+            lambda rows: [row for row in rows if float(row[1]) >= min_timestamp]
+        )
+        return [NodeTrustChange.load_from_list(row) for row in rows]
+
+
+TRUST_HISTORY_DTYPE = np.dtype(
+    [
+        ("node", "<u4"),
+        ("timestamp", "<f8"),
+        ("recorded", "<f8"),
+        ("type", "u1"),
+        ("change", "<i4"),
+        ("data_offset", "<u8"),
+        ("data_size", "<u4"),
+    ]
+)
+
+
+class NodeTrustFullHistory(JournalStorage):
+    """
+    Full history of node trust changes in columnar binary segments.
+    Nodes are listed in journal file, record refers node by position in it.
+    Records of TRUST_HISTORY_DTYPE are appended to segment file covering
+    TRUST_HISTORY_BUCKET seconds of change time and can be memory-mapped.
+    Additional data is appended to data file of segment and referenced by offset
+    """
+
+    PATH = "node_trust_full_history_nodes"
+    SEGMENT_PREFIX = "node_trust_full_history_"
+    # CSV history written before segments, rows of NodeTrustChange.to_list
+    # with recorded time
+    LEGACY_PATH = "node_trust_full_history"
+
+    bucket: int
+    _nodes: list[UUID]
+    _node_indexes: dict[UUID, int]
+
+    def __init__(self, storage: str | None = None):
+        super().__init__(storage)
+        self.bucket = int(os.getenv("TRUST_HISTORY_BUCKET", 3600))
+        self._nodes = []
+        self._node_indexes = {}
+        self._migrate_legacy()
+
+    def _add_nodes(self, full: bool, rows: list[list[str]]) -> None:
+        if full:
+            self._nodes = []
+            self._node_indexes = {}
+        for row in rows:
+            node_id = UUID(row[0])
+            self._node_indexes[node_id] = len(self._nodes)
+            self._nodes.append(node_id)
+
+    def _segment_path(self, bucket_start: int) -> str:
+        return os.path.join(self._storage_dir, f"{self.SEGMENT_PREFIX}{bucket_start}")
+
+    def _migrate_legacy(self) -> None:
+        """
+        Move changes of CSV history into segments once. Migrated file is kept
+        with suffix .migrated
+        """
+        legacy_path = os.path.join(self._storage_dir, self.LEGACY_PATH)
+        if not os.path.isfile(legacy_path):
+            return
+        lock = self._open_lock()
         try:
-            fcntl.flock(f, fcntl.LOCK_EX)
-            logging.debug(f"Writing {len(nodes_trusts)} '{self.PATH}' to storage")
-            writer = csv.writer(f)
-            writer.writerows([node_trust.to_list() for node_trust in nodes_trusts])
-            f.flush()
-            self.update_cache()
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            # Migrated by other process in the meantime
+            if not os.path.isfile(legacy_path):
+                return
+            with open(legacy_path, "r", newline="") as f:
+                rows = [row for row in csv.reader(f) if row]
+            logging.info(f"Migrating {len(rows)} {self.LEGACY_PATH} to segments")
+            now = clock.time()
+            self._write_changes(
+                [
+                    (
+                        NodeTrustChange.load_from_list(row),
+                        float(row[5]) if len(row) > 5 else now,
+                    )
+                    for row in rows
+                ]
+            )
+            os.replace(legacy_path, legacy_path + ".migrated")
         finally:
-            fcntl.flock(f, fcntl.LOCK_UN)
-            f.close()
+            fcntl.flock(lock, fcntl.LOCK_UN)
+            lock.close()
 
     def update(self, node_trusts: list[NodeTrustChange]) -> None:
-        f = open(self.path, "a")
+        lock = self._open_lock()
         try:
-            fcntl.flock(f, fcntl.LOCK_EX)
+            fcntl.flock(lock, fcntl.LOCK_EX)
             logging.debug(f"Appending {len(node_trusts)} {self.PATH} to storage")
-            writer = csv.writer(f)
-            writer.writerows([node_trust.to_list() for node_trust in node_trusts])
-            f.flush()
-            self.update_cache()
+            recorded = clock.time()
+            self._write_changes([(node_trust, recorded) for node_trust in node_trusts])
         finally:
-            fcntl.flock(f, fcntl.LOCK_UN)
-            f.close()
+            fcntl.flock(lock, fcntl.LOCK_UN)
+            lock.close()
+
+    def _write_changes(self, changes: list[tuple[NodeTrustChange, float]]) -> None:
+        """
+        Add new nodes to journal and append changes to segments, called under lock
+        :param changes: changes with their recorded time
+        """
+        with open(self.path, "r+", newline="") as f:
+            self._add_nodes(*self._read_rows(f, False))
+            new_nodes = list(
+                dict.fromkeys(
+                    node_trust.node_id
+                    for node_trust, _ in changes
+                    if node_trust.node_id not in self._node_indexes
+                )
+            )
+            f.truncate(self._offset)
+            f.seek(self._offset)
+            csv.writer(f).writerows([[node_id.hex] for node_id in new_nodes])
+            f.flush()
+            self._offset = f.tell()
+        self._add_nodes(False, [[node_id.hex] for node_id in new_nodes])
+        self.update_cache()
 
+        segments = {}
+        for node_trust, recorded in changes:
+            bucket_start = int(node_trust.timestamp // self.bucket * self.bucket)
+            segments.setdefault(bucket_start, []).append((node_trust, recorded))
+        for bucket_start, bucket_changes in segments.items():
+            self._append_segment(self._segment_path(bucket_start), bucket_changes)
+
+    def _append_segment(
+        self, path: str, changes: list[tuple[NodeTrustChange, float]]
+    ) -> None:
+        records = np.zeros(len(changes), dtype=TRUST_HISTORY_DTYPE)
+        with open(path + ".data", "ab") as f:
+            offset = f.tell()
+            for i, (node_trust, recorded) in enumerate(changes):
+                data = node_trust.additional_data.encode()
+                records[i] = (
+                    self._node_indexes[node_trust.node_id],
+                    node_trust.timestamp,
+                    recorded,
+                    node_trust.type.value,
+                    node_trust.change,
+                    offset,
+                    len(data),
+                )
+                f.write(data)
+                offset += len(data)
+        with open(path + ".bin", "ab") as f:
+            # Drop incomplete record left by interrupted write
+            f.truncate(f.tell() - f.tell() % TRUST_HISTORY_DTYPE.itemsize)
+            f.write(records.tobytes())
+
+    def nodes(self) -> list[UUID]:
+        """
+        :return: nodes in order of their index used by records
+        """
+        if not self.is_up_to_date():
+            self._add_nodes(*self.read_rows())
+        return list(self._nodes)
+
+    def segments(
+        self, start: float | None = None, end: float | None = None
+    ) -> list[tuple[int, str]]:
+        """
+        Segments which may contain changes from start to end
+        :return: list of (bucket start, segment path without extension)
+        """
+        segments = []
+        for path in Path(self._storage_dir).glob(self.SEGMENT_PREFIX + "*.bin"):
+            bucket_start = int(path.stem.removeprefix(self.SEGMENT_PREFIX))
+            if start is not None and bucket_start + self.bucket <= start:
+                continue
+            if end is not None and bucket_start > end:
+                continue
+            segments.append((bucket_start, str(path.with_suffix(""))))
+        return sorted(segments)
+
+    @staticmethod
+    def read_segment(path: str) -> np.ndarray:
+        """
+        Memory-map records of segment
+        :param path: segment path without extension
+        """
+        count = os.path.getsize(path + ".bin") // TRUST_HISTORY_DTYPE.itemsize
+        if count == 0:
+            return np.zeros(0, dtype=TRUST_HISTORY_DTYPE)
+        return np.memmap(path + ".bin", TRUST_HISTORY_DTYPE, "r", shape=(count,))
+
+    def load_records(
+        self,
+        start: float | None = None,
+        end: float | None = None,
+        node_id: UUID | None = None,
+    ) -> np.ndarray:
+        """
+        Records of changes from start to end sorted by change time
+        :param node_id: select only changes of node
+        """
+        node_index = None
+        if node_id is not None:
+            if node_id not in self._node_indexes:
+                self.nodes()
+            node_index = self._node_indexes.get(node_id)
+            if node_index is None:
+                return np.zeros(0, dtype=TRUST_HISTORY_DTYPE)
+        parts = []
+        for _, path in self.segments(start, end):
+            records = self.read_segment(path)
+            mask = np.ones(len(records), dtype=bool)
+            if node_index is not None:
+                mask &= records["node"] == node_index
+            if start is not None:
+                mask &= records["timestamp"] >= start
+            if end is not None:
+                mask &= records["timestamp"] <= end
+            parts.append(records[mask])
+        if not parts:
+            return np.zeros(0, dtype=TRUST_HISTORY_DTYPE)
+        records = np.concatenate(parts)
+        return records[np.argsort(records["timestamp"], kind="stable")]
+
+    def trust_over_time(
+        self,
+        node_id: UUID,
+        initial_trust: int = 0,
+        start: float | None = None,
+        end: float | None = None,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Trust of node after each of its changes
+        :param initial_trust: trust of node before start
+        :return: times of changes and trust after them
+        """
+        records = self.load_records(start, end, node_id)
+        return records["timestamp"], initial_trust + np.cumsum(
+            records["change"], dtype=np.int64
+        )
+
+    def load_rows(self) -> list[list]:
+        """
+        Changes in form of rows of former CSV history:
+        node, timestamp, type, change, additional data, recorded time
+        """
+        nodes = self.nodes()
+        rows = []
+        for _, path in self.segments():
+            records = self.read_segment(path)
+            with open(path + ".data", "rb") as f:
+                data = f.read()
+            for record in records:
+                offset = int(record["data_offset"])
+                rows.append(
+                    [
+                        nodes[record["node"]].hex,
+                        float(record["timestamp"]),
+                        int(record["type"]),
+                        int(record["change"]),
+                        data[offset : offset + int(record["data_size"])].decode(),
+                        float(record["recorded"]),
+                    ]
+                )
+        return rows
 
-class NodeTrustFullHistory(NodeTrustHistory):
-    PATH = "node_trust_full_history"
+    def load(self) -> list[NodeTrustChange]:
+        return [NodeTrustChange.load_from_list(row) for row in self.load_rows()]
 
-    def update(self, node_trusts: list[NodeTrustChange]) -> None:
+
+class RejectedTransactions(JournalStorage):
+    """
+    Journal of rejected transactions with rows <identifier>,<rejection time>
+    """
+
+    PATH = "rejected_transactions"
+
+    @staticmethod
+    def _to_rejections(rows: list[list[str]]) -> list[tuple[UUID, float]]:
+        # Rows written before rejection time was stored are kept as new
+        now = clock.time()
+        return [
+            (UUID(row[0]), float(row[1]) if len(row) > 1 else now) for row in rows
+        ]
+
+    def load(self) -> list[UUID]:
+        return [identifier for identifier, _ in self.read_changes(True)[1]]
+
+    def read_changes(
+        self, full: bool = False
+    ) -> tuple[bool, list[tuple[UUID, float]]]:
+        full, rows = self.read_rows(full)
+        return full, self._to_rejections(rows)
+
+    def update(
+        self, identifiers: list[UUID], timestamp: float | None = None
+    ) -> tuple[bool, list[tuple[UUID, float]]]:
+        timestamp = clock.time() if timestamp is None else timestamp
+        full, rows = self.append_rows(
+            [[identifier.hex, timestamp] for identifier in identifiers]
+        )
+        return full, self._to_rejections(rows)
+
+    def compact(
+        self, min_timestamp: float, max_size: int
+    ) -> list[tuple[UUID, float]]:
+        """
+        Keep at most max_size newest rejections not older than min_timestamp
+        :return: kept rejections
+        """
+
+        def keep(rows: list[list[str]]) -> list[list]:
+            rejections = {}
+            for identifier, timestamp in self._to_rejections(rows):
+                if timestamp >= min_timestamp:
+                    rejections[identifier] = timestamp
+            items = list(rejections.items())[-max_size:] if max_size > 0 else []
+            return [[identifier.hex, timestamp] for identifier, timestamp in items]
+
+        return self._to_rejections(self.compact_rows(keep))
+
+
+class TransactionTime(Storage):
+    PATH = "transaction_time"
+
+    def append(self, identifier: UUID, result: bool, tx_time: float) -> None:
         f = open(self.path, "a")
         try:
             fcntl.flock(f, fcntl.LOCK_EX)
-            logging.debug(f"Appending {len(node_trusts)} {self.PATH} to storage")
+            logging.debug(f"Appending 1 {self.PATH} to storage")
             writer = csv.writer(f)
-            data = []
-            timestamp = time.time()
-            for node_trust in node_trusts:
-                record = node_trust.to_list()
-                record.append(timestamp)
-                data.append(record)
-            writer.writerows(data)
+            writer.writerow([identifier.hex, result, tx_time])
             f.flush()
             self.update_cache()
         finally:
             fcntl.flock(f, fcntl.LOCK_UN)
             f.close()
 
-class RejectedTransactions(Storage):
-    PATH = "rejected_transactions"
-
-    def load(self) -> list[UUID]:
+    def load(self) -> dict[UUID, tuple[bool, float]]:
         f = open(self.path, "r")
         try:
             fcntl.flock(f, fcntl.LOCK_EX)
             logging.debug(
                 f"Loading '{self.PATH}' from storage of size: {self.get_size()}"
             )
-            identifiers = []
+            transactions_times = {}
             if not self.is_empty():
                 reader = csv.reader(f)
-                identifiers = [UUID(data[0]) for data in reader]
+                for row in reader:
+                    transactions_times[UUID(row[0])] = (row[1] == "True", float(row[2]))
             self.update_cache()
         finally:
             fcntl.flock(f, fcntl.LOCK_UN)
             f.close()
-        return identifiers
+        return transactions_times
+
+
+class TransactionLatency(TransactionTime):
+    """
+    Time from submission of transaction by load generator to its settlement
+    seen by sending node, in format of TransactionTime
+    """
+
+    PATH = "transaction_latency"
+
 
-    def update(self, identifiers: list[UUID]) -> None:
+# Vote accounted for settled transaction: transaction, voter, result, settle time
+SettledVote = tuple[UUID, UUID, bool, float]
+
+
+class SettledTransactionVotes(JournalStorage):
+    """
+    Journal of voters accounted for settled transactions with rows
+    <identifier>,<voter>,<result>,<settle time>
+    """
+
+    PATH = "transaction_settled_votes"
+
+    @staticmethod
+    def _to_votes(rows: list[list[str]]) -> list[SettledVote]:
+        # Rows written before settle time was stored are kept as new
+        now = clock.time()
+        return [
+            (
+                UUID(row[0]),
+                UUID(row[1]),
+                bool(int(row[2])),
+                float(row[3]) if len(row) > 3 else now,
+            )
+            for row in rows
+        ]
+
+    def load(self) -> dict[UUID, tuple[bool, set[UUID]]]:
+        settled = {}
+        for identifier, voter, result, _ in self.read_changes(True)[1]:
+            settled.setdefault(identifier, (result, set()))[1].add(voter)
+        return settled
+
+    def read_changes(self, full: bool = False) -> tuple[bool, list[SettledVote]]:
+        full, rows = self.read_rows(full)
+        return full, self._to_votes(rows)
+
+    def update(
+        self,
+        identifier: UUID,
+        result: bool,
+        voters: list[UUID],
+        timestamp: float | None = None,
+    ) -> tuple[bool, list[SettledVote]]:
+        timestamp = clock.time() if timestamp is None else timestamp
+        full, rows = self.append_rows(
+            [[identifier.hex, voter.hex, int(result), timestamp] for voter in voters]
+        )
+        return full, self._to_votes(rows)
+
+    def compact(self, min_timestamp: float) -> list[SettledVote]:
+        """
+        Keep votes of transactions settled not earlier than min_timestamp
+        :return: kept votes
+        """
+
+        def keep(rows: list[list[str]]) -> list[list]:
+            return [
+                [identifier.hex, voter.hex, int(result), timestamp]
+                for identifier, voter, result, timestamp in self._to_votes(rows)
+                if timestamp >= min_timestamp
+            ]
+
+        return self._to_votes(self.compact_rows(keep))
+
+
+class BlockSchedulerMetrics(Storage):
+    PATH = "block_scheduler_metrics"
+
+    def append(self, row: list) -> None:
         f = open(self.path, "a")
         try:
             fcntl.flock(f, fcntl.LOCK_EX)
-            logging.debug(f"Appending {len(identifiers)} {self.PATH} to storage")
-            writer = csv.writer(f)
-            for identifier in identifiers:
-                writer.writerow([identifier.hex])
+            csv.writer(f).writerow(row)
             f.flush()
             self.update_cache()
         finally:
             fcntl.flock(f, fcntl.LOCK_UN)
             f.close()
 
-class TransactionTime(Storage):
-    PATH = "transaction_time"
+    def load(self) -> list[dict]:
+        f = open(self.path, "r")
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            rows = [
+                {
+                    "timestamp": int(row[0]),
+                    "reason": row[1],
+                    "n_transaction": int(row[2]),
+                    "n_bytes": int(row[3]),
+                    "pending": int(row[4]),
+                    "oldest_age": float(row[5]),
+                }
+                for row in csv.reader(f)
+            ]
+            self.update_cache()
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+            f.close()
+        return rows
 
-    def append(self, identifier: UUID, result: bool, tx_time: float) -> None:
-        f = open(self.path, "a")
+
+# Recorded change of state: time, kind of state, key (e.g. node), value
+StateEvent = tuple[float, str, str, int]
+
+
+class StateEvents(Storage):
+    PATH = "state_events"
+
+    def append(self, events: list[StateEvent]) -> None:
+        f = open(self.path, "a", newline="")
         try:
             fcntl.flock(f, fcntl.LOCK_EX)
-            logging.debug(f"Appending 1 {self.PATH} to storage")
-            writer = csv.writer(f)
-            writer.writerow([identifier.hex, result, tx_time])
+            csv.writer(f).writerows(
+                [[repr(t), kind, key, value] for t, kind, key, value in events]
+            )
             f.flush()
             self.update_cache()
         finally:
             fcntl.flock(f, fcntl.LOCK_UN)
             f.close()
 
-    def load(self) -> dict[UUID, tuple[bool, float]]:
-        f = open(self.path, "r")
+    def load(self) -> list[StateEvent]:
+        f = open(self.path, "r", newline="")
         try:
             fcntl.flock(f, fcntl.LOCK_EX)
-            logging.debug(
-                f"Loading '{self.PATH}' from storage of size: {self.get_size()}"
-            )
-            transactions_times = {}
-            if not self.is_empty():
-                reader = csv.reader(f)
-                for row in reader:
-                    transactions_times[UUID(row[0])] = (bool(row[1]), float(row[2]))
+            events = [
+                (float(row[0]), row[1], row[2], int(row[3]))
+                for row in csv.reader(f)
+                if len(row) == 4
+            ]
             self.update_cache()
         finally:
             fcntl.flock(f, fcntl.LOCK_UN)
             f.close()
-        return transactions_times
-        
+        events.sort(key=lambda event: event[0])
+        return events
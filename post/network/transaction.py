@@ -2,12 +2,14 @@ import json
 import logging
 from base64 import b64encode, b64decode
 from dataclasses import dataclass
-from io import BytesIO
+from hashlib import sha256
+from io import BytesIO, SEEK_CUR
+from typing import BinaryIO
 from uuid import UUID
-from time import time
 
 from cryptography.exceptions import InvalidSignature
 
+from .clock import time
 from .exception import PoTException
 from .node import SelfNodeInfo, Node, SelfNode
 from .utils import decode_int, decode_str, encode_int, encode_str, read_bytes
@@ -47,6 +49,16 @@ class Tx:
         data = json.loads(data_str)
         return cls(version, timestamp, sender, signature, data)
 
+    @classmethod
+    def skip(cls, s: BinaryIO) -> None:
+        """
+        Move stream after encoded Tx without decoding it
+        """
+        # version, timestamp, sender and signature
+        s.seek(4 + 4 + 16 + 64, SEEK_CUR)
+        data_length = decode_int(s, 4)
+        s.seek(data_length, SEEK_CUR)
+
     def encode(self) -> bytes:
         out = []
         out += [encode_int(self.version, 4)]
@@ -110,6 +122,9 @@ class Tx:
     def __hash__(self):
         return self.encode().__hash__()
 
+    def hash(self) -> bytes:
+        return sha256(self.encode()).digest()
+
     @classmethod
     def from_str(cls, data: str):
         return cls.decode(BytesIO(b64decode(bytes.fromhex(data))))
@@ -165,6 +180,20 @@ class TxVerified:
         split = data.split(":")
         return cls(Tx.from_str((split[0].replace("_", ":"))), int(split[1]))
 
+    def encode(self) -> bytes:
+        return b"".join([encode_int(self.time, 8), self.tx.encode()])
+
+    @classmethod
+    def decode(cls, s: BytesIO):
+        """
+        Decode TxVerified from bytes
+        <time(unix)><transaction>
+        :param s:
+        :return:
+        """
+        verified_time = decode_int(s, 8)
+        return cls(Tx.decode(s), verified_time)
+
 
 @dataclass
 class TxToVerify:
@@ -0,0 +1,91 @@
+from abc import ABC, abstractmethod
+from threading import Thread, local
+
+import requests
+
+
+class Transport(ABC):
+    """
+    Sends HTTP requests to other nodes. Default transport uses requests,
+    simulation replaces it with in-memory delivery. Synchronous transport
+    waits for end of each sender thread, so messages are delivered in order
+    """
+
+    synchronous = False
+
+    @abstractmethod
+    def request(self, method: str, url: str, **kwargs):
+        """
+        :return: response with status_code, content, text, headers and json()
+        """
+
+
+class RequestsTransport(Transport):
+    def request(self, method: str, url: str, **kwargs):
+        return requests.request(method, url, **kwargs)
+
+
+_transport: Transport = RequestsTransport()
+_sender = local()
+
+
+def set_transport(transport: Transport) -> Transport:
+    """
+    Replace transport used by all nodes of process
+    :return: previous transport
+    """
+    global _transport
+    previous = _transport
+    _transport = transport
+    return previous
+
+
+def get_transport() -> Transport:
+    return _transport
+
+
+def get_sender() -> str | None:
+    """
+    Host of node sending requests from actual thread, None outside simulation
+    """
+    return getattr(_sender, "host", None)
+
+
+def set_sender(host: str | None) -> str | None:
+    """
+    :return: previous sender of actual thread
+    """
+    previous = get_sender()
+    _sender.host = host
+    return previous
+
+
+def get(url: str, params: dict | None = None, **kwargs):
+    return _transport.request("GET", url, params=params, **kwargs)
+
+
+def post(url: str, data=None, json=None, **kwargs):
+    return _transport.request("POST", url, data=data, json=json, **kwargs)
+
+
+def patch(url: str, data=None, **kwargs):
+    return _transport.request("PATCH", url, data=data, **kwargs)
+
+
+class SenderThread(Thread):
+    """
+    Thread sending requests on behalf of node which started it
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._sender_host = get_sender()
+
+    def start(self) -> None:
+        super().start()
+        if _transport.synchronous:
+            self.join()
+
+    def run(self) -> None:
+        set_sender(self._sender_host)
+        super().run()
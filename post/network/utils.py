@@ -1,5 +1,8 @@
+import logging
 import os
+from functools import cached_property
 from io import BytesIO
+from time import perf_counter
 from typing import Literal
 
 
@@ -41,3 +44,29 @@ def encode_str(s: str, n_bytes: int = None) -> bytes:
 
 def read_bytes(io: BytesIO, n_bytes: int):
     return io.read(n_bytes)
+
+
+class lazy_property(cached_property):
+    """
+    Attribute created on first access. Time of creation is logged and kept
+    in load_times dict of instance
+    """
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        start = perf_counter()
+        value = super().__get__(instance, owner)
+        elapsed = perf_counter() - start
+        instance.__dict__.setdefault("load_times", {})[self.attrname] = elapsed
+        logging.debug(
+            f"Loaded {type(instance).__name__}.{self.attrname} in {elapsed * 1000:.1f} ms"
+        )
+        return value
+
+
+def is_loaded(instance, name: str) -> bool:
+    """
+    Check if lazy_property of instance was already created
+    """
+    return name in instance.__dict__
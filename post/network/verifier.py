@@ -1,10 +1,11 @@
 import logging
-from time import sleep
 from random import shuffle
 
 import numpy as np
 
 from post.network.blockchain import PoST
+from post.network.clock import sleep
+from post.network.manager import flush_node_trusts
 from post.network.transaction import TxToVerify
 
 
@@ -40,64 +41,80 @@ class TransactionVerifier:
         while True:
             if self.stop:
                 logging.info(self.LOG_PREFIX + "Stop signal received. Exiting")
+                flush_node_trusts()
                 break
+            wait = self.step()
+            if wait:
+                sleep(wait)
 
-            if not self.pot.nodes.is_validator(self.pot.self_node.get_node()):
-                sleep(5)
-                continue
-
-            uuid_to_do = []
-            for uuid, tx_to_verify in self.pot.tx_to_verified.all().items():
-                if self.pot.self_node.identifier not in list(tx_to_verify.voting.keys()):
-                    logging.debug(
-                        self.LOG_PREFIX
-                        + f"Transaction {uuid.hex} has no vote from self node {self.pot.self_node.identifier.hex}. Adding to verify. "
-                        + f"Voting: " + ', '.join([f"{k.hex}-{v}" for k, v in tx_to_verify.voting.items()])
-                    )
-                    uuid_to_do.append(uuid)
-
-            if not uuid_to_do:
-                logging.debug(self.LOG_PREFIX + "Nothing to verify")
-                sleep(1)
-                continue
-
-            logging.debug(
+    def step(self) -> float:
+        """
+        Verify one transaction without vote of self node
+        :return: seconds to wait before next step
+        """
+        if not self.pot.nodes.is_validator(self.pot.self_node.get_node()):
+            return 5
+
+        try:
+            self.pot.settle_timed_out_transactions()
+        except Exception as e:
+            logging.error(
                 self.LOG_PREFIX
-                + f"Transactions {','.join([uid.hex for uid in uuid_to_do])} found to verify"
+                + f"Error while settling timed out transactions. Error: {e}"
             )
 
-            tx_uuid = None
-            tx_to_verify = None
-            shuffle(uuid_to_do)
-            for uuid in uuid_to_do:
-                tx_to_verify = self.pot.tx_to_verified.find(uuid)
-                if tx_to_verify: #and tx_to_verify.voting.keys()
-                    # For scaling reasons part of TxToVerified must be lock
-                    tx_uuid = uuid
-                    break
-
-            if not tx_to_verify:
-                logging.debug(self.LOG_PREFIX + f"Nothing to verify")
-                continue
-
-            logging.debug(
-                self.LOG_PREFIX + f"Verifying transaction of id {tx_uuid.hex}"
-            )
-            try:
-                result = self.verify_transaction(tx_to_verify)
-                logging.info(
+        uuid_to_do = []
+        for uuid, tx_to_verify in self.pot.tx_to_verified.all().items():
+            if self.pot.self_node.identifier not in list(tx_to_verify.voting.keys()):
+                logging.debug(
                     self.LOG_PREFIX
-                    + f"Transaction {tx_uuid.hex} verified. Result: {result}"
-                )
-                self.pot.add_transaction_verification_result(
-                    tx_uuid, self.pot.self_node.get_node(), result
-                )
-                self.pot.send_transaction_verification(tx_uuid, result)
-            except Exception as e:
-                logging.error(
-                    self.LOG_PREFIX
-                    + f"Error while verifying transaction of id {tx_uuid.hex}. Error: {e}"
+                    + f"Transaction {uuid.hex} has no vote from self node {self.pot.self_node.identifier.hex}. Adding to verify. "
+                    + f"Voting: " + ', '.join([f"{k.hex}-{v}" for k, v in tx_to_verify.voting.items()])
                 )
+                uuid_to_do.append(uuid)
+
+        if not uuid_to_do:
+            logging.debug(self.LOG_PREFIX + "Nothing to verify")
+            return 1
+
+        logging.debug(
+            self.LOG_PREFIX
+            + f"Transactions {','.join([uid.hex for uid in uuid_to_do])} found to verify"
+        )
+
+        tx_uuid = None
+        tx_to_verify = None
+        shuffle(uuid_to_do)
+        for uuid in uuid_to_do:
+            tx_to_verify = self.pot.tx_to_verified.find(uuid)
+            if tx_to_verify: #and tx_to_verify.voting.keys()
+                # For scaling reasons part of TxToVerified must be lock
+                tx_uuid = uuid
+                break
+
+        if not tx_to_verify:
+            logging.debug(self.LOG_PREFIX + f"Nothing to verify")
+            return 0
+
+        logging.debug(
+            self.LOG_PREFIX + f"Verifying transaction of id {tx_uuid.hex}"
+        )
+        try:
+            result = self.verify_transaction(tx_to_verify)
+            logging.info(
+                self.LOG_PREFIX
+                + f"Transaction {tx_uuid.hex} verified. Result: {result}"
+            )
+            self.pot.add_transaction_verification_result(
+                tx_uuid, self.pot.self_node.get_node(), result
+            )
+            self.pot.send_transaction_verification(tx_uuid, result)
+        except Exception as e:
+            logging.error(
+                self.LOG_PREFIX
+                + f"Error while verifying transaction of id {tx_uuid.hex}. Error: {e}"
+            )
+        return 0
 
     def verify_transaction(self, tx_to_verify: TxToVerify) -> bool:
         special_prefix = self.LOG_PREFIX + " _special_ "
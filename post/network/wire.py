@@ -0,0 +1,42 @@
+from base64 import b64encode, b64decode
+from enum import StrEnum, auto
+
+ENCODING_HEADER = "X-PoST-Encoding"
+BINARY_MIMETYPE = "application/octet-stream"
+
+
+class WireEncoding(StrEnum):
+    """
+    Encoding of bytes sent inside JSON between nodes.
+    LEGACY (hex of base64) is used when peer does not send ENCODING_HEADER
+    """
+
+    LEGACY = auto()
+    BASE64 = auto()
+
+    def encode_bytes(self, b: bytes) -> str:
+        match self:
+            case self.BASE64:
+                return b64encode(b).decode("ascii")
+            case _:
+                return b64encode(b).hex()
+
+    def decode_bytes(self, s: str) -> bytes:
+        match self:
+            case self.BASE64:
+                return b64decode(s)
+            case _:
+                return b64decode(bytes.fromhex(s))
+
+    @classmethod
+    def from_headers(cls, headers) -> "WireEncoding":
+        value = headers.get(ENCODING_HEADER)
+        if value is None:
+            return cls.LEGACY
+        try:
+            return cls(value.lower())
+        except ValueError:
+            return cls.LEGACY
+
+    def to_headers(self) -> dict:
+        return {ENCODING_HEADER: self.value}
@@ -1,9 +1,19 @@
 import logging
 from enum import StrEnum, auto
+from functools import partial
 from threading import Thread
 
-from .definitions import instant_sender, mad_sender, simple_sender, none_sender
+from .definitions import (
+    instant_sender,
+    instant_sender_step,
+    load_generator,
+    mad_sender,
+    mad_sender_step,
+    simple_sender,
+    none_sender,
+)
 from .exception import ScenarioNotFound, ScenarioNotSupported
+from .load import LoadGenerator
 from post.network.blockchain import PoST
 
 
@@ -12,6 +22,7 @@ class Scenario(StrEnum):
     INSTANT_SENDER = auto()
     MAD_SENDER = auto()
     SIMPLE_SENDER = auto()
+    LOAD_GENERATOR = auto()
 
     def get_definition(self):
         match self:
@@ -21,11 +32,30 @@ class Scenario(StrEnum):
                 return instant_sender
             case self.MAD_SENDER:
                 return mad_sender
+            case self.LOAD_GENERATOR:
+                return load_generator
             # case self.SIMPLE_SENDER:
             #     return simple_sender
             case _:
                 raise ScenarioNotSupported(f"Scenario is not supported: {self.name}")
 
+    def get_step(self):
+        """
+        Single iteration of scenario, for running scenario on external schedule
+        :return: function taking node
+        """
+        match self:
+            case self.NONE:
+                return none_sender
+            case self.INSTANT_SENDER:
+                return instant_sender_step
+            case self.MAD_SENDER:
+                return partial(mad_sender_step, history=[])
+            case self.LOAD_GENERATOR:
+                return LoadGenerator().step
+            case _:
+                raise ScenarioNotSupported(f"Scenario is not supported: {self.name}")
+
     def call(self, pot: PoST):
         thread = Thread(target=self.get_definition(), args=[pot])
         thread.start()
@@ -1,11 +1,12 @@
 import random
-from time import sleep
 from uuid import UUID
 
-import requests
+from ..network import transport
+from ..network.clock import sleep
 import logging
 import numpy as np
 
+from .load import LoadGenerator
 from .utils import get_random_from_list, print_runtime_error
 from ..network.blockchain import PoST
 from ..network.transaction import TxCandidate, TxToVerify
@@ -17,6 +18,51 @@ def none_sender(pot: PoST):
     return
 
 
+def send_transaction(pot: PoST, value) -> bool:
+    """
+    Send transaction with value to random validator other than self node
+    :return: True if transaction was accepted
+    """
+    if pot.nodes.len() == 0:
+        return False
+    logging.debug(
+        LOG_PREFIX
+        + "Available nodes to send to: "
+        + ", ".join([node.identifier.hex for node in pot.nodes.all()])
+    )
+    if pot.nodes.count_validator_nodes() < 2:
+        return False
+    node = get_random_from_list(pot.nodes.get_validator_nodes())
+    if node.identifier == pot.self_node.identifier:
+        return False
+    logging.debug(
+        LOG_PREFIX + f"Creating transaction to send to node {node.identifier.hex}"
+    )
+    tx_can = TxCandidate({"t": "1", "d": value, "n": 0})
+    tx = tx_can.sign(pot.self_node)
+    response = transport.post(
+        f"http://{node.host}:{node.port}/transaction", tx.encode()
+    )
+    if response.status_code != 200:
+        logging.error(
+            LOG_PREFIX
+            + f"Error while sending transaction. Response: {response.text}. "
+            f"Code: {response.status_code}"
+        )
+        return False
+    assert isinstance(response.json(), dict)
+    uuid = UUID(response.json().get("id"))
+    self_node = pot.nodes.find_by_identifier(pot.self_node.identifier)
+    if pot.nodes.is_validator(self_node):
+        pot.tx_to_verified.add(uuid, TxToVerify(tx, self_node))
+    logging.debug(LOG_PREFIX + f"Transaction {uuid.hex} sent successfully")
+    return True
+
+
+def instant_sender_step(pot: PoST) -> None:
+    send_transaction(pot, random.randint(10, 15))
+
+
 @print_runtime_error
 def instant_sender(pot: PoST):
     """
@@ -25,93 +71,55 @@ def instant_sender(pot: PoST):
     """
     while True:
         sleep(10)
-        if pot.nodes.len() == 0:
-            continue
-        logging.debug(
-            LOG_PREFIX
-            + "Available nodes to send to: "
-            + ", ".join([node.identifier.hex for node in pot.nodes.all()])
-        )
-        if pot.nodes.count_validator_nodes() < 2:
-            continue
-        node = get_random_from_list(pot.nodes.get_validator_nodes())
-        if node.identifier == pot.self_node.identifier:
-            continue
-        logging.debug(
-            LOG_PREFIX + f"Creating transaction to send to node {node.identifier.hex}"
-        )
-        tx_can = TxCandidate({"t": "1", "d": random.randint(10, 15), "n": 0})
-        tx = tx_can.sign(pot.self_node)
-        response = requests.post(
-            f"http://{node.host}:{node.port}/transaction", tx.encode()
-        )
-        if response.status_code == 200:
-            assert isinstance(response.json(), dict)
-            uuid = UUID(response.json().get("id"))
-            self_node = pot.nodes.find_by_identifier(pot.self_node.identifier)
-            if pot.nodes.is_validator(self_node):
-                pot.tx_to_verified.add(uuid, TxToVerify(tx, self_node))
-            logging.debug(LOG_PREFIX + f"Transaction {uuid.hex} sent successfully")
-        else:
-            logging.error(
-                LOG_PREFIX
-                + f"Error while sending transaction. Response: {response.text}. "
-                f"Code: {response.status_code}"
-            )
+        instant_sender_step(pot)
+
+
+def generate_unverifiable_number(history: list, k_factor=2.5):
+    if len(history) < 2:
+        return random.randint(0, 5)
+    mean = np.mean(history)
+    std = np.std(history)
+    min_accepted = mean - std
+    max_accepted = mean + std
+    if np.random.rand() < 0.5:
+        return min_accepted - k_factor * std
+    else:
+        return max_accepted + k_factor * std
+
+
+def mad_sender_step(pot: PoST, history: list) -> None:
+    """
+    :param pot:
+    :param history: values sent by node, appended after accepted transaction
+    :return:
+    """
+    value = generate_unverifiable_number(history)
+    if send_transaction(pot, value):
+        history.append(value)
 
 
 @print_runtime_error
 def mad_sender(pot: PoST):
-    def generate_unverifiable_number(history, k_factor=2.5):
-        if len(history) < 2:
-            return random.randint(0, 5)
-        mean = np.mean(history)
-        std = np.std(history)
-        min_accepted = mean - std
-        max_accepted = mean + std
-        if np.random.rand() < 0.5:
-            return min_accepted - k_factor * std
-        else:
-            return max_accepted + k_factor * std
-
     history = []
     while True:
         sleep(10)
-        if pot.nodes.len() == 0:
-            continue
-        logging.debug(
-            LOG_PREFIX
-            + "Available nodes to send to: "
-            + ", ".join([node.identifier.hex for node in pot.nodes.all()])
-        )
-        if pot.nodes.count_validator_nodes() < 2:
-            continue
-        node = get_random_from_list(pot.nodes.get_validator_nodes())
-        if node.identifier == pot.self_node.identifier:
-            continue
-        logging.debug(
-            LOG_PREFIX + f"Creating transaction to send to node {node.identifier.hex}"
-        )
-        value = generate_unverifiable_number(history)
-        tx_can = TxCandidate({"t": "1", "d": value, "n": 0})
-        tx = tx_can.sign(pot.self_node)
-        response = requests.post(
-            f"http://{node.host}:{node.port}/transaction", tx.encode()
-        )
-        if response.status_code == 200:
-            assert isinstance(response.json(), dict)
-            uuid = UUID(response.json().get("id"))
-            self_node = pot.nodes.find_by_identifier(pot.self_node.identifier)
-            if pot.nodes.is_validator(self_node):
-                pot.tx_to_verified.add(uuid, TxToVerify(tx, self_node))
-            logging.debug(LOG_PREFIX + f"Transaction {uuid.hex} sent successfully")
-            history.append(value)
-        else:
-            logging.error(
-                LOG_PREFIX
-                + f"Error while sending transaction. Response: {response.text}. "
-                  f"Code: {response.status_code}"
-            )
+        mad_sender_step(pot, history)
+
+
+@print_runtime_error
+def load_generator(pot: PoST):
+    """
+    Open-loop load configured by LOAD_RATE, LOAD_DISTRIBUTION, LOAD_BURST_SIZE,
+    LOAD_SENDERS and LOAD_SETTLE_TIMEOUT
+    :param pot:
+    :return:
+    """
+    generator = LoadGenerator()
+    try:
+        while True:
+            sleep(generator.step(pot))
+    finally:
+        generator.close()
 
 
 @print_runtime_error
@@ -130,7 +138,7 @@ def simple_sender(pot: PoST):
         logging.debug(LOG_PREFIX + f"Creating transaction to send")
         tx_can = TxCandidate({"t": "1", "d": random.randint(10, 15)})
         tx = tx_can.sign(pot.self_node)
-        response = requests.post(
+        response = transport.post(
             f"http://{node.host}:{node.port}/transaction", tx.encode()
         )
         if response.status_code == 200:
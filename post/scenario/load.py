@@ -0,0 +1,249 @@
+import logging
+import os
+import random
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from enum import StrEnum, auto
+from uuid import UUID
+
+from ..network import transport
+from ..network.blockchain import PoST
+from ..network.clock import time
+from ..network.node import Node
+from ..network.transaction import Tx, TxCandidate, TxToVerify
+from ..network.transport import get_sender, set_sender
+
+LOG_PREFIX = "LOAD: "
+
+
+class Distribution(StrEnum):
+    CONSTANT = auto()
+    POISSON = auto()
+    BURSTY = auto()
+
+
+class ArrivalProcess:
+    """
+    Times between submissions of transactions averaging to rate per second.
+    Bursty arrivals come in groups of burst_size with Poisson gaps between groups
+    """
+
+    rate: float
+    distribution: Distribution
+    burst_size: int
+    _left_in_burst: int
+    _random: random.Random
+
+    def __init__(
+        self,
+        rate: float,
+        distribution: Distribution = Distribution.POISSON,
+        burst_size: int = 10,
+        seed: int | None = None,
+    ):
+        self.rate = rate
+        self.distribution = distribution
+        self.burst_size = burst_size
+        self._left_in_burst = 0
+        self._random = random.Random(seed)
+
+    def next_interval(self) -> float:
+        match self.distribution:
+            case Distribution.CONSTANT:
+                return 1.0 / self.rate
+            case Distribution.POISSON:
+                return self._random.expovariate(self.rate)
+            case Distribution.BURSTY:
+                if self._left_in_burst > 0:
+                    self._left_in_burst -= 1
+                    return 0.0
+                self._left_in_burst = self.burst_size - 1
+                return self._random.expovariate(self.rate / self.burst_size)
+
+
+class LoadGenerator:
+    """
+    Open-loop load: transactions are submitted at arrival times independent of
+    responses, by up to LOAD_SENDERS concurrent senders, so slow validators do
+    not lower offered load. Latency from arrival to settlement seen by node is
+    written to TransactionLatency, transactions not settled in
+    LOAD_SETTLE_TIMEOUT seconds are counted as lost. Senders run in threads,
+    so counters and transactions in flight are guarded by lock
+    """
+
+    # Longest time between checks of settlement, resolution of latency
+    CHECK_INTERVAL = 0.1
+
+    arrivals: ArrivalProcess
+    senders: int
+    settle_timeout: float
+    next_arrival: float | None
+    in_flight: dict[UUID, tuple[Tx, float]]
+    submitted: int
+    failed: int
+    settled: int
+    lost: int
+    _sequence: int
+    _executor: ThreadPoolExecutor | None
+    _lock: Lock
+
+    def __init__(
+        self,
+        rate: float | None = None,
+        distribution: str | None = None,
+        burst_size: int | None = None,
+        senders: int | None = None,
+        settle_timeout: float | None = None,
+        seed: int | None = None,
+    ):
+        """
+        :param rate: transactions per second, LOAD_RATE by default
+        :param distribution: constant, poisson or bursty, LOAD_DISTRIBUTION by default
+        :param burst_size: transactions in burst, LOAD_BURST_SIZE by default
+        :param senders: maximal number of requests in flight, LOAD_SENDERS by default
+        :param settle_timeout: LOAD_SETTLE_TIMEOUT by default
+        :param seed:
+        """
+        self.arrivals = ArrivalProcess(
+            float(os.getenv("LOAD_RATE", 1)) if rate is None else rate,
+            Distribution(
+                (distribution or os.getenv("LOAD_DISTRIBUTION", "poisson")).lower()
+            ),
+            int(os.getenv("LOAD_BURST_SIZE", 10)) if burst_size is None else burst_size,
+            seed,
+        )
+        self.senders = int(os.getenv("LOAD_SENDERS", 16)) if senders is None else senders
+        self.settle_timeout = (
+            float(os.getenv("LOAD_SETTLE_TIMEOUT", 60))
+            if settle_timeout is None
+            else settle_timeout
+        )
+        self.next_arrival = None
+        self.in_flight = {}
+        self.submitted = 0
+        self.failed = 0
+        self.settled = 0
+        self.lost = 0
+        self._sequence = 0
+        self._executor = None
+        self._lock = Lock()
+
+    def step(self, pot: PoST) -> float:
+        """
+        Submit transactions which arrival time passed and check settlement
+        of transactions in flight
+        :return: seconds to next step
+        """
+        now = time()
+        if self.next_arrival is None:
+            self.next_arrival = now + self.arrivals.next_interval()
+        while self.next_arrival <= now:
+            self.submit(pot, self.next_arrival)
+            self.next_arrival += self.arrivals.next_interval()
+        self.check_settled(pot)
+        return min(self.next_arrival - now, self.CHECK_INTERVAL)
+
+    def _submit_in_background(self) -> bool:
+        if transport.get_transport().synchronous:
+            return False
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(self.senders)
+        return True
+
+    def submit(self, pot: PoST, arrival: float) -> None:
+        validators = [
+            node
+            for node in pot.nodes.get_validator_nodes()
+            if node.identifier != pot.self_node.identifier
+        ]
+        if not validators:
+            logging.debug(LOG_PREFIX + "No validator to send transaction to")
+            return
+        node = random.choice(validators)
+        self._sequence += 1
+        tx_can = TxCandidate(
+            {"t": "1", "d": random.randint(10, 15), "n": str(self._sequence)}
+        )
+        tx = tx_can.sign(pot.self_node)
+        self.submitted += 1
+        if self._submit_in_background():
+            self._executor.submit(self._send, get_sender(), pot, node, tx, arrival)
+        else:
+            self._send(get_sender(), pot, node, tx, arrival)
+
+    def close(self) -> None:
+        """
+        Wait for transactions being sent and stop senders
+        """
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def _send(
+        self, sender: str | None, pot: PoST, node: Node, tx: Tx, arrival: float
+    ) -> None:
+        set_sender(sender)
+        try:
+            response = transport.post(
+                f"http://{node.host}:{node.port}/transaction", tx.encode()
+            )
+        except Exception as e:
+            logging.warning(LOG_PREFIX + f"Cannot send transaction: {e}")
+            with self._lock:
+                self.failed += 1
+            return
+        if response.status_code != 200:
+            logging.warning(
+                LOG_PREFIX
+                + f"Transaction not accepted by {node.identifier.hex}. "
+                f"Code: {response.status_code}"
+            )
+            with self._lock:
+                self.failed += 1
+            return
+        uuid = UUID(response.json().get("id"))
+        self_node = pot.nodes.find_by_identifier(pot.self_node.identifier)
+        if pot.nodes.is_validator(self_node):
+            pot.tx_to_verified.add(uuid, TxToVerify(tx, self_node))
+        with self._lock:
+            self.in_flight[uuid] = (tx, arrival)
+
+    @staticmethod
+    def _result(pot: PoST, uuid: UUID, tx: Tx, verified: set[UUID]) -> bool | None:
+        if uuid in verified:
+            return True
+        if not pot.light and pot.blockchain.find_transaction(tx.hash()) is not None:
+            return True
+        result = pot.txs_settled.find_result(uuid)
+        if result is None and pot.txs_rejected.has(uuid):
+            return False
+        return result
+
+    def check_settled(self, pot: PoST) -> int:
+        """
+        :return: number of transactions settled since last check
+        """
+        with self._lock:
+            in_flight = list(self.in_flight.items())
+        if not in_flight:
+            return 0
+        now = time()
+        verified = set() if pot.light else set(pot.blockchain.txs_verified.all())
+        settled = 0
+        lost = 0
+        for uuid, (tx, arrival) in in_flight:
+            result = self._result(pot, uuid, tx, verified)
+            if result is not None:
+                pot.tx_latency_storage.append(uuid, result, now - arrival)
+                settled += 1
+            elif now - arrival > self.settle_timeout:
+                logging.warning(LOG_PREFIX + f"Transaction {uuid.hex} not settled in time")
+                lost += 1
+            else:
+                continue
+            with self._lock:
+                self.in_flight.pop(uuid)
+        with self._lock:
+            self.settled += settled
+            self.lost += lost
+        return settled
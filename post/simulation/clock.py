@@ -0,0 +1,68 @@
+import heapq
+from itertools import count
+from typing import Callable
+
+from post.network.clock import Clock
+
+
+class VirtualClock(Clock):
+    """
+    Discrete-event clock. Callbacks are run in order of their time and time
+    jumps to next callback, so simulation does not wait for real time to pass
+    and runs the same way on every run
+    """
+
+    now: float
+    _queue: list[tuple[float, int, Callable[[], None]]]
+    _counter: count
+
+    def __init__(self, start: float = 0.0):
+        self.now = start
+        self._queue = []
+        self._counter = count()
+
+    def time(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        """
+        Advance time, e.g. by delay of message delivery or wait of node
+        """
+        self.now += max(seconds, 0.0)
+
+    def call_at(self, at: float, callback: Callable[[], None]) -> None:
+        # Counter keeps order of callbacks scheduled for same time
+        heapq.heappush(self._queue, (max(at, self.now), next(self._counter), callback))
+
+    def call_later(self, delay: float, callback: Callable[[], None]) -> None:
+        self.call_at(self.now + delay, callback)
+
+    def call_every(
+        self, interval: float, callback: Callable[[], float | None], start: float = 0.0
+    ) -> None:
+        """
+        Run callback periodically
+        :param interval: seconds between calls
+        :param callback: may return seconds to next call instead of interval
+        :param start: delay of first call
+        """
+
+        def run():
+            wait = callback()
+            self.call_later(interval if wait is None else wait, run)
+
+        self.call_later(start, run)
+
+    def run_until(self, end: float) -> int:
+        """
+        Run callbacks scheduled before end
+        :return: number of called callbacks
+        """
+        n_calls = 0
+        while self._queue and self._queue[0][0] <= end:
+            at, _, callback = heapq.heappop(self._queue)
+            self.now = max(self.now, at)
+            callback()
+            n_calls += 1
+        self.now = max(self.now, end)
+        return n_calls
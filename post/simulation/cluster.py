@@ -0,0 +1,278 @@
+import logging
+import os
+import random
+from time import time
+from typing import Callable
+
+import numpy as np
+from flask import Flask
+
+from post.api import create_app
+from post.network import clock, transport
+from post.network.blockchain import PoST
+from post.network.resolver import resolver
+from post.network.scheduler import BlockScheduler
+from post.network.verifier import TransactionVerifier
+from post.scenario import Scenario
+from .clock import VirtualClock
+from .environment import environment
+from .transport import InMemoryTransport
+
+
+class SimulatedNode:
+    """
+    Node of in-process simulation. Configuration of node is read from
+    environment while node is created, so all storages are created eagerly
+    """
+
+    host: str
+    env: dict[str, str]
+    pot: PoST
+    app: Flask
+    verifier: TransactionVerifier
+    scheduler: BlockScheduler
+    scenario_step: Callable[[PoST], None]
+
+    def __init__(self, host: str, env: dict[str, str], scenario: Scenario):
+        self.host = host
+        self.env = env
+        with environment(env):
+            self.pot = PoST()
+            for name in [
+                "self_node",
+                "blockchain",
+                "nodes",
+                "tx_to_verified",
+                "txs_rejected",
+                "txs_settled",
+                "tx_time_storage",
+                "tx_latency_storage",
+            ]:
+                getattr(self.pot, name)
+            for name in [
+                "validator_agreement",
+                "validator_agreement_info",
+                "validator_agreement_result",
+                "node_trust",
+                "node_trust_history",
+                "validators",
+            ]:
+                getattr(self.pot.nodes, name)
+            if not self.pot.light:
+                getattr(self.pot.blockchain, "txs_verified")
+            self.app = create_app(self.pot, random_delay=False)
+            self.verifier = TransactionVerifier(self.pot)
+            self.scheduler = BlockScheduler(self.pot.blockchain)
+        self.scenario_step = scenario.get_step()
+
+    def call(self, func: Callable, *args):
+        """
+        Run func as this node, requests are sent from host of node
+        """
+        previous = transport.set_sender(self.host)
+        try:
+            with environment(self.env):
+                return func(*args)
+        except Exception as e:
+            logging.exception(f"Error in simulated node {self.host}: {e}")
+        finally:
+            transport.set_sender(previous)
+
+    def load(self) -> None:
+        self.call(self.pot.load)
+
+    def is_validator(self) -> bool:
+        return self.pot.nodes.is_validator(self.pot.self_node.get_node())
+
+    def verify_step(self) -> float | None:
+        return self.call(self.verifier.step)
+
+    def create_block_step(self) -> None:
+        if not self.call(self.is_validator):
+            return
+        block = self.call(self.scheduler.create_block, self.pot.self_node)
+        if block:
+            self.call(self.pot.publish_block, block)
+
+    def update_from_validator(self) -> None:
+        validators = [
+            node
+            for node in self.pot.nodes.get_validator_nodes()
+            if node.identifier != self.pot.self_node.identifier
+        ]
+        if validators:
+            self.call(
+                self.pot.update_from_validator_node, random.choice(validators).host
+            )
+
+
+class Cluster:
+    """
+    Many nodes in one process exchanging messages by in-memory transport.
+    Workers of each node (scenario, transaction verifier, block creation)
+    run as callbacks of virtual clock, which replaces clock of nodes while
+    simulation is started, so minutes of network work take seconds.
+    Virtual time starts at actual time, so timestamps look like real ones.
+    Environment of node is set only while its code runs in main thread, so
+    nodes must not start background threads reading configuration. Trust
+    changes are therefore flushed synchronously, TRUST_FLUSH_INTERVAL is
+    always 0 for nodes of cluster
+    """
+
+    GENESIS = "node-0"
+    MIN_STEP = 0.01
+    SCENARIO_INTERVAL = 10.0
+    BLOCK_CHECK_INTERVAL = 1.0
+    UPDATE_AFTER = 30.0
+
+    base_dir: str
+    clock: VirtualClock
+    transport: InMemoryTransport
+    nodes: list[SimulatedNode]
+    _previous_transport: transport.Transport | None
+    _previous_clock: clock.Clock | None
+
+    def __init__(
+        self,
+        base_dir: str,
+        n_nodes: int,
+        scenario: str = Scenario.INSTANT_SENDER.name,
+        node_type: str = "VALIDATOR",
+        min_delay: int | None = None,
+        max_delay: int | None = None,
+        loss: float = 0.0,
+        seed: int | None = None,
+        env: dict[str, str] | None = None,
+    ):
+        """
+        :param base_dir: directory for storages of nodes
+        :param n_nodes:
+        :param scenario: name of scenario run by every node
+        :param node_type:
+        :param min_delay: minimal delay of message in ms, MIN_DELAY by default
+        :param max_delay: maximal delay of message in ms, MAX_DELAY by default
+        :param loss: probability of losing message
+        :param seed: seed of random generators
+        :param env: additional environment of nodes, e.g. VALIDATORS_PART,
+            TRUST_FLUSH_INTERVAL is ignored
+        """
+        if seed is not None:
+            random.seed(seed)
+            np.random.seed(seed)
+        self.base_dir = base_dir
+        self.clock = VirtualClock(time())
+        self.transport = InMemoryTransport(
+            int(os.getenv("MIN_DELAY", 0)) if min_delay is None else min_delay,
+            int(os.getenv("MAX_DELAY", 0)) if max_delay is None else max_delay,
+            loss,
+            seed,
+        )
+        self._previous_transport = None
+        self._previous_clock = None
+        self.nodes = []
+        for i in range(n_nodes):
+            host = f"node-{i}"
+            storage_dir = os.path.join(base_dir, host)
+            os.makedirs(storage_dir, exist_ok=True)
+            node_env = {
+                "STORAGE_DIR": storage_dir,
+                "NODE_TYPE": node_type,
+                "GENESIS_NODE": self.GENESIS,
+            }
+            node_env.update(env or {})
+            # Flush timers would run outside environment of node
+            node_env["TRUST_FLUSH_INTERVAL"] = "0"
+            resolver.pin(host, host)
+            node = SimulatedNode(host, node_env, Scenario[scenario])
+            self.transport.add_app(host, node.app, node_env)
+            self.nodes.append(node)
+
+    @property
+    def genesis(self) -> SimulatedNode:
+        return self.nodes[0]
+
+    def start(self) -> None:
+        """
+        Join nodes to network, choose validators and schedule workers
+        """
+        self._previous_transport = transport.set_transport(self.transport)
+        self._previous_clock = clock.set_clock(self.clock)
+        for node in self.nodes:
+            node.load()
+        self.set_random_validators()
+
+        for i, node in enumerate(self.nodes):
+            # Spread work of nodes over intervals
+            offset = i / len(self.nodes)
+            self.schedule(
+                node,
+                self.SCENARIO_INTERVAL,
+                lambda node=node: node.call(node.scenario_step, node.pot),
+                self.SCENARIO_INTERVAL * (1 + offset),
+            )
+            self.schedule(
+                node, self.MIN_STEP, node.verify_step, self.MIN_STEP * (1 + offset)
+            )
+            self.schedule(
+                node,
+                self.BLOCK_CHECK_INTERVAL,
+                node.create_block_step,
+                self.BLOCK_CHECK_INTERVAL * offset,
+            )
+            if node is not self.genesis:
+                self.clock.call_later(
+                    self.UPDATE_AFTER + offset,
+                    node.update_from_validator,
+                )
+
+    def schedule(
+        self,
+        node: SimulatedNode,
+        interval: float,
+        step: Callable[[], float | None],
+        start: float,
+    ) -> None:
+        """
+        Run worker step of node periodically. Next step waits also for
+        messages sent by node
+        :param node:
+        :param interval: seconds between steps
+        :param step: may return seconds to next step instead of interval
+        :param start: delay of first step
+        """
+
+        def run():
+            wait = step()
+            wait = interval if wait is None else max(wait, self.MIN_STEP)
+            self.clock.call_later(wait + self.transport.take_delay(node.host), run)
+
+        self.clock.call_later(start, run)
+
+    def set_random_validators(self) -> None:
+        pot = self.genesis.pot
+        identifiers = [node.identifier for node in pot.nodes.all()]
+        validator_ids = random.sample(
+            identifiers, pot.nodes.calculate_validators_number()
+        )
+        self.genesis.call(pot.nodes.validators.set_validators, validator_ids)
+        self.genesis.call(pot.send_validators_list)
+        logging.info(
+            f"Validators of simulation: {[identifier.hex for identifier in validator_ids]}"
+        )
+
+    def run(self, duration: float) -> int:
+        """
+        Run simulation for duration seconds of virtual time
+        :return: number of executed worker steps
+        """
+        return self.clock.run_until(self.clock.time() + duration)
+
+    def stop(self) -> None:
+        if self._previous_transport is not None:
+            transport.set_transport(self._previous_transport)
+            self._previous_transport = None
+        if self._previous_clock is not None:
+            clock.set_clock(self._previous_clock)
+            self._previous_clock = None
+        for node in self.nodes:
+            resolver.unpin(node.host)
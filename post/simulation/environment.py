@@ -0,0 +1,19 @@
+import os
+from contextlib import contextmanager
+
+
+@contextmanager
+def environment(env: dict[str, str]):
+    """
+    Set environment variables for block of code and restore previous values
+    """
+    previous = {key: os.environ.get(key) for key in env}
+    os.environ.update(env)
+    try:
+        yield
+    finally:
+        for key, value in previous.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
@@ -0,0 +1,137 @@
+import json as json_lib
+import logging
+import random
+from dataclasses import dataclass
+from urllib.parse import urlsplit
+
+from flask import Flask
+from requests import ConnectionError
+
+from post.network.transport import Transport, get_sender, set_sender
+from .environment import environment
+
+
+@dataclass
+class SentRequest:
+    body: bytes | str | None
+
+
+class InMemoryResponse:
+    """
+    Response of in-memory request with interface of requests.Response used by nodes
+    """
+
+    status_code: int
+    content: bytes
+    headers: dict
+    request: SentRequest
+
+    def __init__(self, status_code: int, content: bytes, headers: dict, body):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers
+        self.request = SentRequest(body)
+
+    @property
+    def text(self) -> str:
+        return self.content.decode("utf-8", errors="replace")
+
+    def json(self):
+        return json_lib.loads(self.content)
+
+
+class InMemoryTransport(Transport):
+    """
+    Deliver requests directly to applications of nodes of simulation.
+    Each message takes random time between min_delay and max_delay
+    milliseconds and is lost with probability loss. Time of messages is added
+    to wait of sending node instead of shared clock, so nodes send messages
+    in parallel. Request is handled in environment of target node
+    """
+
+    LOG_PREFIX = "IN_MEMORY: "
+
+    synchronous = True
+
+    min_delay: int
+    max_delay: int
+    loss: float
+    apps: dict[str, Flask]
+    envs: dict[str, dict[str, str]]
+    sent: int
+    lost: int
+    _delays: dict[str | None, float]
+    _random: random.Random
+
+    def __init__(
+        self,
+        min_delay: int = 0,
+        max_delay: int = 0,
+        loss: float = 0.0,
+        seed: int | None = None,
+    ):
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.loss = loss
+        self.apps = {}
+        self.envs = {}
+        self.sent = 0
+        self.lost = 0
+        self._delays = {}
+        self._random = random.Random(seed)
+
+    def add_app(
+        self, host: str, app: Flask, env: dict[str, str] | None = None
+    ) -> None:
+        """
+        :param host:
+        :param app:
+        :param env: environment of node set while its app handles request
+        """
+        self.apps[host] = app
+        self.envs[host] = env or {}
+
+    def take_delay(self, host: str) -> float:
+        """
+        :return: time of messages sent by host since last call
+        """
+        return self._delays.pop(host, 0.0)
+
+    def request(self, method: str, url: str, **kwargs):
+        split = urlsplit(url)
+        app = self.apps.get(split.hostname)
+        if app is None:
+            raise ConnectionError(f"Host {split.hostname} is not part of simulation")
+        self.sent += 1
+        sender = get_sender()
+        if self.max_delay:
+            self._delays[sender] = (
+                self._delays.get(sender, 0.0)
+                + self._random.randint(self.min_delay, self.max_delay) / 1000.0
+            )
+        if self.loss and self._random.random() < self.loss:
+            self.lost += 1
+            raise ConnectionError(f"Message to {url} lost")
+
+        body = kwargs.get("data") if kwargs.get("json") is None else kwargs.get("json")
+        previous = set_sender(split.hostname)
+        try:
+            with environment(self.envs[split.hostname]):
+                response = app.test_client().open(
+                    split.path,
+                    method=method,
+                    data=kwargs.get("data"),
+                    json=kwargs.get("json"),
+                    query_string=kwargs.get("params") or split.query,
+                    headers=kwargs.get("headers"),
+                    environ_base={"REMOTE_ADDR": sender or "127.0.0.1"},
+                )
+        finally:
+            set_sender(previous)
+        logging.debug(
+            self.LOG_PREFIX
+            + f"{sender} -> {method} {url}: {response.status_code}"
+        )
+        return InMemoryResponse(
+            response.status_code, response.get_data(), dict(response.headers), body
+        )
@@ -1,5 +1,6 @@
 import logging
 import os
+import signal
 import sys
 from random import randint
 from logging.handlers import TimedRotatingFileHandler
@@ -25,6 +26,14 @@ def setup_logger(prefix: str = "", level_str: str | None = None) -> None:
     )
 
 
+def exit_on_sigterm() -> None:
+    """
+    Exit normally on SIGTERM (stop of container), so exit handlers persist
+    pending changes, e.g. trust changes cached by NodeTrust
+    """
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+
 def prepare_simulation_env():
     os.environ["POST_SCENARIOS"] = "INSTANT_SENDER"
     os.environ["VALIDATORS_PART"] = "0.2"
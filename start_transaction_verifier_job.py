@@ -4,7 +4,7 @@ from dotenv import load_dotenv
 
 from post.network.blockchain import PoST
 from post.network.verifier import TransactionVerifier
-from post.utils import setup_logger, prepare_simulation_env
+from post.utils import setup_logger, prepare_simulation_env, exit_on_sigterm
 
 
 print(f"Starting {__file__}")
@@ -14,6 +14,7 @@ Loading env values
 """
 load_dotenv()
 prepare_simulation_env()
+exit_on_sigterm()
 
 """
 Configuring logger
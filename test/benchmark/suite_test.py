@@ -0,0 +1,32 @@
+import json
+
+from post.benchmark.suite import Benchmark, CASES, bench_cluster, compare
+
+
+def test_benchmark_suite(tmp_path):
+    benchmark = Benchmark(str(tmp_path / "work"), scale=0.01, repeat=1)
+    benchmark.run([case for case in CASES if case is not bench_cluster])
+    names = [result.name for result in benchmark.results]
+    assert len(names) == len(set(names))
+    for name in [
+        "tx.decode",
+        "decode_chain",
+        "BlocksStorage.load",
+        "NodeTrustStorage.update",
+        "add_transaction_verification_result",
+        "find_last_transactions_values_for_node",
+    ]:
+        assert name in names
+    assert all(result.best > 0 for result in benchmark.results)
+
+    path = tmp_path / "result.json"
+    benchmark.save(str(path))
+    with open(path) as f:
+        saved = json.load(f)
+    assert saved["scale"] == 0.01
+    assert saved["results"][0]["items_per_second"] > 0
+
+    slower = json.loads(json.dumps(saved))
+    slower["results"][0]["best"] *= 2
+    assert compare(saved, saved) == []
+    assert compare(saved, slower) == [(saved["results"][0]["name"], 2.0)]
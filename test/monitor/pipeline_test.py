@@ -0,0 +1,70 @@
+import os
+from uuid import uuid4
+
+from post.monitor.pipeline import ResultsCatalog, TRUST_COLUMNS
+from post.network.node import SelfNodeInfo
+from post.network.storage import NodeTrustStorage, TransactionTime
+
+
+def write_results(batch_dir, name: str, tx_times: list[float], trust: list[float]):
+    result_dir = batch_dir / name / "result"
+    result_dir.mkdir(parents=True, exist_ok=True)
+    (result_dir / "result_tx.csv").write_text(",".join(map(str, tx_times)) + "\n")
+    (result_dir / "result_trust.csv").write_text(",".join(map(str, trust)) + "\n")
+
+
+def test_results_catalog(tmp_path):
+    write_results(tmp_path, "simulation_1", [1.0, 2.0, 3.0], [1, 2, 3, 4, 5, 6, 7])
+    write_results(tmp_path, "simulation_2", [4.0], [7, 6, 5, 4, 3, 2, 1])
+
+    catalog = ResultsCatalog(str(tmp_path), workers=1)
+    assert catalog.update() == ["simulation_1", "simulation_2"]
+    assert catalog.update() == []
+    assert catalog.tx_times() == {1: [1.0, 2.0, 3.0], 2: [4.0]}
+    assert catalog.trust_rows()[2] == [7, 6, 5, 4, 3, 2, 1]
+    assert catalog.summary().loc[1, "tx_median"] == 2.0
+
+    write_results(tmp_path, "simulation_2", [5.0, 6.0], [1] * len(TRUST_COLUMNS))
+    write_results(tmp_path, "simulation_3", [], [])
+    catalog = ResultsCatalog(str(tmp_path), workers=1)
+    assert catalog.update() == ["simulation_2", "simulation_3"]
+    assert catalog.tx_times() == {1: [1.0, 2.0, 3.0], 2: [5.0, 6.0]}
+    assert list(catalog.trust_rows()) == [1, 2]
+    assert catalog.summary().loc[3, "tx_count"] == 0
+
+    with open(catalog.write_trust_table()) as f:
+        table = f.read()
+    assert "{|" + "c|" * (len(TRUST_COLUMNS) + 1) + "}" in table
+    assert "2 & 1.0 & 1.0" in table
+    assert os.path.isfile(catalog.write_summary())
+
+
+def write_storage(batch_dir, name: str, node: str, tx_times: list[float], monkeypatch):
+    storage_dir = batch_dir / name / "storage" / node / "storage"
+    storage_dir.mkdir(parents=True)
+    monkeypatch.setenv("STORAGE_DIR", str(storage_dir))
+    for tx_time in tx_times:
+        TransactionTime().append(uuid4(), True, tx_time)
+    return SelfNodeInfo().identifier
+
+
+def test_results_catalog_analyzes_storages(tmp_path, monkeypatch):
+    first = write_storage(tmp_path, "simulation_1", "node-1", [1.0, 3.0], monkeypatch)
+    second = write_storage(tmp_path, "simulation_1", "node-2", [2.0], monkeypatch)
+    NodeTrustStorage().update({first: 4200})
+    monkeypatch.setenv(
+        "STORAGE_DIR", str(tmp_path / "simulation_1" / "storage" / "node-1" / "storage")
+    )
+    NodeTrustStorage().update({first: 4000, second: 6000})
+
+    catalog = ResultsCatalog(str(tmp_path), workers=1)
+    assert catalog.update() == ["simulation_1"]
+    assert catalog.update() == []
+    assert sorted(catalog.tx_times()[1]) == [1.0, 2.0, 3.0]
+    trust = dict(zip(TRUST_COLUMNS, catalog.trust_rows()[1]))
+    assert trust["trust_max"] == 6000
+    assert trust["trust_min"] == 4000
+
+    write_storage(tmp_path, "simulation_1", "node-3", [4.0], monkeypatch)
+    assert catalog.update() == ["simulation_1"]
+    assert len(catalog.tx_times()[1]) == 4
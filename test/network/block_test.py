@@ -9,6 +9,7 @@ from post.network.node import SelfNodeInfo
 from post.network.service import Blockchain
 from post.network.transaction import TxCandidate, TxVerified
 from post.network.block import Block, BlockCandidate
+from post.network.merkle import merkle_root, merkle_proof, verify_proof
 from test.network.conftest import Helper
 
 
@@ -146,6 +147,49 @@ def test_filter_last_transactions(helper: Helper):
     assert last_txs[0]["data"] == tx_verified.tx.data
 
 
+def test_merkle_proof():
+    leaves = [sha256(bytes([i])).digest() for i in range(7)]
+    root = merkle_root(leaves)
+    for i in range(len(leaves)):
+        proof = merkle_proof(leaves, i)
+        assert len(proof) == (2 if i == 6 else 3)
+        assert verify_proof(leaves[i], proof, root)
+        assert not verify_proof(leaves[(i + 1) % 7], proof, root)
 
 
+def test_block_version_dispatch(helper: Helper):
+    self_node = helper.get_self_node_info()
+    txs = [helper.create_transaction(i) for i in range(3)]
+
+    block_v1 = BlockCandidate(1, int(time()), None, None, txs).sign(
+        sha256(b"12345").digest(), self_node.identifier, self_node.private_key
+    )
+    block_v2 = BlockCandidate.create_new(txs).sign(
+        sha256(b"12345").digest(), self_node.identifier, self_node.private_key
+    )
+
+    assert block_v1.merkle_root is None
+    assert block_v2.version == Block.MERKLE_VERSION
+    assert block_v2.merkle_root == merkle_root([tx.hash() for tx in txs])
+    for block in [block_v1, block_v2]:
+        assert block.verify(self_node.public_key)
+        assert Block.decode(BytesIO(block.encode())) == block
 
+    block_v2.transactions = txs[:2]
+    assert not block_v2.verify(self_node.public_key)
+    block_v2.transactions = txs
+    proof = block_v2.prove_transaction(1)
+    assert verify_proof(txs[1].hash(), proof, block_v2.merkle_root)
+
+
+def test_merkle_root_of_duplicated_last_leaf(helper: Helper):
+    leaves = [sha256(bytes([i])).digest() for i in range(3)]
+    assert merkle_root(leaves) != merkle_root(leaves + leaves[-1:])
+
+    self_node = helper.get_self_node_info()
+    txs = [helper.create_transaction(i) for i in range(3)]
+    block = BlockCandidate.create_new(txs).sign(
+        sha256(b"12345").digest(), self_node.identifier, self_node.private_key
+    )
+    block.transactions = txs + txs[-1:]
+    assert not block.verify(self_node.public_key)
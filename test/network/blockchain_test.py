@@ -1,18 +1,22 @@
 import base64
 import socket
-from time import time
+from time import sleep, time
 from uuid import UUID, uuid4
 
 import pytest
 
 from post.network.block import BlockCandidate
 from post.network.blockchain import PoST
-from post.network.exception import PoTException
+from post.network.exception import PoTException, BlockchainSyncException
+from post.network.merkle import verify_proof
 from post.network.node import SelfNodeInfo, NodeType, Node
+from post.network.request import Request
 from post.network.storage import decode_chain
 from post.network.transaction import TxVerified
+from post.network.utils import is_loaded
+from post.network.wire import WireEncoding
 
-from test.network.conftest import Helper
+from test.network.conftest import Helper, RecordingTransport
 
 
 def test_pot_load(helper: Helper):
@@ -216,3 +220,296 @@ def test_set_new_validators(helper: Helper):
     new_validators = pot.nodes.validators.all()
     assert len(new_validators) == 1
     assert new_validators[0] == identifier
+
+
+def test_blockchain_get_pagination(helper: Helper):
+    helper.put_genesis_node_env()
+    pot = PoST()
+    pot.load()
+
+    for i in range(4):
+        block = BlockCandidate.create_new([helper.create_transaction()]).sign(
+            pot.blockchain.get_last_block().hash(),
+            pot.self_node.identifier,
+            pot.self_node.private_key,
+        )
+        pot.blockchain.add(block)
+
+    blocks, headers_only, response_format = pot.blockchain_get(
+        {"from_height": "1", "limit": "2", "headers": "1"}
+    )
+    blocks = list(blocks)
+
+    assert [block.header() for block in pot.blockchain.all()[1:3]] == blocks
+    assert headers_only
+    assert response_format == "json"
+    assert blocks[0].to_dict(headers_only)["n_transaction"] == 1
+    assert "transactions" not in blocks[0].to_dict(headers_only)
+
+    blocks, headers_only, response_format = pot.blockchain_get({"from_height": "3"})
+    assert len(list(blocks)) == 2
+    assert not headers_only
+
+    blocks, _, response_format = pot.blockchain_get({"format": "binary"})
+    assert list(blocks) == [block.encode() for block in pot.blockchain.all()]
+
+    with pytest.raises(PoTException):
+        pot.blockchain_get({"limit": "-1"})
+    with pytest.raises(PoTException):
+        pot.blockchain_get({"format": "xml"})
+
+
+def test_blockchain_sync_after_last_block(helper: Helper):
+    helper.put_genesis_node_env()
+    pot = PoST()
+    pot.load()
+
+    genesis = pot.blockchain.get_last_block()
+    for i in range(3):
+        block = BlockCandidate.create_new([helper.create_transaction()]).sign(
+            pot.blockchain.get_last_block().hash(),
+            pot.self_node.identifier,
+            pot.self_node.private_key,
+        )
+        pot.blockchain.add(block)
+
+    blocks = pot.blockchain_sync({"lastBlock": genesis.hash().hex()})
+    assert blocks == pot.blockchain.all()[1:]
+
+    blocks = pot.blockchain_sync(
+        {"lastBlock": genesis.hash().hex(), "offset": "1", "limit": "1"}
+    )
+    assert blocks == pot.blockchain.all()[2:3]
+
+    pot._verify_blocks(genesis.hash(), pot.blockchain.all()[1:])
+    with pytest.raises(PoTException):
+        pot._verify_blocks(genesis.hash(), pot.blockchain.all()[2:])
+
+    with pytest.raises(PoTException) as e:
+        pot.blockchain_sync({"lastBlock": "00" * 32})
+    assert e.value.code == 409
+
+    response = pot.node_update({"lastBlock": genesis.hash().hex()})
+    chain = decode_chain(base64.b64decode(bytes.fromhex(response.get("blockchain"))))
+    assert chain == pot.blockchain.all()[1:]
+    assert "blockchain" not in pot.node_update({"blockchain": "0"})
+
+
+def test_blockchain_sync_fails_on_missing_chunk(helper: Helper, monkeypatch):
+    helper.put_genesis_node_env()
+    pot = PoST()
+    pot.load()
+
+    def get_blockchain_sync(*args):
+        raise ConnectionError("Connection refused")
+
+    monkeypatch.setattr(Request, "get_blockchain_sync", get_blockchain_sync)
+    with pytest.raises(BlockchainSyncException):
+        pot._fetch_blocks(pot.nodes.all(), None, 3)
+
+
+def test_node_update_compact_encoding(helper: Helper):
+    helper.put_genesis_node_env()
+    pot = PoST()
+    pot.load()
+
+    legacy = pot.node_update({})
+    compact = pot.node_update({}, WireEncoding.BASE64)
+
+    assert len(compact["blockchain"]) < len(legacy["blockchain"])
+    assert decode_chain(
+        WireEncoding.BASE64.decode_bytes(compact["blockchain"])
+    ) == decode_chain(WireEncoding.LEGACY.decode_bytes(legacy["blockchain"]))
+
+
+def test_transaction_majority_settlement(
+    helper: Helper, recording_transport: RecordingTransport
+):
+    helper.put_genesis_node_env()
+    pot = PoST()
+    pot.load()
+    pot.tx_settlement = PoST.TX_SETTLEMENT_MAJORITY
+
+    validators = [pot.self_node.get_node()]
+    for i in range(2):
+        node = Node(uuid4(), f"127.0.0.{i + 2}", 5000, NodeType.VALIDATOR)
+        pot.nodes.add(node)
+        pot.nodes.node_trust.add_new_node_trust(node)
+        validators.append(node)
+    pot.nodes.validators.set_validators([node.identifier for node in validators])
+
+    uuid = uuid4()
+    tx_to_verify = helper.create_tx_to_verify()
+    pot.tx_to_verified.add(uuid, tx_to_verify)
+
+    pot.add_transaction_verification_result(uuid, validators[0], True)
+    assert pot.tx_to_verified.find(uuid) is not None
+    pot.add_transaction_verification_result(uuid, validators[1], True)
+    assert pot.tx_to_verified.find(uuid) is None
+    assert pot.blockchain.find_tx_verified(uuid) is not None
+    assert pot.txs_settled.find_result(uuid) is True
+
+    late_node = validators[2]
+    trust = pot.nodes.node_trust.get_node_trust(late_node)
+    for i in range(2):
+        with pytest.raises(PoTException):
+            pot.add_transaction_verification_result(uuid, late_node, False)
+    assert pot.nodes.node_trust.get_node_trust(late_node) == trust - 10
+    assert pot.tx_to_verified.find(uuid) is None
+
+
+def test_transaction_vote_timeout(
+    helper: Helper, recording_transport: RecordingTransport
+):
+    helper.put_genesis_node_env()
+    pot = PoST()
+    pot.load()
+    pot.tx_settlement = PoST.TX_SETTLEMENT_MAJORITY
+
+    node = Node(uuid4(), "127.0.0.2", 5000, NodeType.VALIDATOR)
+    pot.nodes.add(node)
+    pot.nodes.node_trust.add_new_node_trust(node)
+    pot.nodes.validators.set_validators(
+        [pot.self_node.identifier, node.identifier]
+    )
+
+    uuid = uuid4()
+    pot.tx_to_verified.add(uuid, helper.create_tx_to_verify())
+    pot.add_transaction_verification_result(uuid, pot.self_node.get_node(), False)
+
+    assert pot.settle_timed_out_transactions() == []
+    pot.tx_vote_timeout = -1
+    assert pot.settle_timed_out_transactions() == [uuid]
+    assert pot.txs_rejected.has(uuid)
+    assert pot.tx_to_verified.find(uuid) is None
+
+
+def test_blockchain_proof(helper: Helper):
+    helper.put_genesis_node_env()
+    pot = PoST()
+    pot.load()
+
+    txs = [helper.create_transaction(i) for i in range(5)]
+    for tx in txs:
+        pot.blockchain.add_new_transaction(uuid4(), TxVerified(tx, int(time())))
+    block = pot.blockchain.create_block(pot.self_node)
+
+    response = pot.blockchain_proof(txs[3].hash().hex())
+    assert response["height"] == 1
+    assert response["hash"] == block.hash().hex()
+    assert "transactions" not in response["header"]
+    proof = [(bytes.fromhex(p["hash"]), p["left"]) for p in response["proof"]]
+    root = WireEncoding.LEGACY.decode_bytes(response["header"]["merkle_root"])
+    assert verify_proof(block.transactions[response["index"]].hash(), proof, root)
+
+    with pytest.raises(PoTException):
+        pot.blockchain_proof(helper.create_transaction(10).hash().hex())
+
+
+def test_light_node_headers_update(helper: Helper, monkeypatch):
+    helper.put_genesis_node_env()
+    txs = [helper.create_transaction(i) for i in range(3)]
+    pot = PoST()
+    pot.load()
+    for tx in txs:
+        pot.blockchain.add_new_transaction(uuid4(), TxVerified(tx, int(time())))
+        pot.blockchain.create_block(pot.self_node)
+    response = pot.node_update({"blockchain": "headers"}, WireEncoding.BASE64)
+    assert "blockchain" not in response
+
+    monkeypatch.setenv("LIGHT_NODE", "1")
+    monkeypatch.setenv("NODE_TYPE", NodeType.SENSOR.name)
+    light = PoST()
+    assert light.light
+    monkeypatch.setattr(
+        "post.network.blockchain.Request.get_node_update",
+        lambda host, port, params: (response, WireEncoding.BASE64),
+    )
+    light.update_from_validator_node("127.0.0.1")
+
+    headers = light.blockchain.all()
+    assert len(headers) == 4
+    assert [header.hash() for header in headers] == [
+        block.hash() for block in pot.blockchain.all()
+    ]
+    assert headers[-1].n_transaction == 1
+    assert light.blockchain.find_tx_verified(uuid4()) is None
+    assert not is_loaded(light.blockchain, "txs_verified")
+
+    tampered = pot.blockchain.all()[-1].header()
+    tampered.timestamp += 1
+    with pytest.raises(PoTException):
+        light._verify_blocks(headers[-2].hash(), [tampered])
+
+
+def test_validate_agreement_on_start(helper: Helper, monkeypatch):
+    helper.put_genesis_node_env()
+    pot = PoST()
+    pot.load()
+    self_node = pot.self_node.get_node()
+    leader = Node(uuid4(), "172.0.0.2", 5000)
+    pot.nodes.add(leader)
+    for i in range(3):
+        pot.nodes.add(Node(uuid4(), f"172.0.0.{i + 3}", 5000))
+    pot.nodes.validators.set_validators([self_node.identifier, leader.identifier])
+
+    votes = []
+    monkeypatch.setattr(
+        "post.network.blockchain.Request.send_validator_agreement_vote",
+        lambda host, port, data: votes.append((host, data["result"])),
+    )
+    assert pot.validate_agreement() is None
+
+    pot.nodes.validator_agreement_info.set_info_data(True, [leader.identifier])
+    pot.nodes.set_agreement_list(pot.nodes.propose_agreement())
+    pot.nodes.validator_agreement_result.add(leader.identifier, True)
+
+    assert pot.validate_agreement() is True
+    assert pot.validate_agreement() is None
+    assert pot.nodes.validator_agreement_result.find(self_node.identifier) is True
+    for _ in range(100):
+        if votes:
+            break
+        sleep(0.01)
+    assert votes == [(leader.host, True)]
+
+    pot.nodes.validator_agreement_result.clear()
+    pot.nodes.set_agreement_list(list(reversed(pot.nodes.propose_agreement())))
+    assert pot.validate_agreement() is False
+
+
+def test_pot_lazy_storages(helper: Helper):
+    helper.put_genesis_node_env()
+    pot = PoST()
+    pot.load()
+
+    worker = PoST()
+    assert worker.__dict__.keys().isdisjoint(["self_node", "blockchain", "nodes"])
+    worker.load(only_from_file=True)
+    assert "nodes" in worker.__dict__
+    assert "blockchain" not in worker.__dict__
+    assert "node_trust" not in worker.nodes.__dict__
+
+    assert worker.blockchain.height() == pot.blockchain.height()
+    assert "blockchain" in worker.load_times
+
+
+def test_send_transaction_verified_falls_back_to_string(
+    helper: Helper, recording_transport: RecordingTransport
+):
+    helper.put_genesis_node_env()
+    pot = PoST()
+    pot.load()
+    pot.nodes.add(Node(uuid4(), "127.0.0.2", 5000, NodeType.VALIDATOR))
+    tx_verified = TxVerified(helper.create_transaction(), int(time()))
+
+    # Rejected by node negotiating encoding, binary format is supported
+    recording_transport.status_code = 400
+    recording_transport.headers = WireEncoding.BASE64.to_headers()
+    pot.send_new_transaction_verified(uuid4(), tx_verified)
+    assert len(recording_transport.requests) == 1
+
+    recording_transport.headers = {}
+    pot.send_new_transaction_verified(uuid4(), tx_verified)
+    assert len(recording_transport.requests) == 3
+    assert recording_transport.requests[-1][2]["data"] == str(tx_verified)
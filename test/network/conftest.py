@@ -13,6 +13,8 @@ import pytest
 from post.network.block import Block, BlockCandidate
 from post.network.node import SelfNodeInfo, NodeType, Node, SelfNode
 from post.network.transaction import TxCandidate, Tx, TxToVerify
+from post.network.transport import Transport, set_transport
+from post.simulation.transport import InMemoryResponse
 
 
 class Helper:
@@ -43,6 +45,8 @@ class Helper:
     @staticmethod
     def put_storage_env() -> None:
         os.environ["STORAGE_DIR"] = Helper.get_storage_dir()
+        # Write trust changes immediately, not from background flush timer
+        os.environ["TRUST_FLUSH_INTERVAL"] = "0"
 
     @staticmethod
     def put_genesis_node_env(real_ip: bool = True) -> None:
@@ -100,6 +104,29 @@ class Helper:
         )
 
 
+class RecordingTransport(Transport):
+    """
+    Answer every request with the same response without opening socket
+    """
+
+    synchronous = True
+
+    status_code: int
+    headers: dict
+    requests: list[tuple[str, str, dict]]
+
+    def __init__(self, status_code: int = 200, headers: dict | None = None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.requests = []
+
+    def request(self, method: str, url: str, **kwargs):
+        self.requests.append((method, url, kwargs))
+        return InMemoryResponse(
+            self.status_code, b"{}", dict(self.headers), kwargs.get("data")
+        )
+
+
 @pytest.fixture()
 def helper():
     return Helper
@@ -109,3 +136,11 @@ def helper():
 def around_test():
     Helper.clear_storage()
     yield
+
+
+@pytest.fixture()
+def recording_transport():
+    transport = RecordingTransport()
+    previous = set_transport(transport)
+    yield transport
+    set_transport(previous)
@@ -0,0 +1,85 @@
+import json
+import os
+
+from post.monitor.ingest import DumpIngest
+from post.network.dumper import Dumper, SnapshotReader
+from post.network.storage import BlocksStorage, NodeStorage, NodeTrustStorage
+from test.network.conftest import Helper
+
+
+def test_dumper_incremental_snapshots(tmp_path, monkeypatch):
+    storage_dir = tmp_path / "storage"
+    storage_dir.mkdir()
+    monkeypatch.setenv("STORAGE_DIR", str(storage_dir))
+    monkeypatch.setenv("DUMP_DIR", str(tmp_path / "dump"))
+    times = iter([1.0, 2.0, 3.0])
+    monkeypatch.setattr("post.network.dumper.time", lambda: next(times))
+
+    (storage_dir / "blockchain").write_bytes(b"a" * 10)
+    (storage_dir / "nodes").write_text("node1\n")
+    (storage_dir / "nodes.lock").write_text("")
+    dumper = Dumper(None)
+    dumper.dump()
+
+    with open(storage_dir / "blockchain", "ab") as f:
+        f.write(b"b" * 5)
+    dumper.dump()
+
+    (storage_dir / "blockchain").write_bytes(b"c" * 3)
+    dumper.dump()
+
+    reader = SnapshotReader(str(tmp_path / "dump"))
+    assert reader.snapshots() == [10, 20, 30]
+    assert not os.path.exists(tmp_path / "dump" / "10" / "nodes.lock")
+    assert (
+        os.stat(tmp_path / "dump" / "10" / "nodes").st_ino
+        == os.stat(tmp_path / "dump" / "30" / "nodes").st_ino
+    )
+    with open(tmp_path / "dump" / "20" / Dumper.MANIFEST) as f:
+        assert json.load(f)["blockchain"] == ["blockchain.20", 15]
+
+    assert reader.read(10, "blockchain") == b"a" * 10
+    assert reader.read(20, "blockchain") == b"a" * 10 + b"b" * 5
+    assert reader.read(30, "blockchain") == b"c" * 3
+
+    materialized = reader.materialize(20, str(tmp_path / "materialized"))
+    with open(os.path.join(materialized, "blockchain"), "rb") as f:
+        assert f.read() == b"a" * 10 + b"b" * 5
+    reader.materialize(30, materialized)
+    assert reader.read(20, "blockchain") == b"a" * 10 + b"b" * 5
+
+
+def test_dump_ingest(helper: Helper, tmp_path, monkeypatch):
+    helper.put_storage_env()
+    dump_dir = str(tmp_path / "dump")
+    monkeypatch.setenv("DUMP_DIR", dump_dir)
+    times = iter([1.0, 2.0, 3.0, 4.0])
+    monkeypatch.setattr("post.network.dumper.time", lambda: next(times))
+    node = helper.create_node()
+    dumper = Dumper(None)
+
+    BlocksStorage().update([helper.create_block()])
+    NodeStorage().update([node])
+    NodeTrustStorage().update({node.identifier: 5000})
+    dumper.dump()
+    BlocksStorage().update([helper.create_block()])
+    dumper.dump()
+    NodeTrustStorage().update({node.identifier: 4000})
+    dumper.dump()
+
+    ingest = DumpIngest(workers=1, chunk_size=2)
+    dumps = ingest.ingest({"node": dump_dir})["node"]
+    assert dumps.snapshots.tolist() == [10, 20, 30]
+    assert dumps.counts["number_of_blocks"].tolist() == [1, 2, 2]
+    assert dumps.counts["number_of_nodes"].tolist() == [1, 1, 1]
+    assert dumps.trust_values.tolist() == [5000, 5000, 4000]
+    assert dumps.trust_nodes.tolist() == [node.identifier.hex] * 3
+    assert os.path.isfile(os.path.join(dump_dir, DumpIngest.CACHE))
+
+    NodeStorage().update([helper.create_node()])
+    dumper.dump()
+    dumps = ingest.ingest({"node": dump_dir})["node"]
+    assert dumps.counts["number_of_nodes"].tolist() == [1, 1, 1, 2]
+    df = dumps.frame(1.0)
+    assert df.index.tolist() == [0.0, 1.0, 2.0, 3.0]
+    assert df["number_of_blocks"].tolist() == [1, 2, 2, 2]
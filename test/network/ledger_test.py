@@ -0,0 +1,51 @@
+from random import Random
+from uuid import UUID
+
+from post.network.ledger import TrustLedger
+
+
+def test_trust_ledger_batched_changes():
+    nodes = [UUID(int=i) for i in range(100)]
+    ledger = TrustLedger({node: 10 for node in nodes})
+    ledger.apply({nodes[3]: 5, nodes[7]: -4, UUID(int=1000): 3})
+
+    assert len(ledger) == 101
+    assert ledger[nodes[3]] == 15
+    assert ledger[nodes[7]] == 6
+    assert ledger.get(UUID(int=1000)) == 3
+    assert ledger.get(UUID(int=1001)) is None
+
+    ledger[nodes[7]] += 1
+    assert ledger.to_dict()[nodes[7]] == 7
+
+
+def test_trust_ledger_ranking():
+    nodes = [UUID(int=i) for i in range(10)]
+    ledger = TrustLedger({node: 5 for node in reversed(nodes)})
+    ledger.update({nodes[4]: 9, nodes[8]: 1})
+
+    assert ledger.top_k(3) == [(nodes[4], 9), (nodes[0], 5), (nodes[1], 5)]
+    assert ledger.bottom_k(2) == [(nodes[8], 1), (nodes[0], 5)]
+    assert ledger.top_k(1, nodes[5:]) == [(nodes[5], 5)]
+    assert ledger.order()[:2] == [nodes[8], nodes[0]]
+    assert ledger.order(descending=True)[-1] == nodes[8]
+    assert ledger.percentiles([0, 50, 100]) == {0: 1.0, 50: 5.0, 100: 9.0}
+    assert ledger.summary()["count"] == 10
+
+
+def test_trust_ledger_lowest_follows_changes():
+    rng = Random(1)
+    nodes = [UUID(int=rng.getrandbits(128)) for _ in range(200)]
+    ledger = TrustLedger({node: rng.randint(0, 20) for node in nodes[:100]})
+    for node in nodes[100:]:
+        ledger[node] = rng.randint(0, 20)
+    for _ in range(50):
+        ledger.apply({rng.choice(nodes): rng.randint(-5, 5) for _ in range(3)})
+        ledger.update({rng.choice(nodes): rng.randint(0, 20)})
+
+    allowed = set(nodes[::2])
+    assert ledger.lowest(10) == [node for node, _ in ledger.bottom_k(10)]
+    assert ledger.lowest(10, allowed) == [
+        node for node, _ in ledger.bottom_k(10, allowed)
+    ]
+    assert ledger.lowest(300) == ledger.order()
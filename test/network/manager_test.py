@@ -1,3 +1,4 @@
+from threading import Timer
 from time import time
 from uuid import uuid4
 
@@ -5,7 +6,16 @@ from post.network.manager import (
     TransactionToVerifyManager,
     BlockchainManager,
     TransactionVerifiedManager,
+    NodeTrust,
+    RejectedTransactionManager,
+    SettledTransactionManager,
+    ValidatorAgreementResult,
+    NodeManager,
 )
+from post.network import manager
+from post.network.service import LightBlockchain, Node
+from post.network.recorder import StateRecorder
+from post.network.storage import StateEvents
 from post.network.node import NodeType
 from post.network.transaction import TxVerified
 from test.network.conftest import Helper
@@ -85,3 +95,168 @@ def test_verified_transaction_sorting_2(helper: Helper):
     sorted = manager.sort_tx_by_time(manager.all())
 
     assert list(sorted.values()) == [tx_verified3, tx_verified2, tx_verified1]
+
+
+def test_node_trust_write_back(helper: Helper):
+    helper.put_storage_env()
+    node = helper.create_node()
+    writer = NodeTrust()
+    writer.flush_interval = 60
+    reader = NodeTrust()
+    writer.add_new_node_trust(node)
+
+    writer.add_trust_to_node(node, 5)
+    writer.add_trust_to_node(node, -2)
+    assert writer.get_node_trust(node) == NodeTrust.BASIC_TRUST + 3
+    assert reader.get_node_trust(node) == NodeTrust.BASIC_TRUST
+
+    writer.flush()
+    assert reader.get_node_trust(node) == NodeTrust.BASIC_TRUST + 3
+
+    reader.add_trust_to_node(node, 10)
+    writer.add_trust_to_node(node, 1)
+    assert writer.get_node_trust(node) == NodeTrust.BASIC_TRUST + 14
+    writer.flush()
+
+    # Interrupted write is skipped on replay
+    with open(writer.get_storage().path, "a") as f:
+        f.write(node.identifier.hex[:10])
+    assert NodeTrust().get_node_trust(node) == NodeTrust.BASIC_TRUST + 14
+
+    writer.COMPACT_SIZE = 0
+    writer.add_trust_to_node(node, 1)
+    writer.flush()
+    with open(writer.get_storage().path) as f:
+        assert f.read().splitlines() == [f"{node.identifier.hex},5015"]
+    assert reader.get_node_trust(node) == NodeTrust.BASIC_TRUST + 15
+
+
+def test_node_trust_waits_for_missing_node(helper: Helper):
+    helper.put_storage_env()
+    node = helper.create_node()
+    writer = NodeTrust()
+    other = NodeTrust()
+    timer = Timer(0.3, other.add_new_node_trust, (node,))
+    timer.start()
+
+    writer.add_trust_to_node(node, 7)
+    timer.join()
+    assert writer.get_node_trust(node) == NodeTrust.BASIC_TRUST + 7
+    writer.flush()
+    assert other.get_node_trust(node) == NodeTrust.BASIC_TRUST + 7
+
+
+def test_node_trust_flushed_at_exit(helper: Helper, monkeypatch):
+    helper.put_storage_env()
+    monkeypatch.setenv("TRUST_FLUSH_INTERVAL", "60")
+    writer = NodeTrust()
+    node = helper.create_node()
+    writer.add_new_node_trust(node)
+    writer.add_trust_to_node(node, 15)
+    assert NodeTrust().get_node_trust(node) == NodeTrust.BASIC_TRUST
+
+    manager.flush_node_trusts()
+    assert NodeTrust().get_node_trust(node) == NodeTrust.BASIC_TRUST + 15
+
+
+def test_rejected_transactions_retention(helper: Helper, monkeypatch):
+    helper.put_storage_env()
+    monkeypatch.setenv("REJECTED_TX_MAX", "3")
+    first = RejectedTransactionManager()
+    second = RejectedTransactionManager()
+    first.COMPACT_ROWS = 4
+
+    old_tx = uuid4()
+    second._storage.update([old_tx], time() - second.retention - 1)
+    assert not first.has(old_tx)
+
+    tx_ids = [uuid4() for _ in range(6)]
+    for tx_id in tx_ids:
+        first.add(tx_id)
+    assert first.all() == tx_ids[3:]
+    assert not first.has(tx_ids[0])
+    assert second.has(tx_ids[5])
+    assert not second.has(tx_ids[2])
+    assert first._storage.load() == tx_ids[3:]
+
+
+def test_settled_transactions_expire(helper: Helper):
+    helper.put_storage_env()
+    first = SettledTransactionManager()
+    second = SettledTransactionManager()
+    first.COMPACT_ROWS = 4
+    voters = [uuid4() for _ in range(3)]
+
+    old_tx = uuid4()
+    second._storage.update(old_tx, True, voters, time() - second.retention - 1)
+    assert first.find_result(old_tx) is None
+
+    tx_id = uuid4()
+    first.add(tx_id, False, voters[:2])
+    first.add(tx_id, True, voters)
+    assert second.find_result(tx_id) is False
+    assert second.has_voter(tx_id, voters[2])
+    # Old votes are dropped by compaction
+    assert old_tx not in first._storage.load()
+    assert len(first._storage.load()[tx_id][1]) == 3
+
+
+def test_agreement_vote_saved_once(helper: Helper):
+    helper.put_storage_env()
+    first = ValidatorAgreementResult()
+    second = ValidatorAgreementResult()
+    node_id = uuid4()
+    assert first.find(node_id) is None and second.find(node_id) is None
+
+    # Both processes checked that node has not voted yet
+    assert first.add(node_id, True)
+    assert not second.add(node_id, True)
+    assert second.find(node_id) is True
+    with open(first.get_storage().path) as f:
+        assert len(f.read().splitlines()) == 1
+
+
+def test_state_recorder(helper: Helper, monkeypatch):
+    helper.put_storage_env()
+    monkeypatch.setattr(manager, "recorder", StateRecorder(True))
+    nodes = NodeManager()
+    trust = NodeTrust()
+    node = helper.create_node()
+    start = time()
+
+    nodes.add(node)
+    trust.add_new_node_trust(node)
+    trust.add_trust_to_node(node, 5)
+
+    events = StateEvents().load()
+    assert [event[1:] for event in events] == [
+        (StateRecorder.NODES, "", len(nodes.all())),
+        (StateRecorder.TRUST, node.identifier.hex, NodeTrust.BASIC_TRUST),
+        (StateRecorder.TRUST, node.identifier.hex, NodeTrust.BASIC_TRUST + 5),
+    ]
+    assert start <= events[0][0] <= events[-1][0] <= time()
+
+
+def test_state_recorder_nodes_from_json(helper: Helper, monkeypatch):
+    helper.put_storage_env()
+    monkeypatch.setattr(manager, "recorder", StateRecorder(True))
+    nodes = Node()
+    node = helper.create_node(NodeType.VALIDATOR)
+    node_dict = dict(node.__dict__, trust=NodeTrust.BASIC_TRUST)
+
+    nodes.update_from_json([node_dict])
+
+    events = StateEvents().load()
+    assert events[-1][1:] == (StateRecorder.NODES, "", len(nodes.all()))
+
+
+def test_state_recorder_light_blockchain_headers(helper: Helper, monkeypatch):
+    helper.put_storage_env()
+    monkeypatch.setattr(manager, "recorder", StateRecorder(True))
+    blockchain = LightBlockchain()
+    headers = [helper.create_block().header(), helper.create_block().header()]
+
+    blockchain.set_headers(headers)
+
+    events = StateEvents().load()
+    assert [event[1:] for event in events] == [(StateRecorder.BLOCKS, "", 2)]
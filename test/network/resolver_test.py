@@ -0,0 +1,32 @@
+from time import sleep
+
+from post.network.resolver import HostResolver
+
+
+def test_host_resolver_cache(monkeypatch):
+    lookups = []
+    addresses = {"genesis": "172.0.0.1"}
+
+    def lookup(host: str) -> str:
+        lookups.append(host)
+        return addresses[host]
+
+    monkeypatch.setattr("post.network.resolver.socket.gethostbyname", lookup)
+    resolver = HostResolver(60)
+
+    assert resolver.resolve("genesis") == "172.0.0.1"
+    assert resolver.resolve("genesis") == "172.0.0.1"
+    assert lookups == ["genesis"]
+
+    addresses["genesis"] = "172.0.0.2"
+    resolver.invalidate("genesis")
+    assert resolver.resolve("genesis") == "172.0.0.2"
+
+    resolver.ttl = 0
+    addresses["genesis"] = "172.0.0.3"
+    assert resolver.resolve("genesis") == "172.0.0.2"
+    for _ in range(100):
+        if resolver.resolve("genesis") == "172.0.0.3":
+            break
+        sleep(0.01)
+    assert resolver.resolve("genesis") == "172.0.0.3"
@@ -0,0 +1,56 @@
+from time import time
+from uuid import uuid4
+
+from post.network.scheduler import BlockScheduler, BlockCut
+from post.network.service import Blockchain
+from post.network.transaction import TxVerified
+from test.network.conftest import Helper
+
+
+def prepare_blockchain(helper: Helper, n_txs: int) -> Blockchain:
+    helper.put_storage_env()
+    blockchain = Blockchain()
+    blockchain.create_first_block(helper.get_self_node_info())
+    for i in range(n_txs):
+        blockchain.add_new_transaction(
+            uuid4(), TxVerified(helper.create_transaction(), int(time()) + i)
+        )
+    return blockchain
+
+
+def test_scheduler_waits_for_interval(helper: Helper):
+    blockchain = prepare_blockchain(helper, 3)
+    scheduler = BlockScheduler(blockchain)
+    scheduler.interval = 60
+
+    assert scheduler.decide() is None
+    assert 0 < scheduler.wait_time() <= 60
+
+    decision = scheduler.decide(time() + 61)
+    assert decision.reason == BlockCut.INTERVAL
+    assert len(decision.identifiers) == 3
+
+
+def test_scheduler_cuts_block_on_size(helper: Helper):
+    blockchain = prepare_blockchain(helper, 5)
+    scheduler = BlockScheduler(blockchain)
+    scheduler.interval = 60
+    scheduler.max_txs = 2
+
+    oldest = sorted(blockchain.txs_verified.all().items(), key=lambda i: i[1].time)
+    self_node = helper.get_self_node_info()
+    block = scheduler.create_block(self_node)
+
+    assert block is not None
+    assert block.transactions == [tx.tx for _, tx in oldest[:2]]
+    assert len(blockchain.all()) == 2
+    assert len(blockchain.txs_verified.all()) == 3
+    metrics = scheduler.metrics.load()
+    assert metrics[-1]["reason"] == BlockCut.SIZE.value
+    assert metrics[-1]["n_transaction"] == 2
+    assert metrics[-1]["pending"] == 5
+
+    scheduler.max_txs = 1000
+    scheduler.max_bytes = 1
+    block = scheduler.create_block(self_node)
+    assert len(block.transactions) == 1
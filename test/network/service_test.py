@@ -1,6 +1,8 @@
+from random import Random
 from time import time
 from uuid import uuid4
 
+from post.network.manager import NodeTrustHistoryManager
 from post.network.service import Node
 from post.network.node import Node as NodeDto
 from post.network.trust import NodeTrustChange, TrustChangeType
@@ -79,6 +81,7 @@ def test_prepare_nodes_info(helper: Helper):
     service.add(node)
 
     service.validators.set_validators([identifier1])
+    service.node_trust.add_new_node_trust(service.find_by_identifier(identifier1))
     service.node_trust.add_trust_to_node(service.find_by_identifier(identifier1), 1)
 
     info = [
@@ -208,3 +211,68 @@ def test_update_node(helper: Helper):
 
     assert len(service.all()) == 4
     # assert service.count_validator_nodes() == 1
+
+
+def test_node_trust_history_shared_index(helper: Helper):
+    helper.put_storage_env()
+    first = NodeTrustHistoryManager(False)
+    second = NodeTrustHistoryManager(False)
+    first.COMPACT_ROWS = 2
+
+    change_type = TrustChangeType.TRANSACTION_VALIDATED
+    old_timestamp = time() - first.TRUST_PURGE_INTERVAL - 1.0
+    identifier = uuid4()
+    for i in range(3):
+        first.add(NodeTrustChange(identifier, old_timestamp, change_type, 1, str(i)))
+    node_trust = NodeTrustChange(identifier, time(), change_type, 1, "abc")
+    second.add(node_trust)
+
+    assert first.has_node_trust(node_trust)
+    assert len(first.all()) == 4
+
+    first.purge_old_history()
+    assert [change.additional_data for change in first.all()] == ["abc"]
+    assert len(first._storage.load()) == 1
+    second.purge_old_history()
+    assert len(second.all()) == 1
+    assert second.has_node_trust(
+        NodeTrustChange(identifier, time(), change_type, 1, "abc")
+    )
+    assert not second.has_node_trust(
+        NodeTrustChange(identifier, time(), change_type, 1, "0")
+    )
+
+
+def test_agreement_proposal(helper: Helper):
+    helper.put_storage_env()
+    service = Node()
+    service.validators_part = 0.4
+
+    identifiers = [uuid4() for _ in range(10)]
+    service.update_from_json(
+        [
+            {
+                "identifier": identifier.hex,
+                "host": f"172.0.0.{i}",
+                "port": 5000,
+                "type": "SENSOR",
+                "trust": 100 + i,
+            }
+            for i, identifier in enumerate(identifiers)
+        ]
+    )
+
+    assert service.get_agreement_window() == identifiers[:5]
+    proposal = service.propose_agreement(Random(1))
+    assert proposal[:2] == identifiers[:2]
+    assert len(proposal) == 4
+    assert service.check_agreement_proposal(proposal) is None
+    assert service.check_agreement_proposal(proposal[:3]) is not None
+    assert service.check_agreement_proposal(proposal[:3] + proposal[:1]) is not None
+    assert service.check_agreement_proposal(proposal[:3] + [uuid4()]) is not None
+    # Second part is not limited to window, trust of validator may drift
+    assert service.check_agreement_proposal(proposal[:3] + [identifiers[9]]) is None
+
+    service.node_trust.add_trust_to_node(service.find_by_identifier(identifiers[9]), -50)
+    assert service.get_agreement_window()[0] == identifiers[9]
+    assert service.check_agreement_proposal(proposal) is not None
@@ -2,9 +2,18 @@ import os
 from copy import copy
 from uuid import uuid4
 
+from post.network import clock
 from post.network.block import Block
 from post.network.node import Node
-from post.network.storage import BlocksStorage, TransactionStorage, NodeStorage
+from post.network.storage import (
+    BlocksStorage,
+    TransactionStorage,
+    NodeStorage,
+    NodeTrustFullHistory,
+    BlockHeadersStorage,
+)
+from post.network.trust import NodeTrustChange, TrustChangeType
+from post.simulation.clock import VirtualClock
 from test.network.conftest import Helper
 
 
@@ -135,3 +144,130 @@ def test_node(helper: Helper):
     assert len(nodes) == 1
 
     assert node == nodes[0]
+
+
+def test_node_trust_full_history_segments(helper: Helper, monkeypatch):
+    helper.put_storage_env()
+    monkeypatch.setenv("TRUST_HISTORY_BUCKET", "100")
+    storage = NodeTrustFullHistory()
+
+    first, second = uuid4(), uuid4()
+    validated = TrustChangeType.TRANSACTION_VALIDATED
+    storage.update(
+        [
+            NodeTrustChange(first, 1050.0, validated, 1, "abc"),
+            NodeTrustChange(second, 1060.0, validated, 2),
+            NodeTrustChange(first, 1150.0, validated, -3, "def"),
+        ]
+    )
+    NodeTrustFullHistory().update([NodeTrustChange(first, 1250.0, validated, 5)])
+
+    assert storage.nodes() == [first, second]
+    assert [bucket for bucket, _ in storage.segments()] == [1000, 1100, 1200]
+    assert [bucket for bucket, _ in storage.segments(1120, 1180)] == [1100]
+
+    times, trust = storage.trust_over_time(first, 10)
+    assert times.tolist() == [1050.0, 1150.0, 1250.0]
+    assert trust.tolist() == [11, 8, 13]
+    assert len(storage.load_records(1100)) == 2
+
+    rows = storage.load_rows()
+    assert [row[4] for row in rows] == ["abc", "", "def", ""]
+    assert storage.load()[1].node_id == second
+
+
+def test_node_trust_full_history_legacy_csv(helper: Helper):
+    helper.put_storage_env()
+    node_id = uuid4()
+    validated = TrustChangeType.TRANSACTION_VALIDATED
+    legacy_path = os.path.join(
+        helper.get_storage_dir(), NodeTrustFullHistory.LEGACY_PATH
+    )
+    with open(legacy_path, "w") as f:
+        f.write(f"{node_id.hex},1050.0,{validated.value},1,abc,1051.0\n")
+        f.write(f"{node_id.hex},1150.0,{validated.value},-3,,1151.0\n")
+
+    storage = NodeTrustFullHistory()
+    assert storage.load_rows() == [
+        [node_id.hex, 1050.0, validated.value, 1, "abc", 1051.0],
+        [node_id.hex, 1150.0, validated.value, -3, "", 1151.0],
+    ]
+    assert not os.path.isfile(legacy_path)
+    # Migrated only once
+    assert len(NodeTrustFullHistory().load_records(node_id=node_id)) == 2
+
+
+def test_storage_counts(helper: Helper):
+    helper.put_storage_env()
+    blocks = [helper.create_block(), helper.create_block()]
+    blocks[1].transactions = blocks[1].transactions[:1]
+    storage = BlocksStorage()
+    storage.dump(blocks)
+    assert storage.count() == (2, 3)
+
+    headers = BlockHeadersStorage()
+    headers.dump([block.header() for block in blocks])
+    assert headers.count() == (2, 3)
+
+    # Interrupted write of block is not counted
+    with open(storage.path, "ab") as f:
+        f.write(blocks[0].encode()[:100])
+    assert storage.count() == (2, 3)
+
+    tx_storage = TransactionStorage()
+    identifier = uuid4()
+    tx_storage.update({identifier: helper.create_tx_to_verify()})
+    tx_storage.update({uuid4(): helper.create_tx_to_verify()})
+    tx_storage.update({identifier: helper.create_tx_to_verify()})
+    assert tx_storage.count() == len(tx_storage.load()) == 2
+
+    node_storage = NodeStorage()
+    node_storage.update([helper.create_node(), helper.create_node()])
+    assert node_storage.count() == 2
+
+
+def test_blocks_storage_load_range(helper: Helper, monkeypatch):
+    helper.put_storage_env()
+    blocks = [helper.create_block() for _ in range(4)]
+    storage = BlocksStorage()
+    storage.dump(blocks)
+    monkeypatch.setattr(BlocksStorage, "RANGE_CHUNK", 3)
+    assert [b.hash() for b in storage.load_range(1, 2)] == [
+        b.hash() for b in blocks[1:3]
+    ]
+    assert len(list(storage.load_range(3))) == 1
+    assert list(storage.load_range(5)) == []
+    assert list(storage.load_range(1, raw=True)) == [b.encode() for b in blocks[1:]]
+    assert [h.encode() for h in storage.load_range(0, 3, headers_only=True)] == [
+        b.header().encode() for b in blocks[:3]
+    ]
+
+    headers = BlockHeadersStorage()
+    headers.dump([block.header() for block in blocks])
+    assert [h.hash() for h in headers.load_range(2)] == [
+        b.hash() for b in blocks[2:]
+    ]
+
+    # Blocks appended between chunks are read, storage is not locked while reading
+    reader = storage.load_range()
+    assert [next(reader).hash() for _ in range(3)] == [b.hash() for b in blocks[:3]]
+    storage.update([blocks[0]])
+    assert len(list(reader)) == 2
+
+    # Interrupted write of block is not loaded
+    with open(storage.path, "ab") as f:
+        f.write(blocks[0].encode()[:100])
+    assert len(list(storage.load_range(2))) == 3
+
+
+def test_storage_wait_for_change_uses_clock(helper: Helper):
+    helper.put_storage_env()
+    storage = NodeStorage()
+    storage.load()
+    virtual_clock = VirtualClock(100.0)
+    previous = clock.set_clock(virtual_clock)
+    try:
+        assert not storage.wait_for_change(60.0)
+    finally:
+        clock.set_clock(previous)
+    assert virtual_clock.time() >= 160.0
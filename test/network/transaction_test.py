@@ -4,7 +4,7 @@ from uuid import uuid4
 from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
 
 from post.network.node import Node, NodeType
-from post.network.transaction import Tx, TxCandidate, TxToVerify
+from post.network.transaction import Tx, TxCandidate, TxToVerify, TxVerified
 from test.network.conftest import Helper
 
 
@@ -147,3 +147,11 @@ def test_tx_to_validate_encode_with_voting2(helper: Helper):
 
     assert tx_to_verify == TxToVerify.from_str(str(tx_to_verify))
 
+
+def test_tx_verified_encode_and_decode(helper: Helper):
+    tx_verified = TxVerified(helper.create_transaction(), 1700000000)
+
+    encoded = tx_verified.encode()
+
+    assert TxVerified.decode(BytesIO(encoded)) == tx_verified
+    assert len(encoded) < len(str(tx_verified))
@@ -0,0 +1,80 @@
+from uuid import uuid4
+
+import pytest
+from requests import ConnectionError
+
+from post.network import transport
+from post.network.transport import Transport
+from post.scenario import Scenario
+from post.scenario.load import ArrivalProcess, Distribution, LoadGenerator
+from post.simulation.cluster import Cluster
+
+
+@pytest.mark.parametrize("distribution", list(Distribution))
+def test_arrival_process_rate(distribution):
+    arrivals = ArrivalProcess(5.0, distribution, burst_size=4, seed=1)
+    intervals = [arrivals.next_interval() for _ in range(4000)]
+    assert sum(intervals) / len(intervals) == pytest.approx(0.2, rel=0.1)
+    if distribution == Distribution.BURSTY:
+        assert intervals.count(0.0) == 3000
+
+
+def test_load_generator(tmp_path):
+    cluster = Cluster(
+        str(tmp_path),
+        4,
+        scenario=Scenario.LOAD_GENERATOR.name,
+        seed=1,
+        env={"LOAD_RATE": "0.5", "LOAD_DISTRIBUTION": "constant"},
+    )
+    try:
+        cluster.start()
+        cluster.run(60.0)
+        generators = [node.scenario_step.__self__ for node in cluster.nodes]
+        assert all(isinstance(g, LoadGenerator) for g in generators)
+        # Open loop: every node submitted at constant rate
+        assert all(g.submitted >= 25 for g in generators)
+        latencies = {}
+        for node in cluster.nodes:
+            latencies.update(node.pot.tx_latency_storage.load())
+        assert len(latencies) == sum(g.settled for g in generators) > 0
+        assert all(tx_time > 0 for _, tx_time in latencies.values())
+        assert any(result for result, _ in latencies.values())
+    finally:
+        cluster.stop()
+
+
+class FailingTransport(Transport):
+    """
+    Asynchronous transport losing every message
+    """
+
+    def request(self, method: str, url: str, **kwargs):
+        raise ConnectionError(f"Message to {url} lost")
+
+
+class StubNode:
+    host = "node"
+    port = 5000
+    identifier = uuid4()
+
+
+class StubTx:
+    def encode(self) -> bytes:
+        return b""
+
+
+def test_load_generator_background_senders():
+    previous = transport.set_transport(FailingTransport())
+    generator = LoadGenerator(senders=4)
+    try:
+        assert generator._submit_in_background()
+        for _ in range(200):
+            generator._executor.submit(
+                generator._send, None, None, StubNode(), StubTx(), 0.0
+            )
+    finally:
+        generator.close()
+        transport.set_transport(previous)
+    assert generator.failed == 200
+    assert generator._executor is None
@@ -0,0 +1,73 @@
+import os
+
+from flask import Flask
+
+from post.network import clock, transport
+from post.network.clock import SystemClock
+from post.network.transport import RequestsTransport
+from post.simulation.clock import VirtualClock
+from post.simulation.cluster import Cluster
+from post.simulation.environment import environment
+from post.simulation.transport import InMemoryTransport
+
+
+def test_virtual_clock():
+    clock = VirtualClock()
+    calls = []
+    clock.call_later(2.0, lambda: calls.append(("later", clock.time())))
+    clock.call_every(1.0, lambda: calls.append(("every", clock.time())), start=0.5)
+    assert clock.run_until(2.0) == 3
+    assert calls == [("every", 0.5), ("every", 1.5), ("later", 2.0)]
+    assert clock.time() == 2.0
+    clock.sleep(0.5)
+    assert clock.time() == 2.5
+
+
+def test_in_memory_transport_environment_of_target():
+    app = Flask(__name__)
+    app.get("/storage")(lambda: os.environ["STORAGE_DIR"])
+    in_memory = InMemoryTransport()
+    in_memory.add_app("node-1", app, {"STORAGE_DIR": "target"})
+
+    with environment({"STORAGE_DIR": "sender"}):
+        response = in_memory.request("GET", "http://node-1:5000/storage")
+        assert os.environ["STORAGE_DIR"] == "sender"
+    assert response.text == "target"
+
+
+def test_cluster(tmp_path):
+    cluster = Cluster(
+        str(tmp_path),
+        4,
+        max_delay=50,
+        seed=1,
+        env={"BLOCK_INTERVAL": "20", "TRUST_FLUSH_INTERVAL": "0.5"},
+    )
+    try:
+        for node in cluster.nodes:
+            assert node.pot.nodes.node_trust.flush_interval == 0
+        cluster.start()
+        start = cluster.clock.time()
+        genesis = cluster.genesis.pot
+        assert len(genesis.nodes.all()) == 4
+        assert genesis.nodes.count_validator_nodes() == 2
+        for node in cluster.nodes:
+            assert len(node.pot.nodes.all()) == 4
+            assert len(node.pot.nodes.validators.all()) == 2
+
+        assert cluster.run(60.0) > 0
+        assert cluster.transport.sent > 0
+        verified = sum(
+            len(node.pot.blockchain.txs_verified.all())
+            + len(node.pot.tx_time_storage.load())
+            for node in cluster.nodes
+        )
+        assert verified > 0
+        # Blocks are cut by interval of virtual time
+        blocks = genesis.blockchain.all()
+        assert len(blocks) > 1
+        assert blocks[-1].timestamp >= int(start) + 20
+    finally:
+        cluster.stop()
+    assert isinstance(transport.get_transport(), RequestsTransport)
+    assert isinstance(clock.get_clock(), SystemClock)
@@ -1,13 +1,13 @@
 import logging
 import os
-import socket
 import random
-from time import sleep, time
 
 from dotenv import load_dotenv
 
 from post.network.blockchain import PoST
-from post.utils import setup_logger, prepare_simulation_env
+from post.network.clock import sleep, time
+from post.network.resolver import resolver
+from post.utils import setup_logger, prepare_simulation_env, exit_on_sigterm
 
 
 print(f"Starting {__file__}")
@@ -17,6 +17,7 @@ Loading env values
 """
 load_dotenv()
 prepare_simulation_env()
+exit_on_sigterm()
 
 """
 Configuring logger
@@ -25,11 +26,8 @@ setup_logger("SET_RANDOM_VALIDATORS")
 
 sleep(0.1)
 
-hostname = socket.gethostname()
-ip = socket.gethostbyname(hostname)
-
-genesis_hostname = os.getenv("GENESIS_NODE")
-genesis_ip = socket.gethostbyname(genesis_hostname)
+ip = resolver.self_ip()
+genesis_ip = resolver.resolve(os.getenv("GENESIS_NODE"))
 if ip != genesis_ip:
     exit()
 
@@ -1,17 +1,16 @@
 import logging
+import os
 import socket
 from threading import Thread
-from time import sleep, time
-from math import ceil
-from random import randint
 from uuid import UUID
 
 from dotenv import load_dotenv
 
 from post.network.blockchain import PoST
+from post.network.clock import sleep, time
 from post.network.node import Node
 from post.network.request import Request
-from post.utils import setup_logger, prepare_simulation_env
+from post.utils import setup_logger, prepare_simulation_env, exit_on_sigterm
 
 
 print(f"Starting {__file__}")
@@ -21,6 +20,7 @@ Loading env values
 """
 load_dotenv()
 prepare_simulation_env()
+exit_on_sigterm()
 
 """
 Configuring logger
@@ -38,10 +38,12 @@ logging.info(
     f"Node: {node.identifier}. Socket: {socket.gethostbyname(socket.gethostname())}"
 )
 
+agreement_interval = float(os.getenv("AGREEMENT_INTERVAL", 139))
+
 while True:
 
     if not pot.nodes.is_validator(node):
-        sleep(50)
+        pot.nodes.validators.wait_for_change(50)
         continue
 
     logging.info(
@@ -52,25 +54,10 @@ while True:
     if (
         not agreement_info.is_started
         and len(pot.nodes.validator_agreement_result.all()) == 0
-        and agreement_info.last_successful_agreement < time() - 139
+        and agreement_info.last_successful_agreement < time() - agreement_interval
     ):
         logging.info("Starting agreement")
-        # Prepare nodes list
-        nodes = pot.nodes.prepare_all_nodes_info()
-        nodes = sorted(nodes, key=lambda node_info: node_info["trust"])
-        validator_len = max(2, ceil(len(nodes) * 0.1))
-
-        half_validator_len = int(validator_len / 2)
-        agreement_list = nodes[0:half_validator_len]
-
-        while True:
-            if validator_len == len(agreement_list):
-                break
-            index = randint(half_validator_len, validator_len)
-            if nodes[index] not in agreement_list:
-                agreement_list.append(nodes[index])
-
-        validator_list = [node["identifier"] for node in agreement_list]
+        validator_list = [node_id.hex for node_id in pot.nodes.propose_agreement()]
         logging.info(f"Proposed validator list: " + ", ".join(validator_list))
 
         # Send list
@@ -107,4 +94,9 @@ while True:
         pot.nodes.validator_agreement_result.add(node.identifier, True)
         send(action)
 
-    sleep(30)
+    # Wake up when agreement ends or when next agreement can be started
+    if agreement_info.is_started:
+        timeout = agreement_interval
+    else:
+        timeout = agreement_info.last_successful_agreement + agreement_interval - time()
+    agreement_info.wait_for_change(max(timeout, 1))
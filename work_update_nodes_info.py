@@ -1,11 +1,11 @@
 import os
-import socket
-from time import sleep
 
 from dotenv import load_dotenv
 
 from post.network.blockchain import PoST
-from post.utils import setup_logger, prepare_simulation_env
+from post.network.clock import sleep
+from post.network.resolver import resolver
+from post.utils import setup_logger, prepare_simulation_env, exit_on_sigterm
 
 
 print(f"Starting {__file__}")
@@ -15,6 +15,7 @@ Loading env values
 """
 load_dotenv()
 prepare_simulation_env()
+exit_on_sigterm()
 
 """
 Configuring logger
@@ -26,11 +27,8 @@ sleep(0.1)
 pot = PoST()
 pot.load(only_from_file=True)
 
-hostname = socket.gethostname()
-ip = socket.gethostbyname(hostname)
-
-genesis_hostname = os.getenv("GENESIS_NODE")
-genesis_ip = socket.gethostbyname(genesis_hostname)
+ip = resolver.self_ip()
+genesis_ip = resolver.resolve(os.getenv("GENESIS_NODE"))
 if ip == genesis_ip:
     exit()
 